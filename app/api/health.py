@@ -0,0 +1,31 @@
+# app/api/health.py
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.serives.startup import startup_scheduler
+
+router = APIRouter()
+
+_start_time = time.time()
+
+
+@router.get("/health/live")
+async def health_live():
+    """
+    存活检查：进程可以响应请求即返回成功
+    """
+    return {"status": "alive", "uptime": int((time.time() - _start_time) * 1000)}
+
+
+@router.get("/health/ready")
+async def health_ready():
+    """
+    就绪检查：返回每个服务的初始化状态和耗时，必需的服务未全部就绪时返回 503
+    """
+    status = startup_scheduler.status()
+    return JSONResponse(
+        status_code=200 if status["ready"] else 503,
+        content={"status": "ready" if status["ready"] else "not_ready", **status},
+    )
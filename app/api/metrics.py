@@ -0,0 +1,16 @@
+# app/api/metrics.py
+from fastapi import APIRouter
+from prometheus_client import CONTENT_TYPE_LATEST
+from starlette.responses import Response
+
+from app.utils.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus 抓取接口，多 worker 时返回所有 worker 汇总后的值
+    """
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
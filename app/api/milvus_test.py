@@ -1,11 +1,30 @@
 # app/api/milvus_test.py
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
+import asyncio
+import json
+import os
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import BaseModel, Field, ValidationError
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional
 from llama_index.core import Document
+from pymilvus import MilvusException
+from app.serives.collection_export import CollectionExport, encode_row
+from app.serives.collection_registry import CollectionRegistry
+from app.serives.collection_snapshot import export_snapshot
+from app.serives.document_sync import sync_documents
 from app.serives.embedding_manager import EmbeddingManager
+from app.serives.ingestion import add_keyword_nodes, ingest_documents
+from app.serives.ingestion_pipeline import IngestionPipeline
+from app.serives.keyword_index_manager import KeywordIndexManager
+from app.serives.milvus_executor import ADMIN, MilvusExecutor
 from app.serives.milvus_manager import MilvusManager
+from app.serives.ollama_pool import OllamaPoolManager
+from app.serives.retrieval import dense_search, hybrid_search, keyword_search
+from app.serives.search_cache import get_search_cache
 from app.utils.log import log
+from config.setting import INGEST_MAX_DOCUMENTS, MILVUS_SNAPSHOT_DIR
 
 router = APIRouter()
 
@@ -13,27 +32,60 @@ router = APIRouter()
 class DocumentInput(BaseModel):
     text: str
     metadata: Optional[dict] = None
+    # 调用方的文档 id，传入时按 chunk 内容哈希增量同步，重复提交不会产生重复数据
+    doc_id: Optional[str] = Field(default=None, min_length=1)
+    # 写入的集合，为空时为默认集合，嵌入向量使用集合对应的 embedding 模型
+    collection: Optional[str] = None
 
 
 class SearchInput(BaseModel):
-    query_text: str
-    top_k: int = 5
+    query_text: Optional[str] = None
+    # 调用方已有查询向量时直接传入，跳过 Ollama
+    query_embedding: Optional[List[float]] = None
+    top_k: int = Field(default=5, gt=0)
+    # dense: 向量检索；keyword: BM25 关键词检索；hybrid: 两路同时检索后按倒数排名融合
+    mode: Literal["dense", "keyword", "hybrid"] = "dense"
+    dense_weight: float = Field(default=1.0, ge=0)
+    keyword_weight: float = Field(default=1.0, ge=0)
+    # 覆盖本次向量检索的参数：HNSW 的 ef、IVF 系列的 nprobe
+    ef: Optional[int] = Field(default=None, gt=0)
+    nprobe: Optional[int] = Field(default=None, gt=0)
+    # 覆盖集合配置的精排开关：先多取候选，再按原始向量的精确得分重排
+    rerank: Optional[bool] = None
+    # 检索的集合，为空时为默认集合，查询向量使用集合对应的 embedding 模型
+    collection: Optional[str] = None
+
+
+def check_collection(collection: Optional[str]):
+    """
+    校验请求指定的集合已注册
+    """
+    if collection is not None and not CollectionRegistry.has(collection):
+        raise HTTPException(status_code=400, detail=f"Unknown collection: {collection}")
 
 
 @router.post("/milvus/add")
 async def add_document(doc_input: DocumentInput):
     """
-    添加文档到 Milvus
+    添加文档到 Milvus，传入 doc_id 时按增量同步处理
     """
+    check_collection(doc_input.collection)
+    if doc_input.doc_id:
+        return await sync_document_items(
+            [doc_input.model_dump()], collection=doc_input.collection
+        )
+
     try:
-        vector_store = MilvusManager.get_vector_store()
+        vector_store = MilvusManager.get_vector_store(doc_input.collection)
         if not vector_store:
             raise HTTPException(
                 status_code=500, detail="Milvus vector store not initialized"
             )
 
         # 首先生成文档的嵌入向量
-        embedding = EmbeddingManager.get_embedding(doc_input.text)
+        embedding = await EmbeddingManager.aget_embedding(
+            doc_input.text, doc_input.collection
+        )
         if not embedding:
             raise HTTPException(status_code=500, detail="Failed to generate embedding")
 
@@ -45,7 +97,13 @@ async def add_document(doc_input: DocumentInput):
         )
 
         # 添加到向量存储
-        vector_store.add([doc])
+        await MilvusExecutor.ainsert([doc], doc_input.collection)
+        try:
+            # 分词和 BM25 更新放到线程池，失败只记录日志
+            await asyncio.to_thread(add_keyword_nodes, [doc], doc_input.collection)
+        finally:
+            # 集合已变化，清空检索结果缓存
+            get_search_cache(vector_store.collection_name).invalidate()
 
         return {
             "status": "success",
@@ -57,45 +115,353 @@ async def add_document(doc_input: DocumentInput):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def parse_document_item(raw_item: Any) -> Dict[str, Any]:
+    """
+    校验单个文档，失败时返回 {"error": ...}
+    """
+    if isinstance(raw_item, dict) and "error" in raw_item:
+        return raw_item
+    try:
+        doc_input = DocumentInput.model_validate(raw_item)
+        return {
+            "text": doc_input.text,
+            "metadata": doc_input.metadata,
+            "doc_id": doc_input.doc_id,
+        }
+    except ValidationError as e:
+        return {"error": f"invalid document: {e.errors()}"}
+
+
+def parse_ndjson_line(line: str) -> Dict[str, Any]:
+    try:
+        return parse_document_item(json.loads(line))
+    except json.JSONDecodeError as e:
+        return {"error": f"invalid json line: {e}"}
+
+
+def is_ndjson(content_type: str) -> bool:
+    return "ndjson" in content_type or "jsonlines" in content_type
+
+
+def parse_batch_body(body: bytes, content_type: str) -> List[Dict[str, Any]]:
+    """
+    解析批量入库的请求体，支持 JSON 数组和 NDJSON（每行一个文档）
+
+    单个文档解析失败时返回 {"error": ...}，不影响其它文档
+    """
+    if is_ndjson(content_type):
+        return [
+            parse_ndjson_line(line)
+            for line in body.decode("utf-8").splitlines()
+            if line.strip()
+        ]
+
+    raw_items = json.loads(body)
+    if isinstance(raw_items, dict):
+        raw_items = raw_items.get("documents")
+    if not isinstance(raw_items, list):
+        raise ValueError("request body must be a JSON array of documents")
+    return [parse_document_item(raw_item) for raw_item in raw_items]
+
+
+async def stream_ndjson_items(request: Request) -> AsyncIterator[Dict[str, Any]]:
+    """
+    边接收请求体边解析 NDJSON，下游处理不过来时不再读取请求体
+    """
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield parse_ndjson_line(line.decode("utf-8"))
+    if buffer.strip():
+        yield parse_ndjson_line(buffer.decode("utf-8"))
+
+
+@router.post("/milvus/add/batch")
+async def add_documents_batch(
+    request: Request,
+    embed_batch_size: Optional[int] = Query(default=None, gt=0),
+    insert_batch_size: Optional[int] = Query(default=None, gt=0),
+    collection: Optional[str] = Query(default=None),
+):
+    """
+    批量添加文档到 Milvus
+
+    请求体为 JSON 数组（或 {"documents": [...]}），Content-Type 为 application/x-ndjson 时按行解析。
+    返回每个文档的入库结果，单个文档失败不影响整个请求。collection 为空时写入默认集合。
+    """
+    check_collection(collection)
+    try:
+        items = parse_batch_body(
+            await request.body(), request.headers.get("content-type", "")
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not items:
+        raise HTTPException(status_code=400, detail="No documents provided")
+    if len(items) > INGEST_MAX_DOCUMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many documents: {len(items)} > {INGEST_MAX_DOCUMENTS}",
+        )
+
+    try:
+        # 批量 embedding 和写入都是阻塞调用，放到线程池中执行
+        result = await run_in_threadpool(
+            ingest_documents, items, embed_batch_size, insert_batch_size, collection
+        )
+    except Exception as e:
+        log.error(f"Error adding documents: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if result["failed"] == 0:
+        status = "success"
+    elif result["succeeded"] == 0:
+        status = "failed"
+    else:
+        status = "partial"
+    return {"status": status, **result}
+
+
+async def sync_document_items(
+    items: List[Dict[str, Any]],
+    embed_batch_size: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    collection: Optional[str] = None,
+):
+    try:
+        result = await sync_documents(items, embed_batch_size, batch_size, collection)
+    except Exception as e:
+        log.error(f"Error syncing documents: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if result["failed"] == 0:
+        status = "success"
+    elif result["succeeded"] == 0:
+        status = "failed"
+    else:
+        status = "partial"
+    return {"status": status, **result}
+
+
+@router.post("/milvus/sync")
+async def sync_documents_batch(
+    request: Request,
+    embed_batch_size: Optional[int] = Query(default=None, gt=0),
+    batch_size: Optional[int] = Query(default=None, gt=0),
+    collection: Optional[str] = Query(default=None),
+):
+    """
+    按调用方的 doc_id 增量同步文档
+
+    请求体格式与 /milvus/add/batch 相同，每个文档必须带 doc_id。
+    未变化的 chunk 跳过，变化的 chunk upsert，新版本中已不存在的 chunk 删除；text 为空时删除整个文档。
+    """
+    check_collection(collection)
+    try:
+        items = parse_batch_body(
+            await request.body(), request.headers.get("content-type", "")
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not items:
+        raise HTTPException(status_code=400, detail="No documents provided")
+    if len(items) > INGEST_MAX_DOCUMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many documents: {len(items)} > {INGEST_MAX_DOCUMENTS}",
+        )
+    return await sync_document_items(items, embed_batch_size, batch_size, collection)
+
+
+@router.post("/milvus/ingest")
+async def ingest_documents_pipeline(
+    request: Request,
+    queue_size: Optional[int] = Query(default=None, gt=0),
+    split_workers: Optional[int] = Query(default=None, gt=0),
+    embed_workers: Optional[int] = Query(default=None, gt=0),
+    insert_workers: Optional[int] = Query(default=None, gt=0),
+    embed_batch_size: Optional[int] = Query(default=None, gt=0),
+    insert_batch_size: Optional[int] = Query(default=None, gt=0),
+    collection: Optional[str] = Query(default=None),
+):
+    """
+    流式入库：解析 -> 按 Settings.chunk_size 切分 -> 批量 embedding -> 批量写入 Milvus
+
+    NDJSON 请求体边接收边处理；返回每个文档的结果和各阶段的吞吐、队列深度
+    """
+    check_collection(collection)
+    options = {
+        "queue_size": queue_size,
+        "split_workers": split_workers,
+        "embed_workers": embed_workers,
+        "insert_workers": insert_workers,
+        "embed_batch_size": embed_batch_size,
+        "insert_batch_size": insert_batch_size,
+        "collection": collection,
+    }
+    pipeline = IngestionPipeline(
+        **{key: value for key, value in options.items() if value is not None}
+    )
+
+    content_type = request.headers.get("content-type", "")
+    if is_ndjson(content_type):
+        items = stream_ndjson_items(request)
+    else:
+        try:
+            parsed = parse_batch_body(await request.body(), content_type)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        async def iter_items():
+            for item in parsed:
+                yield item
+
+        items = iter_items()
+
+    try:
+        result = await pipeline.run(items)
+    except Exception as e:
+        log.error(f"Error ingesting documents: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if result["failed"] == 0:
+        status = "success"
+    elif result["succeeded"] == 0:
+        status = "failed"
+    else:
+        status = "partial"
+    return {"status": status, **result}
+
+
+@router.get("/milvus/ingest/stats")
+async def get_ingestion_stats():
+    """
+    获取正在运行的入库流水线各阶段的实时统计
+    """
+    return {
+        "status": "success",
+        "pipelines": {
+            pipeline_id: pipeline.stats()
+            for pipeline_id, pipeline in IngestionPipeline.running.items()
+        },
+    }
+
+
+def search_response(
+    search_input: SearchInput, results: List[dict], cache: Optional[str] = None
+) -> dict:
+    return {
+        "status": "success",
+        "query": search_input.query_text,
+        "mode": search_input.mode,
+        "results": results,
+        "cache": cache,  # 命中缓存时为 exact 或 semantic
+    }
+
+
 @router.post("/milvus/search")
 async def search_documents(search_input: SearchInput):
     """
     搜索相似文档
+
+    传入 query_embedding 时直接使用该向量检索，否则对 query_text 生成一次嵌入向量；
+    keyword 和 hybrid 模式需要 query_text，不使用检索结果缓存
     """
+    if search_input.query_embedding is None and not search_input.query_text:
+        raise HTTPException(
+            status_code=400, detail="query_text or query_embedding is required"
+        )
+    if search_input.mode != "dense" and not search_input.query_text:
+        raise HTTPException(
+            status_code=400,
+            detail=f"query_text is required in {search_input.mode} mode",
+        )
+
+    check_collection(search_input.collection)
+
     try:
-        vector_store = MilvusManager.get_vector_store()
+        vector_store = MilvusManager.get_vector_store(search_input.collection)
         if not vector_store:
             raise HTTPException(
                 status_code=500, detail="Milvus vector store not initialized"
             )
 
-        # 获取查询文本的嵌入向量
-        embedding = EmbeddingManager.get_embedding(search_input.query_text)
-        if not embedding:
-            raise HTTPException(status_code=500, detail="Failed to generate embedding")
+        if search_input.mode == "keyword":
+            results = await keyword_search(
+                search_input.query_text, search_input.top_k, search_input.collection
+            )
+            return search_response(search_input, results)
+        if search_input.mode == "hybrid":
+            results = await hybrid_search(
+                search_input.query_text,
+                search_input.top_k,
+                embedding=search_input.query_embedding,
+                dense_weight=search_input.dense_weight,
+                keyword_weight=search_input.keyword_weight,
+                ef=search_input.ef,
+                nprobe=search_input.nprobe,
+                rerank=search_input.rerank,
+                collection=search_input.collection,
+            )
+            return search_response(search_input, results)
 
-        # 执行向量搜索
-        results = vector_store.similarity_search(
-            search_input.query_text,
-            k=search_input.top_k,
+        # 指定了检索参数时结果与默认参数不同，不读写缓存
+        use_cache = (
+            search_input.ef is None
+            and search_input.nprobe is None
+            and search_input.rerank is None
         )
+        # 每个集合的缓存独立；在检索前记录缓存代数，检索期间有写入时结果不再写回缓存
+        search_cache = get_search_cache(vector_store.collection_name)
+        generation = search_cache.generation
+        if use_cache and search_input.query_text:
+            cached = search_cache.get_exact(search_input.query_text, search_input.top_k)
+            if cached is not None:
+                return search_response(search_input, cached, "exact")
 
-        # 格式化结果
-        formatted_results = []
-        for doc in results:
-            formatted_results.append(
-                {
-                    "text": doc.text,
-                    "metadata": doc.metadata,
-                    "score": getattr(doc, "score", None),  # 如果有相似度分数
-                }
+        embedding = search_input.query_embedding
+        if embedding is None:
+            # 获取查询文本的嵌入向量
+            embedding = await EmbeddingManager.aget_embedding(
+                search_input.query_text, search_input.collection
             )
+            if not embedding:
+                raise HTTPException(
+                    status_code=500, detail="Failed to generate embedding"
+                )
 
-        return {
-            "status": "success",
-            "query": search_input.query_text,
-            "results": formatted_results,
-        }
+        if use_cache:
+            cached = search_cache.get_semantic(embedding, search_input.top_k)
+            if cached is not None:
+                return search_response(search_input, cached, "semantic")
+
+        # 使用已计算好的向量执行检索，避免向量存储再次生成嵌入
+        formatted_results = await dense_search(
+            search_input.top_k,
+            embedding=embedding,
+            ef=search_input.ef,
+            nprobe=search_input.nprobe,
+            rerank=search_input.rerank,
+            collection=search_input.collection,
+        )
+
+        if use_cache:
+            search_cache.put(
+                search_input.query_text,
+                embedding,
+                search_input.top_k,
+                formatted_results,
+                generation,
+            )
+        return search_response(search_input, formatted_results)
+    except HTTPException:
+        raise
     except Exception as e:
         log.error(f"Error searching documents: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -108,7 +474,9 @@ async def get_milvus_status():
     """
     try:
         # 获取所有集合
-        collections = MilvusManager.list_collections()
+        collections = await MilvusExecutor.arun(
+            ADMIN, lambda _: MilvusManager.list_collections()
+        )
 
         # 获取当前使用的集合
         vector_store = MilvusManager.get_vector_store()
@@ -118,19 +486,181 @@ async def get_milvus_status():
             "status": "success",
             "collections": collections,
             "current_collection": current_collection,
+            "index_type": MilvusManager.get_index_type(),
+            "vector_type": MilvusManager.get_vector_type(),
+            # 已加载的集合及其 embedding 模型
+            "loaded_collections": [
+                {
+                    "name": name,
+                    "embedding_model": CollectionRegistry.get(name).embeddingModel,
+                    "dim": MilvusManager.get_dim(name),
+                    "index_type": MilvusManager.get_index_type(name),
+                    "vector_type": MilvusManager.get_vector_type(name),
+                }
+                for name in MilvusManager.get_collection_names()
+            ],
         }
     except Exception as e:
         log.error(f"Error getting Milvus status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/embedding/cache/stats")
+async def get_embedding_cache_stats(collection: Optional[str] = Query(default=None)):
+    """
+    获取集合对应 embedding 模型的缓存命中统计，collection 为空时为默认集合
+    """
+    check_collection(collection)
+    return {"status": "success", "stats": EmbeddingManager.get_cache_stats(collection)}
+
+
+@router.get("/embedding/batch/stats")
+async def get_embedding_batch_stats(collection: Optional[str] = Query(default=None)):
+    """
+    获取集合对应 embedding 模型的请求合批的批大小和排队耗时统计
+    """
+    check_collection(collection)
+    return {"status": "success", "stats": EmbeddingManager.get_batch_stats(collection)}
+
+
+@router.get("/embedding/models")
+async def get_embedding_models():
+    """
+    获取已加载的 embedding 模型，以及每个集合使用的模型和维度
+    """
+    return {
+        "status": "success",
+        "models": EmbeddingManager.get_models_stats(),
+        "collections": {
+            config.collectionName: {
+                "embedding_model": config.embeddingModel,
+                "dim": config.dim,
+                "matryoshka": config.matryoshka,
+            }
+            for config in CollectionRegistry.list()
+        },
+    }
+
+
+@router.get("/ollama/pool/stats")
+async def get_ollama_pool_stats():
+    """
+    获取 Ollama 连接池的在途请求数、连接数和饱和度
+    """
+    return {"status": "success", "stats": OllamaPoolManager.get_stats()}
+
+
+@router.get("/milvus/keyword/stats")
+async def get_keyword_index_stats(collection: Optional[str] = Query(default=None)):
+    """
+    获取集合的 BM25 关键词索引的文档数和词数
+    """
+    check_collection(collection)
+    return {"status": "success", "stats": KeywordIndexManager.get_stats(collection)}
+
+
+@router.get("/milvus/executor/stats")
+async def get_milvus_executor_stats():
+    """
+    获取 Milvus 各类操作线程池的并发数、排队数和最长排队耗时
+    """
+    return {"status": "success", "stats": MilvusExecutor.get_stats()}
+
+
+@router.get("/milvus/search/cache/stats")
+async def get_search_cache_stats(collection: Optional[str] = Query(default=None)):
+    """
+    获取集合的检索结果缓存命中统计
+    """
+    check_collection(collection)
+    name = MilvusManager.get_collection_name(collection)
+    return {"status": "success", "stats": get_search_cache(name).stats()}
+
+
 @router.get("/milvus/data")
-async def get_collection_data():
+async def export_collection_data(
+    fields: Optional[str] = Query(default=None),
+    filter: str = Query(default=""),
+    cursor: Optional[str] = Query(default=None),
+    limit: Optional[int] = Query(default=None, gt=0),
+    batch_size: Optional[int] = Query(default=None, gt=0, le=16384),
+    collection: Optional[str] = Query(default=None),
+):
     """
-    获取集合中的数据
+    以 NDJSON 流式导出集合数据，每行一条记录
+
+    - collection：导出的集合，默认为默认集合
+    - fields：逗号分隔的输出字段，默认为除向量外的全部字段
+    - filter：Milvus 过滤表达式
+    - cursor / limit：分页导出，记录按主键升序返回，下一页的 cursor 为本页最后一条记录的主键
+    - batch_size：每次从 Milvus 读取的行数，内存中只保留一批数据
+
+    导出中途出错时最后一行为 {"error": ...}
+    """
+    check_collection(collection)
+    field_list = [field.strip() for field in (fields or "").split(",") if field.strip()]
+    try:
+        export = await CollectionExport.open(
+            fields=field_list or None,
+            filter_expr=filter,
+            cursor=cursor,
+            limit=limit,
+            batch_size=batch_size,
+            collection=collection,
+        )
+    except MilvusException as e:
+        # 过滤表达式不合法等
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        log.error(f"Error exporting collection data: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def ndjson():
+        try:
+            async for rows in export.batches():
+                yield "".join(encode_row(row) for row in rows)
+        except Exception as e:
+            log.error(f"Error exporting collection data after {export.count} rows: {e}")
+            yield encode_row({"error": str(e)})
+        else:
+            log.info(
+                f"export collection data rows: {export.count}, last id: {export.last_id}"
+            )
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+class SnapshotInput(BaseModel):
+    # 快照目录名，保存在 MILVUS_SNAPSHOT_DIR 下
+    name: str = Field(pattern=r"^[\w.-]+$")
+    # 导出的集合，为空时导出默认集合
+    collection: Optional[str] = None
+
+
+@router.post("/milvus/snapshot/export")
+async def export_collection_snapshot(snapshot_input: SnapshotInput):
+    """
+    将集合导出为 parquet + npy 快照，用 app.serives.collection_snapshot 导入到新集合
     """
+    check_collection(snapshot_input.collection)
+    vector_store = MilvusManager.get_vector_store(snapshot_input.collection)
+    if not vector_store:
+        raise HTTPException(
+            status_code=500, detail="Milvus vector store not initialized"
+        )
+    output_dir = os.path.join(MILVUS_SNAPSHOT_DIR, snapshot_input.name)
+    if os.path.exists(output_dir):
+        raise HTTPException(
+            status_code=400, detail=f"Snapshot {snapshot_input.name} already exists"
+        )
     try:
-        data = MilvusManager.show_collection_info()
-        return {"status": "success", "data": data}
+        manifest = await MilvusExecutor.arun(
+            ADMIN,
+            lambda connection: export_snapshot(
+                connection.client, vector_store.collection_name, output_dir
+            ),
+        )
+        return {"status": "success", "path": output_dir, "manifest": manifest}
     except Exception as e:
-        return {"status": "error", "message": str(e)}
+        log.error(f"Error exporting snapshot: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
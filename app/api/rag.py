@@ -0,0 +1,134 @@
+# app/api/rag.py
+import json
+import time
+from typing import Any
+
+from fastapi import APIRouter, HTTPException
+from llama_index.core.settings import Settings
+from pydantic import BaseModel, Field
+from starlette.responses import StreamingResponse
+
+from app.serives.rag_service import build_prompt, rag_metrics, retrieve
+from app.utils.log import log
+from app.utils.metrics import (
+    ERRORS,
+    LLM_GENERATED_TOKENS,
+    LLM_GENERATION_DURATION,
+    LLM_TIME_TO_FIRST_TOKEN,
+)
+from app.utils.tracing import tracer
+
+router = APIRouter()
+
+
+class RagQueryInput(BaseModel):
+    query: str = Field(min_length=1)
+    top_k: int = Field(default=5, gt=0)
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/rag/query/stream")
+async def rag_query_stream(query_input: RagQueryInput):
+    """
+    RAG 问答，以 Server-Sent Events 流式返回
+
+    事件顺序: sources（检索到的片段） -> token（逐段生成的内容） -> done（耗时统计）或 error
+    """
+    start_time = time.perf_counter()
+    try:
+        llm = Settings.llm
+        sources = await retrieve(query_input.query, query_input.top_k)
+    except Exception as e:
+        log.error(f"Error retrieving for rag query: {e}")
+        rag_metrics.record(0, None, 0, 0, None, failed=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    retrieval_ms = (time.perf_counter() - start_time) * 1000
+    prompt = build_prompt(query_input.query, sources)
+
+    async def event_stream():
+        ttft_ms = None
+        first_token_time = None
+        tokens = 0
+        eval_count = None
+        failed = False
+        error = None
+        yield sse_event("sources", sources)
+        generation_start = time.perf_counter()
+        generation_start_ns = time.time_ns()
+        try:
+            response_gen = await llm.astream_complete(prompt)
+            async for response in response_gen:
+                # Ollama 在最后一个 delta 为空的分片中返回准确的生成 token 数
+                if isinstance(response.raw, dict) and response.raw.get("eval_count"):
+                    eval_count = response.raw["eval_count"]
+                if not response.delta:
+                    continue
+                if first_token_time is None:
+                    first_token_time = time.perf_counter()
+                    ttft_ms = (first_token_time - start_time) * 1000
+                tokens += 1
+                yield sse_event("token", {"delta": response.delta})
+        except Exception as e:
+            failed = True
+            error = str(e)
+            ERRORS.labels("llm").inc()
+            log.error(f"Error streaming rag answer: {e}")
+            yield sse_event("error", {"message": str(e)})
+
+        end_time = time.perf_counter()
+        tokens = eval_count or tokens
+        model = getattr(llm, "model", None) or type(llm).__name__
+        LLM_GENERATION_DURATION.labels(model).observe(end_time - generation_start)
+        LLM_GENERATED_TOKENS.labels(model).inc(tokens)
+        if first_token_time is not None:
+            LLM_TIME_TO_FIRST_TOKEN.labels(model).observe(
+                first_token_time - generation_start
+            )
+        tracer.record_span(
+            "llm.generate",
+            generation_start_ns,
+            time.time_ns(),
+            {
+                "llm.model": model,
+                "llm.tokens": tokens,
+                "llm.ttft_ms": (
+                    round((first_token_time - generation_start) * 1000, 2)
+                    if first_token_time is not None
+                    else -1
+                ),
+            },
+            error=error,
+        )
+        tokens_per_second = None
+        if first_token_time is not None and end_time > first_token_time:
+            tokens_per_second = tokens / (end_time - first_token_time)
+        metrics = {
+            "retrieval_ms": round(retrieval_ms, 2),
+            "ttft_ms": round(ttft_ms, 2) if ttft_ms is not None else None,
+            "total_ms": round((end_time - start_time) * 1000, 2),
+            "tokens": tokens,
+            "tokens_per_second": (
+                round(tokens_per_second, 2) if tokens_per_second is not None else None
+            ),
+        }
+        rag_metrics.record(failed=failed, **metrics)
+        log.info(f"rag query stream metrics: {metrics}")
+        if not failed:
+            yield sse_event("done", metrics)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/rag/metrics")
+async def get_rag_metrics():
+    """
+    获取最近 RAG 请求的首 token 耗时、生成速度和总耗时分位数
+    """
+    return {"status": "success", "metrics": rag_metrics.summary()}
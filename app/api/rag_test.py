@@ -0,0 +1,110 @@
+# app/api/rag_test.py
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from app.api import rag
+
+SOURCES = [{"id": "1", "text": "Milvus stores vectors.", "score": 0.9}]
+
+
+class FakeLLM:
+    """按分片流式返回的假 LLM，fail_after 个分片后抛出异常"""
+
+    model = "fake"
+
+    def __init__(self, deltas, fail_after=None):
+        self.deltas = deltas
+        self.fail_after = fail_after
+        self.prompts = []
+
+    async def astream_complete(self, prompt):
+        self.prompts.append(prompt)
+
+        async def gen():
+            for i, delta in enumerate(self.deltas):
+                if self.fail_after is not None and i >= self.fail_after:
+                    raise RuntimeError("ollama disconnected")
+                yield SimpleNamespace(delta=delta, raw={"done": False})
+            # 与 Ollama 一致：最后的 done 分片 delta 为空，只有它带 eval_count
+            yield SimpleNamespace(delta="", raw={"done": True, "eval_count": 7})
+
+        return gen()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def retrieve(query, top_k):
+        return SOURCES[:top_k]
+
+    monkeypatch.setattr(rag, "retrieve", retrieve)
+    app = FastAPI()
+    app.include_router(rag.router, prefix="/api")
+    return TestClient(app)
+
+
+def stream_events(client, llm, monkeypatch, **body):
+    monkeypatch.setattr(rag, "Settings", SimpleNamespace(llm=llm))
+    with client.stream(
+        "POST", "/api/rag/query/stream", json={"query": "what is milvus", **body}
+    ) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        text = "".join(response.iter_text())
+    events = []
+    for block in text.strip().split("\n\n"):
+        event_line, data_line = block.split("\n")
+        events.append(
+            (event_line[len("event: ") :], json.loads(data_line[len("data: ") :]))
+        )
+    return events
+
+
+def test_stream_sends_sources_tokens_and_metrics(client, monkeypatch):
+    llm = FakeLLM(["Milvus", "", " stores", " vectors."])
+    events = stream_events(client, llm, monkeypatch)
+    assert [name for name, _ in events] == [
+        "sources",
+        "token",
+        "token",
+        "token",
+        "done",
+    ]
+    assert events[0][1] == SOURCES
+    assert "".join(data["delta"] for name, data in events if name == "token") == (
+        "Milvus stores vectors."
+    )
+    # 使用 Ollama 返回的生成 token 数
+    assert events[-1][1]["tokens"] == 7
+    assert events[-1][1]["ttft_ms"] is not None
+    assert "Milvus stores vectors." in llm.prompts[0]
+
+
+def test_stream_reports_llm_error(client, monkeypatch):
+    failed_before = rag.rag_metrics.failed_requests
+    events = stream_events(client, FakeLLM(["a", "b", "c"], fail_after=1), monkeypatch)
+    assert [name for name, _ in events] == ["sources", "token", "error"]
+    assert events[-1][1]["message"] == "ollama disconnected"
+    assert rag.rag_metrics.failed_requests == failed_before + 1
+
+
+def test_retrieval_failure_returns_500(client, monkeypatch):
+    async def retrieve(query, top_k):
+        raise RuntimeError("milvus unavailable")
+
+    monkeypatch.setattr(rag, "retrieve", retrieve)
+    monkeypatch.setattr(rag, "Settings", SimpleNamespace(llm=FakeLLM(["a"])))
+    response = client.post("/api/rag/query/stream", json={"query": "q"})
+    assert response.status_code == 500
+    assert response.json()["detail"] == "milvus unavailable"
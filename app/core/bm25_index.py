@@ -0,0 +1,184 @@
+# app/core/bm25_index.py
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 英文、数字组成的词，保留错误码、版本号等以 - . : / 连接的整体；中文连续片段单独处理
+_TOKEN_PATTERN = re.compile(r"[0-9a-z_]+(?:[-.:/][0-9a-z_]+)*|[\u4e00-\u9fff]+")
+_TOKEN_SEPARATOR = re.compile(r"[-.:/]")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    分词：英文按词切分，带连接符的标识符同时保留整体和各部分；中文使用单字和双字
+    """
+    tokens = []
+    for match in _TOKEN_PATTERN.findall(text.lower()):
+        if "\u4e00" <= match[0] <= "\u9fff":
+            tokens.extend(match)
+            tokens.extend(match[i : i + 2] for i in range(len(match) - 1))
+            continue
+        tokens.append(match)
+        if _TOKEN_SEPARATOR.search(match):
+            tokens.extend(part for part in _TOKEN_SEPARATOR.split(match) if part)
+    return tokens
+
+
+class BM25Index:
+    """
+    内存中的 BM25 倒排索引
+
+    每个词的倒排表使用两个 array 存储文档序号和词频，文档逐条追加；
+    删除或覆盖文档时只做标记并从 df 中扣除，标记的文档过多时整体重建。
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._term_ids: Dict[str, int] = {}
+        self._postings_docs: List[array] = []
+        self._postings_tfs: List[array] = []
+        # 每个词的倒排表中已删除文档的数量，计算 df 时扣除
+        self._deleted_dfs = array("I")
+        self._doc_lengths = array("I")
+        self._doc_ids: List[str] = []
+        # (文本, 元数据)，删除后为 None
+        self._documents: List[Optional[Tuple[str, Dict[str, Any]]]] = []
+        self._id_to_index: Dict[str, int] = {}
+        self._deleted_indices = array("I")
+        self._total_length = 0
+        self._lengths_cache: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._id_to_index)
+
+    def add(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        """
+        添加文档，id 已存在时覆盖
+        """
+        with self._lock:
+            self._add(doc_id, text, metadata or {})
+
+    def add_many(self, documents: List[Tuple[str, str, Dict[str, Any]]]):
+        with self._lock:
+            for doc_id, text, metadata in documents:
+                self._add(doc_id, text, metadata or {})
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            removed = self._remove(doc_id)
+            self._maybe_compact()
+            return removed
+
+    def search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """
+        返回 BM25 得分最高的 top_k 个文档，按得分降序
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            live = len(self._id_to_index)
+            if not live or not terms:
+                return []
+            if self._lengths_cache is None:
+                self._lengths_cache = np.array(self._doc_lengths, dtype=np.float32)
+            lengths = self._lengths_cache
+            avg_length = self._total_length / live
+            scores = np.zeros(len(self._doc_ids), dtype=np.float32)
+            for term in terms:
+                term_id = self._term_ids.get(term)
+                if term_id is None:
+                    continue
+                docs = np.array(self._postings_docs[term_id], dtype=np.int64)
+                tfs = np.array(self._postings_tfs[term_id], dtype=np.float32)
+                df = len(docs) - self._deleted_dfs[term_id]
+                if df <= 0:
+                    continue
+                idf = math.log(1 + (live - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths[docs] / avg_length)
+                scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+            if self._deleted_indices:
+                scores[np.array(self._deleted_indices, dtype=np.int64)] = 0
+
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > top_k:
+                top = np.argpartition(-scores[candidates], top_k - 1)[:top_k]
+                candidates = candidates[top]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+            results = []
+            for index in candidates:
+                document = self._documents[index]
+                results.append(
+                    {
+                        "id": self._doc_ids[index],
+                        "text": document[0],
+                        "metadata": document[1],
+                        "score": float(scores[index]),
+                    }
+                )
+            return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "documents": len(self._id_to_index),
+                "deleted": len(self._deleted_indices),
+                "terms": len(self._term_ids),
+                "postings": sum(len(postings) for postings in self._postings_docs),
+            }
+
+    def _add(self, doc_id: str, text: str, metadata: Dict[str, Any]):
+        self._remove(doc_id)
+        index = len(self._doc_ids)
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            term_id = self._term_ids.get(term)
+            if term_id is None:
+                term_id = len(self._postings_docs)
+                self._term_ids[term] = term_id
+                self._postings_docs.append(array("I"))
+                self._postings_tfs.append(array("I"))
+                self._deleted_dfs.append(0)
+            self._postings_docs[term_id].append(index)
+            self._postings_tfs[term_id].append(tf)
+        length = sum(counts.values())
+        self._doc_lengths.append(length)
+        self._doc_ids.append(doc_id)
+        self._documents.append((text, metadata))
+        self._id_to_index[doc_id] = index
+        self._total_length += length
+        self._lengths_cache = None
+        self._maybe_compact()
+
+    def _remove(self, doc_id: str) -> bool:
+        index = self._id_to_index.pop(doc_id, None)
+        if index is None:
+            return False
+        for term in set(tokenize(self._documents[index][0])):
+            self._deleted_dfs[self._term_ids[term]] += 1
+        self._documents[index] = None
+        self._total_length -= self._doc_lengths[index]
+        self._deleted_indices.append(index)
+        return True
+
+    def _maybe_compact(self):
+        # 已删除的文档超过一半时重建，回收倒排表空间
+        deleted = len(self._deleted_indices)
+        if deleted < 1000 or deleted * 2 < len(self._doc_ids):
+            return
+        live = [
+            (doc_id, self._documents[index])
+            for doc_id, index in self._id_to_index.items()
+        ]
+        self._reset()
+        for doc_id, (text, metadata) in live:
+            self._add(doc_id, text, metadata)
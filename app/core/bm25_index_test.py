@@ -0,0 +1,93 @@
+# app/core/bm25_index_test.py
+import os
+import sys
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from app.core.bm25_index import BM25Index, tokenize
+from app.serives.retrieval import reciprocal_rank_fusion
+
+DOCUMENTS = [
+    ("d1", "Error ERR-4021 occurs when the license server is unreachable", {}),
+    ("d2", "Restart the license server to clear most errors", {"source": "faq"}),
+    ("d3", "The QX-900 printer supports duplex printing", {}),
+    ("d4", "重置密码需要联系管理员", {}),
+]
+
+
+def test_tokenize_keeps_identifiers_and_chinese():
+    assert tokenize("ERR-4021 on v1.2") == [
+        "err-4021",
+        "err",
+        "4021",
+        "on",
+        "v1.2",
+        "v1",
+        "2",
+    ]
+    assert tokenize("重置密码") == ["重", "置", "密", "码", "重置", "置密", "密码"]
+
+
+def test_search_ranks_exact_identifier_first():
+    index = BM25Index()
+    index.add_many(DOCUMENTS)
+
+    results = index.search("err-4021", 3)
+    assert results[0]["id"] == "d1"
+    assert [r["id"] for r in index.search("QX-900 printer", 2)] == ["d3"]
+    assert index.search("密码", 1)[0]["id"] == "d4"
+    assert index.search("restart", 5)[0]["metadata"] == {"source": "faq"}
+    assert index.search("nothing matches", 5) == []
+
+
+def test_overwrite_and_remove():
+    index = BM25Index()
+    index.add_many(DOCUMENTS)
+    index.add("d3", "The QX-900 printer was discontinued")
+    assert len(index) == 4
+    assert index.search("duplex", 5) == []
+    assert index.search("discontinued", 5)[0]["id"] == "d3"
+
+    assert index.remove("d1")
+    assert not index.remove("d1")
+    assert [r["id"] for r in index.search("license", 5)] == ["d2"]
+    assert index.stats()["deleted"] == 2
+
+
+def test_deleted_documents_do_not_count_in_idf():
+    index = BM25Index()
+    index.add_many(DOCUMENTS)
+    index.add("d5", "license server license")
+    index.remove("d1")
+    index.add("d2", "Restart the server to clear most errors")
+
+    # 与只包含存活文档的新索引得分一致
+    fresh = BM25Index()
+    fresh.add_many([DOCUMENTS[2], DOCUMENTS[3]])
+    fresh.add("d5", "license server license")
+    fresh.add("d2", "Restart the server to clear most errors")
+    for query in ("license server", "restart errors", "printer"):
+        assert [(r["id"], round(r["score"], 5)) for r in index.search(query, 5)] == [
+            (r["id"], round(r["score"], 5)) for r in fresh.search(query, 5)
+        ]
+
+
+def test_reciprocal_rank_fusion_weights():
+    dense = [{"id": i, "text": i, "metadata": {}} for i in ("a", "b", "c")]
+    keyword = [{"id": i, "text": i, "metadata": {}} for i in ("c", "d")]
+
+    fused = reciprocal_rank_fusion(
+        {"dense": dense, "keyword": keyword}, {"dense": 1.0, "keyword": 1.0}, 3
+    )
+    # c 同时出现在两路结果中
+    assert fused[0]["id"] == "c"
+    assert fused[0]["ranks"] == {"dense": 3, "keyword": 1}
+    assert len(fused) == 3
+
+    fused = reciprocal_rank_fusion(
+        {"dense": dense, "keyword": keyword}, {"dense": 1.0, "keyword": 0.0}, 4
+    )
+    assert [item["id"] for item in fused][:3] == ["a", "b", "c"]
@@ -0,0 +1,98 @@
+# app/core/vector_quantization.py
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+FLOAT_VECTOR = "FLOAT_VECTOR"
+FLOAT16_VECTOR = "FLOAT16_VECTOR"
+BFLOAT16_VECTOR = "BFLOAT16_VECTOR"
+# 向量字段类型 -> 每维字节数
+VECTOR_TYPE_BYTES = {FLOAT_VECTOR: 4, FLOAT16_VECTOR: 2, BFLOAT16_VECTOR: 2}
+# HNSW_SQ 的量化类型 -> 每维字节数
+_SQ_TYPE_BYTES = {"SQ6": 0.75, "SQ8": 1, "FP16": 2, "BF16": 2}
+
+
+def encode_vector(
+    vector: Sequence[float], vector_type: str, as_bytes: bool = False
+) -> Any:
+    """
+    转换为 pymilvus 检索半精度向量字段时接受的查询向量格式
+
+    float16 使用 numpy 数组；numpy 没有 bfloat16 类型，按 float32 的高 16 位就近舍入后传入字节。
+    as_bytes 为 True 时 float16 也返回小端字节串，用于写入向量字段
+    """
+    if vector_type == FLOAT16_VECTOR:
+        array = np.asarray(vector, dtype="<f2")
+        return array.tobytes() if as_bytes else array
+    if vector_type == BFLOAT16_VECTOR:
+        bits = np.asarray(vector, dtype=np.float32).view(np.uint32)
+        bits = bits + (0x7FFF + ((bits >> 16) & 1))
+        return (bits >> 16).astype(np.uint16).tobytes()
+    return vector
+
+
+def decode_vector(value: Any, vector_type: str) -> np.ndarray:
+    """
+    将 Milvus 返回的向量转换为 float32 数组
+    """
+    if (
+        isinstance(value, (list, tuple))
+        and len(value) == 1
+        and isinstance(value[0], (bytes, bytearray))
+    ):
+        value = value[0]
+    if isinstance(value, (bytes, bytearray)):
+        if vector_type == BFLOAT16_VECTOR:
+            bits = np.frombuffer(value, dtype=np.uint16).astype(np.uint32) << 16
+            return bits.view(np.float32)
+        return np.frombuffer(value, dtype=np.float16).astype(np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+def exact_scores(
+    query: Sequence[float], vectors: np.ndarray, metric: str
+) -> np.ndarray:
+    """
+    按 Milvus 的度量计算精确得分：COSINE / IP 为相似度，L2 为距离的平方
+    """
+    query = np.asarray(query, dtype=np.float32)
+    if metric == "L2":
+        return ((vectors - query) ** 2).sum(axis=1)
+    if metric == "COSINE":
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+        return (vectors @ query) / np.maximum(norms, 1e-12)
+    return vectors @ query
+
+
+def rerank_order(scores: np.ndarray, metric: str, top_k: int) -> List[int]:
+    """
+    按精确得分排序后的前 top_k 个候选的下标，L2 距离越小越靠前
+    """
+    order = np.argsort(scores if metric == "L2" else -scores, kind="stable")
+    return order[:top_k].tolist()
+
+
+def bytes_per_vector(
+    dim: int,
+    vector_type: str = FLOAT_VECTOR,
+    index_type: Optional[str] = None,
+    index_params: Optional[Dict[str, Any]] = None,
+) -> int:
+    """
+    估算每条向量在查询节点上常驻内存的字节数
+
+    SQ8 / PQ 索引只加载量化后的编码，原始向量留在对象存储中；
+    其它索引加载原始精度的向量，HNSW 系列另加每层约 2 * M 个邻居的图结构
+    """
+    index_params = index_params or {}
+    if index_type == "IVF_SQ8":
+        return dim
+    if index_type == "IVF_PQ":
+        return index_params.get("m", dim // 4) * index_params.get("nbits", 8) // 8
+    if index_type == "HNSW_SQ":
+        size = dim * _SQ_TYPE_BYTES.get(index_params.get("sq_type", "SQ8"), 1)
+    else:
+        size = dim * VECTOR_TYPE_BYTES.get(vector_type, 4)
+    if (index_type or "").startswith("HNSW"):
+        size += 2 * index_params.get("M", 16) * 4
+    return int(size)
@@ -0,0 +1,49 @@
+# app/core/vector_quantization_test.py
+import os
+import sys
+
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from app.core.vector_quantization import (
+    BFLOAT16_VECTOR,
+    FLOAT16_VECTOR,
+    FLOAT_VECTOR,
+    bytes_per_vector,
+    decode_vector,
+    encode_vector,
+    exact_scores,
+    rerank_order,
+)
+
+rng = np.random.default_rng(0)
+
+
+def test_half_precision_round_trip():
+    vector = rng.standard_normal(768).astype(np.float32)
+    for vector_type, tolerance in ((FLOAT16_VECTOR, 1e-3), (BFLOAT16_VECTOR, 1e-2)):
+        encoded = encode_vector(vector.tolist(), vector_type)
+        raw = encoded if isinstance(encoded, bytes) else encoded.tobytes()
+        assert len(raw) == 768 * 2
+        decoded = decode_vector(raw, vector_type)
+        assert np.allclose(decoded, vector, rtol=tolerance, atol=tolerance)
+    assert encode_vector([1.0, 2.0], FLOAT_VECTOR) == [1.0, 2.0]
+
+
+def test_rerank_order_follows_metric():
+    query = np.array([1.0, 0.0], dtype=np.float32)
+    vectors = np.array([[0.0, 1.0], [2.0, 0.1], [1.0, 0.0]], dtype=np.float32)
+    assert rerank_order(exact_scores(query, vectors, "COSINE"), "COSINE", 2) == [2, 1]
+    assert rerank_order(exact_scores(query, vectors, "IP"), "IP", 2) == [1, 2]
+    assert rerank_order(exact_scores(query, vectors, "L2"), "L2", 2) == [2, 1]
+
+
+def test_quantized_storage_is_smaller():
+    full = bytes_per_vector(768, FLOAT_VECTOR, "HNSW", {"M": 16})
+    assert bytes_per_vector(768, FLOAT16_VECTOR, "HNSW", {"M": 16}) < full
+    assert bytes_per_vector(768, FLOAT_VECTOR, "HNSW_SQ", {"M": 16}) < full / 3
+    assert bytes_per_vector(768, FLOAT_VECTOR, "IVF_PQ", {"m": 16, "nbits": 8}) == 16
@@ -0,0 +1,195 @@
+import asyncio
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+from app.utils.log import log
+
+
+class _PendingBatch:
+    def __init__(self):
+        # (文本, 等待结果的 future, 入队时间)
+        self.items: List[Tuple[str, asyncio.Future, float]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+    def cancel_waiters(self):
+        """
+        取消仍在等待结果的调用方，避免批次任务被取消或返回的向量不足时一直等待
+        """
+        for _, future, _ in self.items:
+            if not future.done():
+                future.cancel()
+
+
+class BatchStats:
+    """
+    合并批次的统计：批大小和排队等待时间
+    """
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._batch_sizes = deque(maxlen=window)
+        self._queue_delays = deque(maxlen=window)
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+
+    def record(self, size: int, queue_delays: List[float], failed: bool):
+        with self._lock:
+            self.batches += 1
+            self.items += size
+            if failed:
+                self.errors += 1
+            self._batch_sizes.append(size)
+            self._queue_delays.extend(queue_delays)
+
+    @staticmethod
+    def _summary(values: List[float]) -> Dict[str, Optional[float]]:
+        if not values:
+            return {"avg": None, "p50": None, "p95": None, "max": None}
+        values = sorted(values)
+        return {
+            "avg": round(sum(values) / len(values), 2),
+            "p50": round(values[int(0.5 * (len(values) - 1))], 2),
+            "p95": round(values[int(0.95 * (len(values) - 1))], 2),
+            "max": round(values[-1], 2),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            batch_sizes = list(self._batch_sizes)
+            queue_delays = list(self._queue_delays)
+            result = {
+                "batches": self.batches,
+                "items": self.items,
+                "errors": self.errors,
+            }
+        result["batch_size"] = self._summary(batch_sizes)
+        result["queue_delay_ms"] = self._summary(queue_delays)
+        return result
+
+
+class CustomBatchingEmbeddingWrapper(BaseEmbedding):
+    """A wrapper class for BaseEmbedding to merge concurrent single-text async calls into batched calls.
+
+    Requests are collected for up to max_wait_ms or until max_batch_size, then sent as one batch.
+    Batched calls and sync calls are passed through unchanged.
+    """
+
+    _embed: BaseEmbedding = PrivateAttr()
+    _max_batch_size: int = PrivateAttr()
+    _max_wait: float = PrivateAttr()
+    _batch_queries: bool = PrivateAttr()
+    # 每个事件循环各自攒批
+    _pending: weakref.WeakKeyDictionary = PrivateAttr()
+    # 事件循环只弱引用任务，保存在这里直到批次完成
+    _tasks: set = PrivateAttr()
+    _stats: BatchStats = PrivateAttr()
+
+    def __init__(
+        self,
+        embed: BaseEmbedding,
+        max_batch_size: int,
+        max_wait_ms: float,
+        **kwargs,
+    ) -> None:
+        super().__init__(
+            model_name=embed.model_name,
+            embed_batch_size=embed.embed_batch_size,
+            **kwargs,
+        )
+        self.__dict__["_embed"] = embed  # 通过直接设置 __dict__ 来绕过 Pydantic 的检查
+        self.__dict__["_max_batch_size"] = max_batch_size
+        self.__dict__["_max_wait"] = max_wait_ms / 1000
+        # 查询和文本使用不同的指令时，查询无法按文本合批
+        self.__dict__["_batch_queries"] = getattr(
+            embed, "query_instruction", None
+        ) == getattr(embed, "text_instruction", None)
+        self.__dict__["_pending"] = weakref.WeakKeyDictionary()
+        self.__dict__["_tasks"] = set()
+        self.__dict__["_stats"] = BatchStats()
+
+    async def _submit(self, text: str) -> Embedding:
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(loop)
+        if batch is None:
+            batch = _PendingBatch()
+            self._pending[loop] = batch
+            batch.timer = loop.call_later(self._max_wait, self._flush, loop)
+        future = loop.create_future()
+        batch.items.append((text, future, time.perf_counter()))
+        if len(batch.items) >= self._max_batch_size:
+            self._flush(loop)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop):
+        batch = self._pending.pop(loop, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = loop.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(lambda t: self._batch_done(t, batch))
+
+    def _batch_done(self, task: asyncio.Task, batch: _PendingBatch):
+        self._tasks.discard(task)
+        # 任务在开始执行前被取消时，_run_batch 中的 finally 不会执行
+        batch.cancel_waiters()
+
+    async def _run_batch(self, batch: _PendingBatch):
+        begin = time.perf_counter()
+        queue_delays = [(begin - enqueued) * 1000 for _, _, enqueued in batch.items]
+        texts = [text for text, _, _ in batch.items]
+        try:
+            embeddings = await self._embed.aget_text_embedding_batch(texts)
+            self._stats.record(len(texts), queue_delays, failed=False)
+            for (_, future, _), embedding in zip(batch.items, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+        except Exception as e:
+            log.warning(f"embedding batch of {len(texts)} failed: {e}")
+            self._stats.record(len(texts), queue_delays, failed=True)
+            for _, future, _ in batch.items:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            batch.cancel_waiters()
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._embed.get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        if self._batch_queries:
+            return await self._submit(query)
+        return await self._embed.aget_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._embed.get_text_embedding(text)
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return await self._submit(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._embed.get_text_embedding_batch(texts)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        # 单条请求参与合批，调用方已经批量请求时直接透传
+        if len(texts) == 1:
+            return [await self._submit(texts[0])]
+        return await self._embed.aget_text_embedding_batch(texts)
+
+    def get_dim(self):
+        return self._embed.get_dim() if hasattr(self._embed, "get_dim") else None
+
+    def get_batch_stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self._max_batch_size,
+            "max_wait_ms": self._max_wait * 1000,
+            **self._stats.to_dict(),
+        }
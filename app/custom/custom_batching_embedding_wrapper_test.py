@@ -0,0 +1,116 @@
+# app/custom/custom_batching_embedding_wrapper_test.py
+import asyncio
+import os
+import sys
+from typing import List
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+from app.custom.custom_batching_embedding_wrapper import (
+    CustomBatchingEmbeddingWrapper,
+)
+
+# 记录假 embedding 模型每次批量调用的文本
+calls: List[List[str]] = []
+
+
+class BatchRecordingEmbedding(BaseEmbedding):
+    """记录批量调用的假 embedding 模型"""
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return [float(len(query))]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return [float(len(query))]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return [float(len(text))]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        calls.append(list(texts))
+        if "boom" in texts:
+            raise RuntimeError("ollama unavailable")
+        await asyncio.sleep(0.01)
+        return [[float(len(text))] for text in texts]
+
+
+def test_concurrent_requests_are_merged():
+    calls.clear()
+    embed = CustomBatchingEmbeddingWrapper(
+        BatchRecordingEmbedding(), max_batch_size=4, max_wait_ms=20
+    )
+
+    async def run():
+        texts = [f"q{'x' * i}" for i in range(10)]
+        results = await asyncio.gather(
+            *[embed.aget_query_embedding(text) for text in texts]
+        )
+        assert results == [[float(len(text))] for text in texts]
+
+    asyncio.run(run())
+    # 满 4 条立即发送，剩余 2 条等待超时后发送
+    assert [len(batch) for batch in calls] == [4, 4, 2]
+    stats = embed.get_batch_stats()
+    assert stats["batches"] == 3
+    assert stats["items"] == 10
+    assert stats["batch_size"]["max"] == 4
+    assert stats["queue_delay_ms"]["max"] >= 15
+
+
+def test_batch_error_reaches_every_caller():
+    calls.clear()
+    embed = CustomBatchingEmbeddingWrapper(
+        BatchRecordingEmbedding(), max_batch_size=8, max_wait_ms=5
+    )
+
+    async def run():
+        return await asyncio.gather(
+            embed.aget_text_embedding("ok"),
+            embed.aget_text_embedding("boom"),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert embed.get_batch_stats()["errors"] == 1
+
+    # 调用方已经批量请求时直接透传
+    assert asyncio.run(embed.aget_text_embedding_batch(["a", "bb"])) == [[1.0], [2.0]]
+    assert calls[-1] == ["a", "bb"]
+
+
+@pytest.mark.parametrize("started", [False, True])
+def test_cancelled_batch_releases_callers(started):
+    calls.clear()
+    embed = CustomBatchingEmbeddingWrapper(
+        BatchRecordingEmbedding(), max_batch_size=2, max_wait_ms=5
+    )
+
+    async def run():
+        callers = [
+            asyncio.ensure_future(embed.aget_text_embedding(text))
+            for text in ["a", "b"]
+        ]
+        await asyncio.sleep(0)
+        # 批次任务由包装器持有引用，直到完成
+        assert len(embed._tasks) == 1
+        if started:
+            # 在批量请求进行中取消
+            await asyncio.sleep(0.005)
+            assert calls == [["a", "b"]]
+        for task in list(embed._tasks):
+            task.cancel()
+        results = await asyncio.wait_for(
+            asyncio.gather(*callers, return_exceptions=True), 1
+        )
+        assert all(isinstance(r, asyncio.CancelledError) for r in results)
+        assert not embed._tasks
+
+    asyncio.run(run())
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+from app.utils.embedding_cache import EmbeddingCache, text_hash
+
+
+class CustomCachedEmbeddingWrapper(BaseEmbedding):
+    """A wrapper class for BaseEmbedding to cache embeddings by (model name, text hash).
+
+    Concurrent lookups of the same uncached text share one call to the wrapped model.
+    """
+
+    _embed: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+    _inflight: Dict[str, Future] = PrivateAttr()
+    _inflight_lock: threading.Lock = PrivateAttr()
+
+    def __init__(self, embed: BaseEmbedding, cache: EmbeddingCache, **kwargs) -> None:
+        super().__init__(
+            model_name=embed.model_name,
+            embed_batch_size=embed.embed_batch_size,
+            **kwargs,
+        )
+        self.__dict__["_embed"] = embed  # 通过直接设置 __dict__ 来绕过 Pydantic 的检查
+        self.__dict__["_cache"] = cache
+        self.__dict__["_inflight"] = {}
+        self.__dict__["_inflight_lock"] = threading.Lock()
+
+    def _claim(
+        self, keys: List[str], found: Dict[str, Embedding]
+    ) -> Tuple[Dict[str, Future], Dict[str, Future]]:
+        """
+        登记待计算的键：返回 (由当前调用方负责计算的, 其它调用方正在计算的)
+        """
+        owned, waiting = {}, {}
+        with self._inflight_lock:
+            for key in keys:
+                future = self._inflight.get(key)
+                if future is None:
+                    # 查缓存和登记之间可能已有其它调用方算完
+                    embedding = self._cache.peek(key)
+                    if embedding is not None:
+                        found[key] = embedding
+                        continue
+                    future = Future()
+                    self._inflight[key] = future
+                    owned[key] = future
+                else:
+                    waiting[key] = future
+        return owned, waiting
+
+    def _resolve(
+        self,
+        owned: Dict[str, Future],
+        embeddings: Optional[Dict[str, Embedding]] = None,
+        error: Optional[BaseException] = None,
+    ):
+        for key, future in owned.items():
+            if error is None:
+                self._cache.put(key, embeddings[key])
+                future.set_result(embeddings[key])
+            else:
+                future.set_exception(error)
+        with self._inflight_lock:
+            for key in owned:
+                self._inflight.pop(key, None)
+
+    def _lookup(self, texts: List[str], kind: str):
+        keys = [text_hash(text, kind) for text in texts]
+        found: Dict[str, Embedding] = {}
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in found or key in missing:
+                continue
+            embedding = self._cache.get(key)
+            if embedding is None:
+                missing[key] = text
+            else:
+                found[key] = embedding
+        return keys, found, missing
+
+    def _embed_many(self, texts: List[str], kind: str) -> List[Embedding]:
+        keys, found, missing = self._lookup(texts, kind)
+        if missing:
+            owned, waiting = self._claim(list(missing), found)
+            if owned:
+                try:
+                    owned_texts = [missing[key] for key in owned]
+                    if kind == "query":
+                        results = [self._embed.get_query_embedding(owned_texts[0])]
+                    else:
+                        results = self._embed.get_text_embedding_batch(owned_texts)
+                except BaseException as e:
+                    self._resolve(owned, error=e)
+                    raise
+                computed = dict(zip(owned, results))
+                self._resolve(owned, computed)
+                found.update(computed)
+            for key, future in waiting.items():
+                found[key] = future.result()
+        return [found[key] for key in keys]
+
+    async def _aembed_many(self, texts: List[str], kind: str) -> List[Embedding]:
+        keys, found, missing = self._lookup(texts, kind)
+        if missing:
+            owned, waiting = self._claim(list(missing), found)
+            if owned:
+                try:
+                    owned_texts = [missing[key] for key in owned]
+                    if kind == "query":
+                        results = [
+                            await self._embed.aget_query_embedding(owned_texts[0])
+                        ]
+                    else:
+                        results = await self._embed.aget_text_embedding_batch(
+                            owned_texts
+                        )
+                except BaseException as e:
+                    self._resolve(owned, error=e)
+                    raise
+                computed = dict(zip(owned, results))
+                self._resolve(owned, computed)
+                found.update(computed)
+            for key, future in waiting.items():
+                found[key] = await asyncio.wrap_future(future)
+        return [found[key] for key in keys]
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._embed_many([query], "query")[0]
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return (await self._aembed_many([query], "query"))[0]
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._embed_many([text], "text")[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aembed_many([text], "text"))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._embed_many(texts, "text")
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return await self._aembed_many(texts, "text")
+
+    def get_dim(self):
+        return self._embed.get_dim() if hasattr(self._embed, "get_dim") else None
+
+    def get_cache_stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+    def clear_memory_cache(self):
+        self._cache.clear_memory()
@@ -1,14 +1,16 @@
-import time
 from typing import List, Any
 
 from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
 from pydantic import PrivateAttr
 
-from app.utils.log import log
+from app.utils.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_DURATION, track
 
 
 class CustomTimedEmbeddingWrapper(BaseEmbedding):
-    """A wrapper class for BaseEmbedding to measure and log the time taken by embedding method."""
+    """A wrapper class for BaseEmbedding to record latency and batch size of embedding calls.
+
+    Durations go to in-process histograms exported by /metrics instead of log lines.
+    """
 
     _embed: BaseEmbedding = PrivateAttr()
     _message: str = PrivateAttr()
@@ -21,70 +23,61 @@ class CustomTimedEmbeddingWrapper(BaseEmbedding):
         self.__dict__["_message"] = message
         self.__dict__["_dim"] = dim
 
+    def _track(self, operation: str, count: int):
+        EMBEDDING_BATCH_SIZE.labels(self.model_name).observe(count)
+        return track(EMBEDDING_DURATION.labels(self.model_name, operation), "embedding")
+
     def _get_query_embedding(self, query: str) -> Embedding:
-        start_time = time.time()
-        results = self._embed._get_query_embedding(query)
-        log.info(
-            f"{self._message}, _get_query_embedding took {int((time.time() - start_time) * 1000)} ms"
-        )
-        return results
+        with self._track("query", 1):
+            return self._embed._get_query_embedding(query)
 
     async def _aget_query_embedding(self, query: str) -> Embedding:
-        start_time = time.time()
-        results = await self._embed._aget_query_embedding(query)
-        log.info(
-            f"{self._message}, _aget_query_embedding took {int((time.time() - start_time) * 1000)} ms"
-        )
-        return results
+        with self._track("query", 1):
+            return await self._embed._aget_query_embedding(query)
 
     def get_query_embedding(self, query: str) -> Embedding:
-        log.info(f"{self._message}, start get_query_embedding")
-        start_time = time.time()
-        results = self._embed.get_query_embedding(query)
-        log.info(
-            f"{self._message}, get_query_embedding took {int((time.time() - start_time) * 1000)} ms"
-        )
-        return results
+        with self._track("query", 1):
+            return self._embed.get_query_embedding(query)
 
     async def aget_query_embedding(self, query: str) -> Embedding:
-        log.info(f"{self._message}, start aget_query_embedding")
-        start_time = time.time()
-        results = await self._embed.aget_query_embedding(query)
-        log.info(
-            f"{self._message}, aget_query_embedding took {int((time.time() - start_time) * 1000)} ms"
-        )
-        return results
+        with self._track("query", 1):
+            return await self._embed.aget_query_embedding(query)
 
     def _get_text_embedding(self, text: str) -> List[float]:
         """
         Get text embedding.
         """
-        return self._embed._get_text_embedding(text)
+        with self._track("text", 1):
+            return self._embed._get_text_embedding(text)
 
     async def _aget_text_embedding(self, text: str) -> List[float]:
         """
         Async get text embedding.
         """
-        response = await self._embed._aget_text_embedding(text)
-        return response
+        with self._track("text", 1):
+            return await self._embed._aget_text_embedding(text)
 
     def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
         Get text embedding.
         """
-        return self._embed._get_text_embeddings(texts)
+        with self._track("text", len(texts)):
+            return self._embed._get_text_embeddings(texts)
 
     async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
         Async get text embeddings.
         """
-        return await self._embed._aget_text_embeddings(texts)
+        with self._track("text", len(texts)):
+            return await self._embed._aget_text_embeddings(texts)
 
     def get_text_embedding(self, text: str) -> Embedding:
-        return self._embed.get_text_embedding(text)
+        with self._track("text", 1):
+            return self._embed.get_text_embedding(text)
 
     async def aget_text_embedding(self, text: str) -> Embedding:
-        return await self._embed.aget_text_embedding(text)
+        with self._track("text", 1):
+            return await self._embed.aget_text_embedding(text)
 
     def get_text_embedding_batch(
         self,
@@ -92,16 +85,18 @@ class CustomTimedEmbeddingWrapper(BaseEmbedding):
         show_progress: bool = False,
         **kwargs: Any,
     ) -> List[Embedding]:
-        return self._embed.get_text_embedding_batch(
-            texts, show_progress=show_progress, **kwargs
-        )
+        with self._track("text", len(texts)):
+            return self._embed.get_text_embedding_batch(
+                texts, show_progress=show_progress, **kwargs
+            )
 
     async def aget_text_embedding_batch(
         self, texts: List[str], show_progress: bool = False
     ) -> List[Embedding]:
-        return await self._embed.aget_text_embedding_batch(
-            texts, show_progress=show_progress
-        )
+        with self._track("text", len(texts)):
+            return await self._embed.aget_text_embedding_batch(
+                texts, show_progress=show_progress
+            )
 
     def get_dim(self):
         return self._dim
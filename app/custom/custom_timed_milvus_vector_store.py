@@ -0,0 +1,194 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import replace
+from typing import Any, Iterator, List, Optional
+
+import numpy as np
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.vector_stores.milvus import MilvusVectorStore
+from pymilvus import DataType
+from pymilvus.orm.schema import CollectionSchema, FieldSchema
+
+from app.core.vector_quantization import (
+    FLOAT_VECTOR,
+    VECTOR_TYPE_BYTES,
+    decode_vector,
+    encode_vector,
+    exact_scores,
+    rerank_order,
+)
+from app.utils.metrics import MILVUS_OPERATION_DURATION, track
+from app.utils.tracing import SPAN_KIND_CLIENT, tracer
+
+# 构造期间传入的向量字段类型：父类在 __init__ 中创建集合，此时需要已经确定字段类型
+_init_vector_type: ContextVar[str] = ContextVar(
+    "init_vector_type", default=FLOAT_VECTOR
+)
+
+
+class CustomTimedMilvusVectorStore(MilvusVectorStore):
+    """MilvusVectorStore that records insert and search latency into in-process histograms
+    and trace spans.
+
+    The dense field can be stored as FLOAT16_VECTOR / BFLOAT16_VECTOR, and queries can
+    re-rank an enlarged candidate set with exact scores before cutting to top k."""
+
+    # 向量字段类型，半精度类型的内存占用为 FLOAT_VECTOR 的一半
+    vector_type: str = FLOAT_VECTOR
+
+    def __init__(self, vector_type: str = FLOAT_VECTOR, **kwargs: Any):
+        if vector_type not in VECTOR_TYPE_BYTES:
+            raise ValueError(
+                f"Unsupported vector type: {vector_type}, "
+                f"supported: {list(VECTOR_TYPE_BYTES)}"
+            )
+        token = _init_vector_type.set(vector_type)
+        try:
+            super().__init__(**kwargs)
+        finally:
+            _init_vector_type.reset(token)
+
+    def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
+        self.vector_type = _init_vector_type.get()
+
+    def _add_fields_to_schema(self, schema: CollectionSchema) -> CollectionSchema:
+        schema = super()._add_fields_to_schema(schema)
+        if self.enable_dense and self.vector_type != FLOAT_VECTOR:
+            for i, field in enumerate(schema.fields):
+                if field.name == self.embedding_field:
+                    schema.fields[i] = FieldSchema(
+                        self.embedding_field,
+                        getattr(DataType, self.vector_type),
+                        dim=self.dim,
+                    )
+        return schema
+
+    def _encode_query(self, query: VectorStoreQuery) -> VectorStoreQuery:
+        # 写入时 pymilvus 会把 float32 列表打包为半精度字段的数据，检索向量需要自行转换
+        if self.vector_type == FLOAT_VECTOR or query.query_embedding is None:
+            return query
+        return replace(
+            query,
+            query_embedding=encode_vector(query.query_embedding, self.vector_type),
+        )
+
+    @contextmanager
+    def _track(self, operation: str, **attributes: Any) -> Iterator[None]:
+        with tracer.start_span(
+            f"milvus.{operation}",
+            {
+                "db.system": "milvus",
+                "db.collection": self.collection_name,
+                **attributes,
+            },
+            kind=SPAN_KIND_CLIENT,
+        ), track(MILVUS_OPERATION_DURATION.labels(operation), "milvus"):
+            yield
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        with self._track("insert", count=len(nodes)):
+            return super().add(nodes, **add_kwargs)
+
+    async def async_add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        with self._track("insert", count=len(nodes)):
+            return await super().async_add(nodes, **add_kwargs)
+
+    def upsert(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        """Insert nodes, replacing rows that already have the same id."""
+        # upsert_mode 是实例字段，复制一份再写入，不影响其它线程中的 add
+        store = (
+            self if self.upsert_mode else self.model_copy(update={"upsert_mode": True})
+        )
+        with self._track("upsert", count=len(nodes)):
+            return MilvusVectorStore.add(store, nodes, **add_kwargs)
+
+    def delete_nodes(
+        self,
+        node_ids: Optional[List[str]] = None,
+        filters: Optional[MetadataFilters] = None,
+        **delete_kwargs: Any,
+    ) -> None:
+        with self._track("delete", count=len(node_ids or [])):
+            return super().delete_nodes(node_ids, filters, **delete_kwargs)
+
+    def query(
+        self,
+        query: VectorStoreQuery,
+        rerank_candidates: Optional[int] = None,
+        **kwargs: Any,
+    ) -> VectorStoreQueryResult:
+        """
+        rerank_candidates 大于 top_k 时先取回 rerank_candidates 个候选，再按精确得分重排
+        """
+        top_k = query.similarity_top_k
+        candidates = max(rerank_candidates or 0, top_k)
+        search_query = replace(self._encode_query(query), similarity_top_k=candidates)
+        with self._track("search", top_k=candidates):
+            result = super().query(search_query, **kwargs)
+        if candidates == top_k:
+            return result
+        return self.rerank(query.query_embedding, result, top_k)
+
+    async def aquery(
+        self,
+        query: VectorStoreQuery,
+        rerank_candidates: Optional[int] = None,
+        **kwargs: Any,
+    ) -> VectorStoreQueryResult:
+        top_k = query.similarity_top_k
+        candidates = max(rerank_candidates or 0, top_k)
+        search_query = replace(self._encode_query(query), similarity_top_k=candidates)
+        with self._track("search", top_k=candidates):
+            result = await super().aquery(search_query, **kwargs)
+        if candidates == top_k:
+            return result
+        return await asyncio.to_thread(
+            self.rerank, query.query_embedding, result, top_k
+        )
+
+    def rerank(
+        self,
+        query_embedding: List[float],
+        result: VectorStoreQueryResult,
+        top_k: int,
+    ) -> VectorStoreQueryResult:
+        """
+        取回候选的原始向量，用 float32 的查询向量计算精确得分后重排
+
+        SQ8 / PQ 索引的量化误差在这里消除；半精度字段只消除索引的近似误差
+        """
+        ids = result.ids or []
+        if not ids:
+            return result
+        with self._track("rerank", candidates=len(ids)):
+            rows = self.client.get(
+                self.collection_name, ids=ids, output_fields=[self.embedding_field]
+            )
+            vectors_by_id = {
+                str(row["id"]): decode_vector(
+                    row[self.embedding_field], self.vector_type
+                )
+                for row in rows
+            }
+            # 取回前已被删除的候选直接丢弃
+            kept = [i for i, node_id in enumerate(ids) if node_id in vectors_by_id]
+            if not kept:
+                return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+            scores = exact_scores(
+                query_embedding,
+                np.stack([vectors_by_id[ids[i]] for i in kept]),
+                self.similarity_metric,
+            )
+            order = rerank_order(scores, self.similarity_metric, top_k)
+        return VectorStoreQueryResult(
+            nodes=[result.nodes[kept[i]] for i in order] if result.nodes else None,
+            similarities=[float(scores[i]) for i in order],
+            ids=[ids[kept[i]] for i in order],
+        )
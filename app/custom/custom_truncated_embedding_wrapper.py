@@ -0,0 +1,96 @@
+from typing import Any, List
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+
+def truncate_embedding(embedding: Embedding, dim: int) -> Embedding:
+    """
+    保留前 dim 维并重新归一化为单位向量
+    """
+    vector = np.asarray(embedding[:dim], dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector = vector / norm
+    return vector.tolist()
+
+
+class CustomTruncatedEmbeddingWrapper(BaseEmbedding):
+    """A wrapper class for BaseEmbedding to truncate Matryoshka embeddings to fewer dimensions.
+
+    Only models trained with Matryoshka representation learning (e.g. nomic-embed-text v1.5)
+    keep most of their recall after truncation.
+    """
+
+    _embed: BaseEmbedding = PrivateAttr()
+    _dim: int = PrivateAttr()
+
+    def __init__(self, embed: BaseEmbedding, dim: int, **kwargs) -> None:
+        super().__init__(
+            model_name=embed.model_name,
+            embed_batch_size=embed.embed_batch_size,
+            **kwargs,
+        )
+        self.__dict__["_embed"] = embed  # 通过直接设置 __dict__ 来绕过 Pydantic 的检查
+        self.__dict__["_dim"] = dim
+
+    def _truncate(self, embedding: Embedding) -> Embedding:
+        return truncate_embedding(embedding, self._dim)
+
+    def _truncate_many(self, embeddings: List[Embedding]) -> List[Embedding]:
+        return [truncate_embedding(embedding, self._dim) for embedding in embeddings]
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._truncate(self._embed._get_query_embedding(query))
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return self._truncate(await self._embed._aget_query_embedding(query))
+
+    def get_query_embedding(self, query: str) -> Embedding:
+        return self._truncate(self._embed.get_query_embedding(query))
+
+    async def aget_query_embedding(self, query: str) -> Embedding:
+        return self._truncate(await self._embed.aget_query_embedding(query))
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._truncate(self._embed._get_text_embedding(text))
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return self._truncate(await self._embed._aget_text_embedding(text))
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._truncate_many(self._embed._get_text_embeddings(texts))
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._truncate_many(await self._embed._aget_text_embeddings(texts))
+
+    def get_text_embedding(self, text: str) -> Embedding:
+        return self._truncate(self._embed.get_text_embedding(text))
+
+    async def aget_text_embedding(self, text: str) -> Embedding:
+        return self._truncate(await self._embed.aget_text_embedding(text))
+
+    def get_text_embedding_batch(
+        self,
+        texts: List[str],
+        show_progress: bool = False,
+        **kwargs: Any,
+    ) -> List[Embedding]:
+        return self._truncate_many(
+            self._embed.get_text_embedding_batch(
+                texts, show_progress=show_progress, **kwargs
+            )
+        )
+
+    async def aget_text_embedding_batch(
+        self, texts: List[str], show_progress: bool = False
+    ) -> List[Embedding]:
+        return self._truncate_many(
+            await self._embed.aget_text_embedding_batch(
+                texts, show_progress=show_progress
+            )
+        )
+
+    def get_dim(self) -> int:
+        return self._dim
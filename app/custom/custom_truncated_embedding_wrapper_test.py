@@ -0,0 +1,32 @@
+# app/custom/custom_truncated_embedding_wrapper_test.py
+import asyncio
+import os
+import sys
+
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from llama_index.core.embeddings import MockEmbedding
+
+from app.custom.custom_truncated_embedding_wrapper import (
+    CustomTruncatedEmbeddingWrapper,
+)
+
+
+def test_truncates_and_renormalizes():
+    embed = CustomTruncatedEmbeddingWrapper(MockEmbedding(embed_dim=768), dim=256)
+    assert embed.get_dim() == 256
+
+    vectors = [
+        embed.get_query_embedding("query"),
+        embed.get_text_embedding("text"),
+        *embed.get_text_embedding_batch(["a", "b"]),
+        *asyncio.run(embed.aget_text_embedding_batch(["c"])),
+    ]
+    for vector in vectors:
+        assert len(vector) == 256
+        assert np.isclose(np.linalg.norm(vector), 1.0)
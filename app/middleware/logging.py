@@ -1,64 +1,128 @@
+import random
 import time
+from typing import Iterable, Optional
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.utils.log import log
 from app.utils.time_utils import get_duration_millis
+from config.setting import (
+    LOG_EXCLUDE_PATHS,
+    LOG_REQUEST_BODY_MAX_BYTES,
+    LOG_RESPONSE_BODY_MAX_BYTES,
+    LOG_SAMPLE_RATE,
+)
+
+
+class _BodyPrefix:
+    """
+    只保留消息体的前 max_bytes 个字节，用于日志
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.chunks = []
+        self.size = 0
+        self.truncated = False
+
+    def feed(self, body: bytes):
+        if not body:
+            return
+        remaining = self.max_bytes - self.size
+        if remaining <= 0:
+            self.truncated = True
+            return
+        if len(body) > remaining:
+            body = body[:remaining]
+            self.truncated = True
+        self.chunks.append(body)
+        self.size += len(body)
+
+    def text(self) -> str:
+        text = b"".join(self.chunks).decode("utf-8", errors="replace")
+        return f"{text} ......" if self.truncated else text
 
 
 # 定义中间件来记录请求和响应
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # 记录请求信息
+class LoggingMiddleware:
+    """
+    纯 ASGI 日志中间件
+
+    请求和响应的消息原样透传，不缓冲、不重建 Response，流式响应不受影响；
+    只截取消息体的前若干字节用于日志。按 sample_rate 抽样记录，
+    未抽中的请求仅在出错（状态码 >= 500 或异常）时记录；exclude_paths 中的路径前缀不记录。
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = LOG_SAMPLE_RATE,
+        exclude_paths: Iterable[str] = LOG_EXCLUDE_PATHS,
+        request_body_max_bytes: int = LOG_REQUEST_BODY_MAX_BYTES,
+        response_body_max_bytes: int = LOG_RESPONSE_BODY_MAX_BYTES,
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.exclude_paths = tuple(exclude_paths)
+        self.request_body_max_bytes = request_body_max_bytes
+        self.response_body_max_bytes = response_body_max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+
         start_time = time.time()
-        log.info(f"Request: {request.method} {request.url}")
-
-        if request.method != "GET":
-            # 非Get请求，获取请求体
-            request_body = await request.body()
-
-            try:
-                request_body_data = request_body.decode("utf-8")
-                if len(request_body_data) > 200:
-                    log.info(f"request_body: {request_body_data[0:200]} ......")
-                else:
-                    log.info(f"request_body: {request_body_data}")
-            except Exception as e:
-                log.warning(f"cat not log request body, error: {e}")
-
-            # 将请求体放回到 request 中，供后续使用
-            request._body = request_body
-
-            # 将请求体放回 request stream
-            async def receive():
-                return {"type": "http.request", "body": request_body}
-
-            request._receive = receive
-
-        # 调用下一个中间件或路由处理器
-        response = await call_next(request)
-
-        # 获取响应体内容
-        response_body = b""
-        async for chunk in response.body_iterator:
-            response_body += chunk
-
-        # 记录响应信息
-        duration = get_duration_millis(start_time, time.time())
-        log.info(f"Response status: {response.status_code}")
-        response_body_data = response_body.decode("utf-8")
-        if len(response_body_data) > 500:
-            log.info(f"response_body: {response_body_data[0:500]} ......")
-        else:
-            log.info(f"response_body: {response_body_data}")
-        log.info(f"Duration: {duration} ms")
+        sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
+        capture_request = sampled and scope["method"] != "GET"
+        request_body = _BodyPrefix(self.request_body_max_bytes)
+        response_body = _BodyPrefix(self.response_body_max_bytes)
+        status_code: Optional[int] = None
+
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            if capture_request and message["type"] == "http.request":
+                request_body.feed(message.get("body", b""))
+            return message
 
-        # 将响应体放回 response stream
-        return Response(
-            content=response_body,
-            status_code=response.status_code,
-            headers=dict(response.headers),
-            media_type=response.media_type,
-        )
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif sampled and message["type"] == "http.response.body":
+                response_body.feed(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        except Exception:
+            status_code = status_code or 500
+            raise
+        finally:
+            # 响应已发送完毕后再记录，日志不占用请求耗时
+            if sampled or status_code is None or status_code >= 500:
+                self._log(
+                    scope,
+                    status_code,
+                    get_duration_millis(start_time, time.time()),
+                    request_body if capture_request else None,
+                    response_body if sampled else None,
+                )
+
+    @staticmethod
+    def _log(
+        scope: Scope,
+        status_code: Optional[int],
+        duration: int,
+        request_body: Optional[_BodyPrefix],
+        response_body: Optional[_BodyPrefix],
+    ):
+        query_string = scope.get("query_string", b"").decode("latin-1")
+        path = f"{scope['path']}?{query_string}" if query_string else scope["path"]
+        log.info(f"Request: {scope['method']} {path}")
+        if request_body is not None:
+            log.info(f"request_body: {request_body.text()}")
+        log.info(f"Response status: {status_code}")
+        if response_body is not None:
+            log.info(f"response_body: {response_body.text()}")
+        log.info(f"Duration: {duration} ms")
@@ -0,0 +1,78 @@
+# app/middleware/logging_test.py
+import os
+import sys
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.middleware import logging as logging_middleware
+from app.middleware.logging import LoggingMiddleware, _BodyPrefix
+
+
+async def echo(request: Request):
+    body = await request.body()
+    return JSONResponse({"size": len(body)})
+
+
+async def stream(request: Request):
+    async def chunks():
+        for i in range(3):
+            yield f"data: {i}\n\n"
+
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+def make_client(**kwargs) -> TestClient:
+    app = Starlette(
+        routes=[
+            Route("/echo", echo, methods=["POST"]),
+            Route("/stream", stream),
+        ]
+    )
+    app.add_middleware(LoggingMiddleware, **kwargs)
+    return TestClient(app)
+
+
+def capture_logs(monkeypatch):
+    messages = []
+    monkeypatch.setattr(logging_middleware.log, "info", messages.append)
+    return messages
+
+
+def test_body_prefix_is_bounded():
+    prefix = _BodyPrefix(5)
+    prefix.feed(b"abc")
+    prefix.feed(b"defgh")
+    prefix.feed(b"ijk")
+    assert prefix.size == 5
+    assert prefix.text() == "abcde ......"
+
+
+def test_passes_bodies_through_and_logs_prefix(monkeypatch):
+    messages = capture_logs(monkeypatch)
+    client = make_client(request_body_max_bytes=10)
+
+    response = client.post("/echo", content=b"x" * 1000)
+    assert response.json() == {"size": 1000}
+    assert "request_body: xxxxxxxxxx ......" in messages
+
+    response = client.get("/stream")
+    assert response.text == "data: 0\n\ndata: 1\n\ndata: 2\n\n"
+    assert "response_body: data: 0\n\ndata: 1\n\ndata: 2\n\n" in messages
+
+
+def test_sampling_and_excluded_paths(monkeypatch):
+    messages = capture_logs(monkeypatch)
+    client = make_client(sample_rate=0.0, exclude_paths=["/stream"])
+
+    assert client.post("/echo", content=b"{}").status_code == 200
+    assert client.get("/stream").status_code == 200
+    assert messages == []
@@ -0,0 +1,65 @@
+import time
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.metrics import ERRORS, HTTP_REQUEST_DURATION
+
+
+def route_template(scope: Scope) -> str:
+    """
+    请求匹配到的路由模板，未匹配到路由时返回 unmatched
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    path = scope["path"]
+    path_regex = getattr(route, "path_regex", None)
+    if path_regex is None or path_regex.match(path):
+        return template
+    # 部分 FastAPI 版本中 include_router 的 prefix 不在 route.path 里，从实际路径中补上
+    for index, char in enumerate(path):
+        if index and char == "/" and path_regex.match(path[index:]):
+            return path[:index] + template
+    return template
+
+
+class MetricsMiddleware:
+    """
+    纯 ASGI 指标中间件，按路由模板记录请求耗时
+
+    route 标签使用路由的路径模板（如 /api/milvus/search），未匹配到路由的请求记为 unmatched，
+    避免路径参数或扫描请求导致标签数量膨胀。流式响应按最后一个分片发送完成计时。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code: Optional[int] = None
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            status_code = status_code or 500
+            raise
+        finally:
+            status_code = status_code or 500
+            # 路由匹配后 Starlette 会把 route 写入 scope
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], route_template(scope), status_code
+            ).observe(time.perf_counter() - start_time)
+            if status_code >= 500:
+                ERRORS.labels("http").inc()
@@ -0,0 +1,60 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.middleware.metrics import route_template
+from app.utils.tracing import (
+    SPAN_KIND_SERVER,
+    format_traceparent,
+    parse_traceparent,
+    tracer,
+)
+
+
+class TracingMiddleware:
+    """
+    纯 ASGI 追踪中间件，为每个请求创建根 span
+
+    请求头带有 traceparent 时继承调用方的 trace id 和采样标记；
+    响应头 traceresponse 返回本次请求的 trace id，便于按 id 查找链路。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope.get("headers", ()):
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        with tracer.start_span(
+            f"{scope['method']} {scope['path']}",
+            kind=SPAN_KIND_SERVER,
+            parent=parse_traceparent(traceparent),
+        ) as span:
+
+            async def send_wrapper(message: Message):
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    span.set_attribute("http.status_code", status_code)
+                    if status_code >= 500:
+                        span.set_error(f"HTTP {status_code}")
+                    headers = list(message.get("headers", []))
+                    headers.append(
+                        (b"traceresponse", format_traceparent(span.context).encode())
+                    )
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = route_template(scope)
+                span.name = f"{scope['method']} {route}"
+                span.set_attribute("http.method", scope["method"])
+                span.set_attribute("http.route", route)
+                span.set_attribute("http.target", scope["path"])
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -8,3 +8,5 @@ class AppConfig(BaseModel):
     fileSizeLimit: int
     supportedFileTypeList: List[str]
     supportedFileSuffixList: List[str]
+    # 生产模式的 worker 进程数，为空时为 1；多于 1 个时需要 Milvus 服务，不能使用 Milvus Lite 文件
+    workers: Optional[int] = None
@@ -0,0 +1,16 @@
+from pydantic import BaseModel, Field, model_validator
+
+
+class ChunkConfig(BaseModel):
+    chunkSize: int = Field(gt=0)
+    # 相邻分块重叠的 token 数，需小于 chunkSize
+    chunkOverlap: int = Field(ge=0)
+
+    @model_validator(mode="after")
+    def check_overlap(self) -> "ChunkConfig":
+        if self.chunkOverlap >= self.chunkSize:
+            raise ValueError(
+                f"chunkOverlap {self.chunkOverlap} must be smaller than "
+                f"chunkSize {self.chunkSize}"
+            )
+        return self
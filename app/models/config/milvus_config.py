@@ -1,8 +1,34 @@
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 
-class MilvusConfig(BaseModel):
+class CollectionConfig(BaseModel):
+    # 未配置时按 embeddingModel 生成：MILVUS_COLLECTION_PREFIX + 模型名
+    collectionName: Optional[str] = None
+    # config/setting.py 中 EMBEDDING_MODELS 的名称，未配置时使用 EMBEDDING_DEFAULT_MODEL
+    embeddingModel: Optional[str] = None
+    # 未配置时使用模型的原始维度
+    dim: Optional[int] = None
+    # 未配置时使用 config/setting.py 中的默认值
+    indexType: Optional[str] = None
+    metricType: Optional[str] = None
+    indexParams: Optional[dict] = None
+    searchParams: Optional[dict] = None
+    vectorType: Optional[str] = None
+    rerank: Optional[bool] = None
+    rerankFactor: Optional[int] = None
+    # dim 小于模型输出维度时是否按 Matryoshka 截断，未配置时使用 config/setting.py 中的默认值
+    matryoshka: Optional[bool] = None
+
+
+class MilvusConfig(CollectionConfig):
     host: str
     port: int
+    # 优先于 host/port，如 http://127.0.0.1:19530 或 Milvus Lite 的 ./milvus_llamaindex.db
+    uri: Optional[str] = None
+    # 默认集合，请求未指定集合时使用
     collectionName: str
     dim: int
+    # 其它集合，每个集合可以使用不同的 embedding 模型
+    collections: Optional[List[CollectionConfig]] = None
@@ -0,0 +1,141 @@
+# app/serives/collection_export.py
+import base64
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+from pymilvus import DataType
+
+from app.serives.milvus_executor import ADMIN, MilvusExecutor
+from app.serives.milvus_manager import MilvusManager
+from config.setting import MILVUS_EXPORT_BATCH_SIZE
+
+# 动态字段在 output_fields 中的名称，返回时展开为各自的键
+DYNAMIC_FIELD = "$meta"
+
+VECTOR_TYPES = {
+    DataType.FLOAT_VECTOR,
+    DataType.BINARY_VECTOR,
+    DataType.FLOAT16_VECTOR,
+    DataType.BFLOAT16_VECTOR,
+    DataType.SPARSE_FLOAT_VECTOR,
+}
+
+
+def default_output_fields(collection_info: Dict[str, Any]) -> List[str]:
+    """
+    默认导出除向量外的所有字段，开启动态字段时包含动态字段
+    """
+    fields = [
+        field["name"]
+        for field in collection_info["fields"]
+        if field["type"] not in VECTOR_TYPES
+    ]
+    if collection_info.get("enable_dynamic_field"):
+        fields.append(DYNAMIC_FIELD)
+    return fields
+
+
+def build_filter(filter_expr: str, cursor: Optional[str], primary_key: str) -> str:
+    """
+    在过滤条件上追加游标条件：query iterator 按主键升序返回，只导出主键大于 cursor 的行
+    """
+    if cursor is None:
+        return filter_expr
+    # JSON 字符串的转义规则与 Milvus 表达式的字符串字面量一致
+    cursor_expr = f"{primary_key} > {json.dumps(cursor)}"
+    if not filter_expr:
+        return cursor_expr
+    return f"({filter_expr}) and {cursor_expr}"
+
+
+def _json_default(value: Any):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (bytes, bytearray)):
+        # 二进制向量和 float16 向量
+        return base64.b64encode(value).decode("ascii")
+    return str(value)
+
+
+def encode_row(row: Dict[str, Any]) -> str:
+    return json.dumps(row, ensure_ascii=False, default=_json_default) + "\n"
+
+
+class CollectionExport:
+    """
+    基于 pymilvus query iterator 的集合导出，每次只在内存中保留一批数据
+
+    iterator 的创建、翻页和关闭都是阻塞调用，通过 MilvusExecutor 的管理线程池执行
+    """
+
+    def __init__(self, iterator, output_fields: List[str], primary_key: str):
+        self._iterator = iterator
+        self.output_fields = output_fields
+        self.primary_key = primary_key
+        self.count = 0
+        self.last_id: Optional[Any] = None
+
+    @classmethod
+    async def open(
+        cls,
+        fields: Optional[List[str]] = None,
+        filter_expr: str = "",
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        collection: Optional[str] = None,
+    ) -> "CollectionExport":
+        """
+        创建导出迭代器，字段或过滤条件不合法时在这里抛出异常，此时还未开始写响应
+
+        collection 为空时导出默认集合
+        """
+        vector_store = MilvusManager.get_vector_store(collection)
+        if not vector_store:
+            raise ValueError("Milvus vector store not initialized")
+
+        def create(connection):
+            client = connection.client
+            collection_info = client.describe_collection(vector_store.collection_name)
+            primary_key = next(
+                field["name"]
+                for field in collection_info["fields"]
+                if field.get("is_primary")
+            )
+            output_fields = fields or default_output_fields(collection_info)
+            iterator = client.query_iterator(
+                collection_name=vector_store.collection_name,
+                batch_size=batch_size or MILVUS_EXPORT_BATCH_SIZE,
+                limit=limit if limit is not None else -1,
+                filter=build_filter(filter_expr, cursor, primary_key),
+                output_fields=output_fields,
+            )
+            return cls(iterator, output_fields, primary_key)
+
+        return await MilvusExecutor.arun(ADMIN, create)
+
+    async def batches(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        逐批返回数据，结束或中途退出时关闭迭代器
+        """
+        try:
+            while True:
+                rows = await MilvusExecutor.arun(ADMIN, lambda _: self._iterator.next())
+                if not rows:
+                    break
+                self.count += len(rows)
+                self.last_id = rows[-1].get(self.primary_key, self.last_id)
+                yield rows
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        提交到线程池后不等待结果，客户端断开、请求被取消时也能关闭
+        """
+        iterator, self._iterator = self._iterator, None
+        if iterator is not None:
+            MilvusExecutor.submit(ADMIN, lambda _: iterator.close())
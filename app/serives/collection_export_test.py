@@ -0,0 +1,133 @@
+# app/serives/collection_export_test.py
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from pymilvus import DataType, MilvusClient
+
+import app.serives.collection_export as collection_export
+from app.serives.collection_export import CollectionExport, build_filter
+from app.serives.milvus_executor import MilvusExecutor
+
+COLLECTION = "export_docs"
+IDS = [f"doc-{i:02d}" for i in range(25)]
+
+
+def test_build_filter():
+    assert build_filter("", None, "id") == ""
+    assert build_filter("group == 1", None, "id") == "group == 1"
+    assert build_filter("", "doc-03", "id") == 'id > "doc-03"'
+    assert build_filter("group == 1 or group == 2", "doc-03", "id") == (
+        '(group == 1 or group == 2) and id > "doc-03"'
+    )
+    assert build_filter("", 'a"b\\c', "id") == 'id > "a\\"b\\\\c"'
+
+
+@pytest.fixture
+def milvus(tmp_path, monkeypatch):
+    uri = str(tmp_path / "export.db")
+    client = MilvusClient(uri)
+    schema = client.create_schema(auto_id=False, enable_dynamic_field=True)
+    schema.add_field("id", DataType.VARCHAR, max_length=64, is_primary=True)
+    schema.add_field("group", DataType.INT64)
+    schema.add_field("embedding", DataType.FLOAT_VECTOR, dim=4)
+    index_params = client.prepare_index_params()
+    index_params.add_index("embedding", index_type="FLAT", metric_type="COSINE")
+    client.create_collection(COLLECTION, schema=schema, index_params=index_params)
+    client.insert(
+        COLLECTION,
+        [
+            {
+                "id": doc_id,
+                "group": i % 3,
+                "embedding": [1.0, float(i), 0.0, 0.0],
+                "file_name": f"{doc_id}.txt",
+            }
+            for i, doc_id in enumerate(IDS)
+        ],
+    )
+    vector_store = SimpleNamespace(collection_name=COLLECTION, client=client)
+    stores = {None: vector_store, COLLECTION: vector_store}
+    monkeypatch.setattr(
+        collection_export.MilvusManager,
+        "get_vector_store",
+        lambda collection=None: stores.get(collection),
+    )
+    MilvusExecutor.init(vector_store, uri=uri, pool_size=1)
+    yield client
+    MilvusExecutor.shutdown()
+
+
+def export_pages(page_size, **kwargs):
+    """
+    按 last_id 作为下一页的 cursor 翻页导出，返回每页的记录
+    """
+
+    async def run():
+        pages, cursor = [], None
+        while True:
+            export = await CollectionExport.open(
+                cursor=cursor, limit=page_size, batch_size=4, **kwargs
+            )
+            rows = [row async for batch in export.batches() for row in batch]
+            if not rows:
+                return pages
+            assert export.count == len(rows)
+            pages.append(rows)
+            cursor = export.last_id
+
+    return asyncio.run(run())
+
+
+def test_cursor_pages_cover_every_row_once(milvus):
+    pages = export_pages(10)
+    assert [len(page) for page in pages] == [10, 10, 5]
+    ids = [row["id"] for page in pages for row in page]
+    # 按主键升序返回，相邻页既不重复也不遗漏
+    assert ids == sorted(IDS)
+    # 默认导出标量字段和动态字段，不包含向量
+    row = pages[0][0]
+    assert row["file_name"] == f"{row['id']}.txt"
+    assert "embedding" not in row
+
+
+def test_cursor_pages_keep_filter(milvus):
+    pages = export_pages(3, filter_expr="group == 1 or group == 2", fields=["id"])
+    ids = [row["id"] for page in pages for row in page]
+    expected = sorted(doc_id for i, doc_id in enumerate(IDS) if i % 3 != 0)
+    assert ids == expected
+    assert all(set(row) == {"id"} for page in pages for row in page)
+
+
+def test_cursor_with_quotes_is_escaped(milvus):
+    # 主键中包含需要转义的引号和反斜杠
+    special = ['doc-"quoted"', "doc-back\\slash"]
+    milvus.insert(
+        COLLECTION,
+        [
+            {"id": doc_id, "group": 0, "embedding": [1.0, 0.0, 0.0, 0.0]}
+            for doc_id in special
+        ],
+    )
+    rows = milvus.query(
+        COLLECTION,
+        filter=build_filter("group == 0", special[0], "id"),
+        output_fields=["id"],
+    )
+    ids = sorted(row["id"] for row in rows)
+    assert ids == sorted(doc_id for doc_id in IDS[::3] + special if doc_id > special[0])
+
+
+def test_export_named_collection(milvus):
+    pages = export_pages(100, collection=COLLECTION)
+    assert [row["id"] for row in pages[0]] == IDS
+    with pytest.raises(ValueError):
+        export_pages(100, collection="missing")
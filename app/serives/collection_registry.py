@@ -0,0 +1,111 @@
+# app/serives/collection_registry.py
+import re
+from typing import Dict, List, Optional
+
+from app.models.config.milvus_config import CollectionConfig, MilvusConfig
+from config.setting import (
+    EMBEDDING_DEFAULT_MODEL,
+    EMBEDDING_MATRYOSHKA_ENABLED,
+    EMBEDDING_MODELS,
+    MILVUS_COLLECTION_PREFIX,
+)
+
+
+def collection_name_for_model(model: str) -> str:
+    """
+    按模型名生成集合名，Milvus 集合名只允许字母、数字和下划线
+    """
+    return re.sub(r"\W", "_", MILVUS_COLLECTION_PREFIX + model)
+
+
+def resolve_collection_config(config: CollectionConfig) -> CollectionConfig:
+    """
+    补全集合配置：未配置的模型、集合名、维度和 matryoshka 开关按注册表和默认值填充
+    """
+    model = config.embeddingModel or EMBEDDING_DEFAULT_MODEL
+    if model not in EMBEDDING_MODELS:
+        raise ValueError(
+            f"Unknown embedding model: {model}, supported: {list(EMBEDDING_MODELS)}"
+        )
+    model_config = EMBEDDING_MODELS[model]
+    matryoshka = (
+        EMBEDDING_MATRYOSHKA_ENABLED if config.matryoshka is None else config.matryoshka
+    )
+    return CollectionConfig(
+        **{
+            **config.model_dump(include=set(CollectionConfig.model_fields)),
+            "collectionName": config.collectionName or collection_name_for_model(model),
+            "embeddingModel": model,
+            "dim": config.dim or model_config["dim"],
+            # 只有 Matryoshka 训练的模型截断后仍保持召回
+            "matryoshka": matryoshka and model_config.get("matryoshka", False),
+        }
+    )
+
+
+def resolve_collections(milvus_config: MilvusConfig) -> Dict[str, CollectionConfig]:
+    """
+    补全默认集合和 milvus.collections 中的集合配置，按集合名索引，默认集合在最前
+    """
+    default = resolve_collection_config(milvus_config)
+    collections = {default.collectionName: default}
+    for config in milvus_config.collections or []:
+        config = resolve_collection_config(config)
+        if config.collectionName in collections:
+            raise ValueError(f"Duplicate collection: {config.collectionName}")
+        collections[config.collectionName] = config
+    return collections
+
+
+class CollectionRegistry:
+    """
+    集合注册表：每个集合对应一个 embedding 模型和向量维度
+
+    默认集合来自 milvus 配置本身，其余集合来自 milvus.collections；
+    检索和入库请求按集合名查找，未指定集合时使用默认集合
+    """
+
+    _collections: Dict[str, CollectionConfig] = {}
+    _default: Optional[str] = None
+
+    @classmethod
+    def init(cls, milvus_config: Optional[MilvusConfig] = None):
+        if milvus_config is None:
+            from config.etcd_config import ETCD_CONFIG
+
+            milvus_config = ETCD_CONFIG.milvusConfig
+
+        collections = resolve_collections(milvus_config)
+        cls._collections = collections
+        cls._default = next(iter(collections))
+
+    @classmethod
+    def get(cls, collection: Optional[str] = None) -> CollectionConfig:
+        """
+        获取集合配置，collection 为空时返回默认集合，未注册的集合抛出 ValueError
+        """
+        if not cls._collections:
+            cls.init()
+        config = cls._collections.get(collection or cls._default)
+        if config is None:
+            raise ValueError(f"Unknown collection: {collection}")
+        return config
+
+    @classmethod
+    def has(cls, collection: str) -> bool:
+        if not cls._collections:
+            cls.init()
+        return collection in cls._collections
+
+    @classmethod
+    def get_default_name(cls) -> str:
+        return cls.get().collectionName
+
+    @classmethod
+    def list(cls) -> List[CollectionConfig]:
+        """
+        全部集合配置，默认集合在最前
+        """
+        if not cls._collections:
+            cls.init()
+        return list(cls._collections.values())
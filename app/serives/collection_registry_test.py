@@ -0,0 +1,74 @@
+# app/serives/collection_registry_test.py
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from app.models.config.milvus_config import CollectionConfig, MilvusConfig
+from app.serives.collection_registry import (
+    CollectionRegistry,
+    collection_name_for_model,
+)
+
+
+def milvus_config(**kwargs):
+    return MilvusConfig(
+        host="127.0.0.1",
+        port=19530,
+        collectionName="documents",
+        dim=768,
+        **kwargs,
+    )
+
+
+def test_collections_resolve_model_and_dim():
+    CollectionRegistry.init(
+        milvus_config(
+            collections=[
+                CollectionConfig(embeddingModel="bge-m3"),
+                CollectionConfig(collectionName="short", dim=256, matryoshka=True),
+            ]
+        )
+    )
+    default = CollectionRegistry.get()
+    assert default.collectionName == "documents"
+    assert default.embeddingModel == "nomic-embed-text"
+
+    bge = CollectionRegistry.get(collection_name_for_model("bge-m3"))
+    assert bge.collectionName == "lama_rag_bge_m3"
+    assert (bge.embeddingModel, bge.dim) == ("bge-m3", 1024)
+
+    short = CollectionRegistry.get("short")
+    assert (short.embeddingModel, short.dim, short.matryoshka) == (
+        "nomic-embed-text",
+        256,
+        True,
+    )
+    assert [config.collectionName for config in CollectionRegistry.list()] == [
+        "documents",
+        "lama_rag_bge_m3",
+        "short",
+    ]
+
+
+def test_unknown_collection_and_model_are_rejected():
+    CollectionRegistry.init(milvus_config())
+    assert not CollectionRegistry.has("missing")
+    with pytest.raises(ValueError):
+        CollectionRegistry.get("missing")
+    with pytest.raises(ValueError):
+        CollectionRegistry.init(milvus_config(embeddingModel="unknown"))
+
+
+def test_matryoshka_requires_matryoshka_model():
+    CollectionRegistry.init(
+        milvus_config(
+            collections=[CollectionConfig(embeddingModel="bge-large", matryoshka=True)]
+        )
+    )
+    assert not CollectionRegistry.get(collection_name_for_model("bge-large")).matryoshka
@@ -0,0 +1,380 @@
+# app/serives/collection_snapshot.py
+"""
+集合快照：把集合导出为列式文件，再批量导入新集合，迁移或换索引时不需要重新生成嵌入向量
+
+快照目录结构：
+    manifest.json    集合结构、索引类型、向量类型、行数
+    records.parquet  除向量外的字段，动态字段以 JSON 字符串保存在 $meta 列
+    vectors.npy      float32 的 (行数, 维度) 连续矩阵，第 i 行对应 records.parquet 的第 i 行，
+                     可以用 np.load(mmap_mode="r") 内存映射读取；FLOAT16_VECTOR 和
+                     BFLOAT16_VECTOR 解码为 float32 保存，导入时按 vector_type 转回原类型
+
+示例：
+    python -m app.serives.collection_snapshot export --uri ./milvus_llamaindex.db \\
+        --collection document_vectors --output cache/snapshots/document_vectors
+    python -m app.serives.collection_snapshot import --uri http://localhost:19530 \\
+        --input cache/snapshots/document_vectors --collection document_vectors_v2 --index-type HNSW
+"""
+
+import argparse
+import json
+import os
+import struct
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pymilvus import DataType, MilvusClient
+
+from app.core.vector_quantization import FLOAT_VECTOR, decode_vector, encode_vector
+from app.serives.collection_export import DYNAMIC_FIELD, VECTOR_TYPES
+from app.utils.log import log
+from config.setting import (
+    MILVUS_INDEX_PARAMS,
+    MILVUS_SNAPSHOT_EXPORT_BATCH_SIZE,
+    MILVUS_SNAPSHOT_IMPORT_BATCH_SIZE,
+)
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+RECORDS_FILE = "records.parquet"
+VECTORS_FILE = "vectors.npy"
+
+# npy 文件头固定为 128 字节，导出结束后原地改写行数
+_NPY_HEADER_SIZE = 128
+
+# 支持导出的稠密向量类型
+SNAPSHOT_VECTOR_TYPES = {
+    DataType.FLOAT_VECTOR,
+    DataType.FLOAT16_VECTOR,
+    DataType.BFLOAT16_VECTOR,
+}
+
+_ARROW_TYPES = {
+    DataType.BOOL: pa.bool_(),
+    DataType.INT8: pa.int8(),
+    DataType.INT16: pa.int16(),
+    DataType.INT32: pa.int32(),
+    DataType.INT64: pa.int64(),
+    DataType.FLOAT: pa.float32(),
+    DataType.DOUBLE: pa.float64(),
+    DataType.VARCHAR: pa.string(),
+}
+
+
+def _npy_header(rows: int, dim: int) -> bytes:
+    header = repr(
+        {"descr": "<f4", "fortran_order": False, "shape": (rows, dim)}
+    ).encode("latin1")
+    prefix = np.lib.format.magic(1, 0) + struct.pack("<H", _NPY_HEADER_SIZE - 10)
+    padding = _NPY_HEADER_SIZE - len(prefix) - len(header) - 1
+    return prefix + header + b" " * padding + b"\n"
+
+
+def _arrow_type(data_type: DataType) -> pa.DataType:
+    # JSON、ARRAY 等类型以 JSON 字符串保存
+    return _ARROW_TYPES.get(data_type, pa.string())
+
+
+def _to_column_value(value: Any, data_type: DataType) -> Any:
+    if data_type in _ARROW_TYPES or value is None:
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _from_column_value(value: Any, data_type: DataType) -> Any:
+    if data_type in _ARROW_TYPES or value is None:
+        return value
+    return json.loads(value)
+
+
+def _describe(client: MilvusClient, collection_name: str) -> Dict[str, Any]:
+    """
+    读取集合结构，只支持单个 FLOAT_VECTOR、FLOAT16_VECTOR 或 BFLOAT16_VECTOR 向量字段
+    """
+    info = client.describe_collection(collection_name)
+    vector_fields = [field for field in info["fields"] if field["type"] in VECTOR_TYPES]
+    if len(vector_fields) != 1 or vector_fields[0]["type"] not in SNAPSHOT_VECTOR_TYPES:
+        raise ValueError(
+            f"Collection {collection_name} must have exactly one dense float vector "
+            f"field, supported: {sorted(t.name for t in SNAPSHOT_VECTOR_TYPES)}"
+        )
+    vector_field = vector_fields[0]
+    index = client.describe_index(collection_name, vector_field["name"]) or {}
+    return {
+        "collection_name": collection_name,
+        "fields": [
+            {
+                "name": field["name"],
+                "type": field["type"].name,
+                "params": field.get("params") or {},
+                "is_primary": bool(field.get("is_primary")),
+            }
+            for field in info["fields"]
+        ],
+        "enable_dynamic_field": bool(info.get("enable_dynamic_field")),
+        "vector_field": vector_field["name"],
+        "vector_type": vector_field["type"].name,
+        "dim": int(vector_field["params"]["dim"]),
+        "index_type": index.get("index_type"),
+        "metric_type": index.get("metric_type"),
+    }
+
+
+def export_snapshot(
+    client: MilvusClient,
+    collection_name: str,
+    output_dir: str,
+    batch_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    逐批读取集合并追加写入 parquet 和 npy 文件，内存中只保留一批数据，返回 manifest
+    """
+    start_time = time.time()
+    batch_size = batch_size or MILVUS_SNAPSHOT_EXPORT_BATCH_SIZE
+    manifest = _describe(client, collection_name)
+    vector_field = manifest["vector_field"]
+    vector_type = manifest["vector_type"]
+    dim = manifest["dim"]
+    scalar_fields = [
+        (field["name"], DataType[field["type"]])
+        for field in manifest["fields"]
+        if field["name"] != vector_field
+    ]
+    schema_names = {name for name, _ in scalar_fields} | {vector_field}
+    arrow_schema = pa.schema(
+        [(name, _arrow_type(data_type)) for name, data_type in scalar_fields]
+        + ([(DYNAMIC_FIELD, pa.string())] if manifest["enable_dynamic_field"] else [])
+    )
+
+    if client.get_load_state(collection_name)["state"].name != "Loaded":
+        client.load_collection(collection_name)
+
+    os.makedirs(output_dir, exist_ok=True)
+    rows_written = 0
+    iterator = client.query_iterator(
+        collection_name=collection_name,
+        batch_size=batch_size,
+        filter="",
+        output_fields=["*"],
+    )
+    try:
+        with open(
+            os.path.join(output_dir, VECTORS_FILE), "wb"
+        ) as vectors_file, pq.ParquetWriter(
+            os.path.join(output_dir, RECORDS_FILE), arrow_schema
+        ) as writer:
+            vectors_file.write(_npy_header(0, dim))
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                vectors = np.stack(
+                    [decode_vector(row[vector_field], vector_type) for row in rows]
+                ).reshape(len(rows), dim)
+                vectors_file.write(vectors.tobytes())
+
+                columns = {
+                    name: [_to_column_value(row.get(name), data_type) for row in rows]
+                    for name, data_type in scalar_fields
+                }
+                if manifest["enable_dynamic_field"]:
+                    columns[DYNAMIC_FIELD] = [
+                        json.dumps(
+                            {k: v for k, v in row.items() if k not in schema_names},
+                            ensure_ascii=False,
+                        )
+                        for row in rows
+                    ]
+                writer.write_batch(
+                    pa.RecordBatch.from_pydict(columns, schema=arrow_schema)
+                )
+                rows_written += len(rows)
+                log.info(f"snapshot export {collection_name}: {rows_written} rows")
+
+            # 写入实际行数
+            vectors_file.seek(0)
+            vectors_file.write(_npy_header(rows_written, dim))
+    finally:
+        iterator.close()
+
+    manifest.update(
+        {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "rows": rows_written,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+    )
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    duration = int((time.time() - start_time) * 1000)
+    log.info(
+        f"export snapshot[collection: {collection_name}, rows: {rows_written}, "
+        f"path: {output_dir}], duration: {duration} ms"
+    )
+    return manifest
+
+
+def load_manifest(input_dir: str) -> Dict[str, Any]:
+    with open(os.path.join(input_dir, MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported snapshot format: {manifest.get('format_version')}"
+        )
+    return manifest
+
+
+def import_snapshot(
+    client: MilvusClient,
+    input_dir: str,
+    collection_name: str,
+    index_type: Optional[str] = None,
+    metric_type: Optional[str] = None,
+    index_params: Optional[Dict[str, Any]] = None,
+    batch_size: Optional[int] = None,
+    overwrite: bool = False,
+) -> Dict[str, Any]:
+    """
+    按快照中的结构创建新集合，先批量写入再建索引，最后加载集合
+
+    向量文件以内存映射方式读取，每次只读入一批；index_type 为空时沿用快照中的索引类型
+    """
+    start_time = time.time()
+    batch_size = batch_size or MILVUS_SNAPSHOT_IMPORT_BATCH_SIZE
+    manifest = load_manifest(input_dir)
+    vector_field = manifest["vector_field"]
+    # 旧快照没有记录向量类型，均为 FLOAT_VECTOR
+    vector_type = manifest.get("vector_type", FLOAT_VECTOR)
+    index_type = (index_type or manifest["index_type"] or "FLAT").upper()
+    metric_type = (metric_type or manifest["metric_type"] or "COSINE").upper()
+    if index_type not in MILVUS_INDEX_PARAMS:
+        raise ValueError(
+            f"Unsupported index type: {index_type}, "
+            f"supported: {list(MILVUS_INDEX_PARAMS)}"
+        )
+
+    vectors = np.load(os.path.join(input_dir, VECTORS_FILE), mmap_mode="r")
+    if vectors.shape != (manifest["rows"], manifest["dim"]):
+        raise ValueError(
+            f"Vector file shape {vectors.shape} does not match manifest "
+            f"({manifest['rows']}, {manifest['dim']})"
+        )
+
+    if client.has_collection(collection_name):
+        if not overwrite:
+            raise ValueError(f"Collection {collection_name} already exists")
+        client.drop_collection(collection_name)
+
+    # 保留原有主键，不使用 auto_id
+    schema = MilvusClient.create_schema(
+        auto_id=False, enable_dynamic_field=manifest["enable_dynamic_field"]
+    )
+    scalar_fields = []
+    for field in manifest["fields"]:
+        data_type = DataType[field["type"]]
+        schema.add_field(
+            field["name"],
+            data_type,
+            is_primary=field["is_primary"],
+            **field["params"],
+        )
+        if field["name"] != vector_field:
+            scalar_fields.append((field["name"], data_type))
+    client.create_collection(collection_name, schema=schema)
+
+    rows_written = 0
+    records = pq.ParquetFile(os.path.join(input_dir, RECORDS_FILE))
+    for batch in records.iter_batches(batch_size=batch_size):
+        columns = batch.to_pydict()
+        batch_vectors = vectors[rows_written : rows_written + batch.num_rows]
+        rows: List[Dict[str, Any]] = []
+        for i in range(batch.num_rows):
+            row = (
+                json.loads(columns[DYNAMIC_FIELD][i] or "{}")
+                if DYNAMIC_FIELD in columns
+                else {}
+            )
+            for name, data_type in scalar_fields:
+                row[name] = _from_column_value(columns[name][i], data_type)
+            row[vector_field] = encode_vector(
+                batch_vectors[i].tolist(), vector_type, as_bytes=True
+            )
+            rows.append(row)
+        client.insert(collection_name, rows)
+        rows_written += batch.num_rows
+        log.info(f"snapshot import {collection_name}: {rows_written} rows")
+
+    if rows_written != manifest["rows"]:
+        raise ValueError(
+            f"Records file has {rows_written} rows, manifest has {manifest['rows']}"
+        )
+
+    # 数据全部写入后再建索引，比边写边建索引快
+    client.flush(collection_name)
+    index = client.prepare_index_params()
+    index.add_index(
+        field_name=vector_field,
+        index_type=index_type,
+        metric_type=metric_type,
+        params={**MILVUS_INDEX_PARAMS[index_type], **(index_params or {})},
+    )
+    client.create_index(collection_name, index)
+    client.load_collection(collection_name)
+
+    duration = int((time.time() - start_time) * 1000)
+    log.info(
+        f"import snapshot[collection: {collection_name}, rows: {rows_written}, "
+        f"index: {index_type}, metric: {metric_type}], duration: {duration} ms"
+    )
+    return {
+        "collection_name": collection_name,
+        "rows": rows_written,
+        "index_type": index_type,
+        "metric_type": metric_type,
+        "duration": duration,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Milvus collection snapshot")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export a collection")
+    export_parser.add_argument("--uri", type=str, required=True)
+    export_parser.add_argument("--collection", type=str, required=True)
+    export_parser.add_argument("--output", type=str, required=True)
+    export_parser.add_argument("--batch-size", type=int, default=None)
+
+    import_parser = subparsers.add_parser("import", help="Import into a new collection")
+    import_parser.add_argument("--uri", type=str, required=True)
+    import_parser.add_argument("--input", type=str, required=True)
+    import_parser.add_argument("--collection", type=str, required=True)
+    import_parser.add_argument("--index-type", type=str, default=None)
+    import_parser.add_argument("--metric-type", type=str, default=None)
+    import_parser.add_argument("--batch-size", type=int, default=None)
+    import_parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    client = MilvusClient(uri=args.uri)
+    if args.command == "export":
+        result = export_snapshot(client, args.collection, args.output, args.batch_size)
+    else:
+        result = import_snapshot(
+            client,
+            args.input,
+            args.collection,
+            index_type=args.index_type,
+            metric_type=args.metric_type,
+            batch_size=args.batch_size,
+            overwrite=args.overwrite,
+        )
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
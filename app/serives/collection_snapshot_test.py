@@ -0,0 +1,225 @@
+# app/serives/collection_snapshot_test.py
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from pymilvus import DataType, MilvusClient
+
+from app.core.vector_quantization import (
+    BFLOAT16_VECTOR,
+    FLOAT16_VECTOR,
+    decode_vector,
+    encode_vector,
+)
+from app.serives.collection_snapshot import (
+    MANIFEST_FILE,
+    RECORDS_FILE,
+    VECTORS_FILE,
+    export_snapshot,
+    import_snapshot,
+)
+
+VECTORS = np.array([[0.5, -1.25, 3.0, 0.1], [2.0, 0.0, -0.75, 1e-3]], dtype="<f4")
+
+
+@pytest.mark.parametrize("vector_type", [FLOAT16_VECTOR, BFLOAT16_VECTOR])
+def test_half_precision_vectors_round_trip(vector_type):
+    for vector in VECTORS:
+        encoded = encode_vector(vector, vector_type, as_bytes=True)
+        assert isinstance(encoded, bytes) and len(encoded) == 2 * len(vector)
+        decoded = decode_vector(encoded, vector_type)
+        assert decoded.dtype == np.float32
+        assert np.allclose(decoded, vector, rtol=1e-2, atol=1e-3)
+        # pymilvus 查询结果中字节向量包在单元素列表中
+        assert np.array_equal(decode_vector([encoded], vector_type), decoded)
+        # 解码后的值再编码不变
+        assert encode_vector(decoded, vector_type, as_bytes=True) == encoded
+
+
+class FakeClient:
+    """
+    集合保存在内存中的假 MilvusClient，Milvus Lite 不支持半精度向量
+    """
+
+    def __init__(self):
+        self.collections = {}
+
+    def create_collection(self, name, schema):
+        self.collections[name] = {"schema": schema, "rows": [], "index": {}}
+
+    def has_collection(self, name):
+        return name in self.collections
+
+    def drop_collection(self, name):
+        self.collections.pop(name)
+
+    def describe_collection(self, name):
+        schema = self.collections[name]["schema"]
+        return {
+            "fields": [
+                {
+                    "name": field.name,
+                    "type": field.dtype,
+                    "params": field.params,
+                    "is_primary": field.is_primary,
+                }
+                for field in schema.fields
+            ],
+            "enable_dynamic_field": schema.enable_dynamic_field,
+        }
+
+    def describe_index(self, name, field_name):
+        return self.collections[name]["index"]
+
+    def get_load_state(self, name):
+        return {"state": SimpleNamespace(name="Loaded")}
+
+    def load_collection(self, name):
+        pass
+
+    def flush(self, name):
+        pass
+
+    def prepare_index_params(self):
+        return MilvusClient.prepare_index_params()
+
+    def create_index(self, name, index_params):
+        pass
+
+    def insert(self, name, rows):
+        self.collections[name]["rows"].extend(rows)
+
+    def query_iterator(self, collection_name, batch_size, **kwargs):
+        batches = iter(
+            [
+                [
+                    # 字节向量以单元素列表返回
+                    {**row, "vector": [row["vector"]]}
+                    for row in self.collections[collection_name]["rows"][i : i + 1]
+                ]
+                for i in range(len(self.collections[collection_name]["rows"]) + 1)
+            ]
+        )
+        return SimpleNamespace(next=lambda: next(batches), close=lambda: None)
+
+
+def test_float16_collection_snapshot(tmp_path):
+    client = FakeClient()
+    schema = MilvusClient.create_schema(auto_id=False)
+    schema.add_field("id", DataType.INT64, is_primary=True)
+    schema.add_field("vector", DataType.FLOAT16_VECTOR, dim=4)
+    client.create_collection("source", schema)
+    client.insert(
+        "source",
+        [
+            {"id": i, "vector": encode_vector(vector, FLOAT16_VECTOR, as_bytes=True)}
+            for i, vector in enumerate(VECTORS)
+        ],
+    )
+
+    manifest = export_snapshot(client, "source", str(tmp_path))
+    assert manifest["vector_type"] == "FLOAT16_VECTOR"
+    with open(tmp_path / MANIFEST_FILE, encoding="utf-8") as f:
+        assert json.load(f)["vector_type"] == "FLOAT16_VECTOR"
+    stored = np.load(tmp_path / VECTORS_FILE)
+    assert stored.dtype == np.float32
+    assert np.allclose(stored, VECTORS, rtol=1e-2, atol=1e-3)
+
+    import_snapshot(client, str(tmp_path), "target")
+    fields = client.describe_collection("target")["fields"]
+    assert [(field["name"], field["type"]) for field in fields] == [
+        ("id", DataType.INT64),
+        ("vector", DataType.FLOAT16_VECTOR),
+    ]
+    # 导入的向量与原集合的 float16 字节完全一致
+    assert client.collections["target"]["rows"] == client.collections["source"]["rows"]
+
+
+@pytest.fixture
+def lite_client(tmp_path):
+    client = MilvusClient(str(tmp_path / "snapshot.db"))
+    schema = client.create_schema(auto_id=False, enable_dynamic_field=True)
+    schema.add_field("id", DataType.VARCHAR, max_length=64, is_primary=True)
+    schema.add_field("page", DataType.INT64)
+    schema.add_field("tags", DataType.JSON)
+    schema.add_field("embedding", DataType.FLOAT_VECTOR, dim=8)
+    index_params = client.prepare_index_params()
+    index_params.add_index("embedding", index_type="FLAT", metric_type="COSINE")
+    client.create_collection("source", schema=schema, index_params=index_params)
+    rng = np.random.default_rng(7)
+    rows = [
+        {
+            "id": f"doc-{i:03d}",
+            "page": i,
+            "tags": {"kind": "note", "n": i},
+            "embedding": rng.random(8, dtype=np.float32).tolist(),
+            # 动态字段
+            "file_name": f"file-{i}.txt",
+        }
+        for i in range(57)
+    ]
+    client.insert("source", rows)
+    yield client, {row["id"]: row for row in rows}
+    client.close()
+
+
+def test_snapshot_round_trip_with_milvus_lite(lite_client, tmp_path):
+    client, rows = lite_client
+    output = str(tmp_path / "snapshot")
+    manifest = export_snapshot(client, "source", output, batch_size=10)
+    assert (manifest["rows"], manifest["dim"]) == (57, 8)
+    assert manifest["vector_type"] == "FLOAT_VECTOR"
+
+    result = import_snapshot(client, output, "target", index_type="FLAT", batch_size=16)
+    assert result["rows"] == 57
+    imported = client.query(
+        "target", filter="", output_fields=["*"], limit=len(rows) + 1
+    )
+    assert sorted(row["id"] for row in imported) == sorted(rows)
+    for row in imported:
+        expected = rows[row["id"]]
+        assert row["page"] == expected["page"]
+        assert row["tags"] == expected["tags"]
+        assert row["file_name"] == expected["file_name"]
+        assert np.array_equal(
+            np.asarray(row["embedding"], dtype="<f4"),
+            np.asarray(expected["embedding"], dtype="<f4"),
+        )
+    # 导入的集合可以直接检索
+    hits = client.search(
+        "target", [rows["doc-005"]["embedding"]], limit=1, output_fields=["id"]
+    )
+    assert hits[0][0]["id"] == "doc-005"
+
+
+def test_import_rejects_row_count_mismatch(lite_client, tmp_path):
+    client, _ = lite_client
+    output = str(tmp_path / "snapshot")
+    export_snapshot(client, "source", output, batch_size=10)
+
+    # records.parquet 少一行，向量文件与 manifest 一致
+    records_path = os.path.join(output, RECORDS_FILE)
+    table = pq.read_table(records_path)
+    pq.write_table(table.slice(0, table.num_rows - 1), records_path)
+    with pytest.raises(ValueError, match="Records file has 56 rows"):
+        import_snapshot(client, output, "target", index_type="FLAT")
+
+    # manifest 行数与向量文件不一致时不创建集合
+    with open(os.path.join(output, MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["rows"] = 58
+    with open(os.path.join(output, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    with pytest.raises(ValueError, match="does not match manifest"):
+        import_snapshot(client, output, "other", index_type="FLAT")
+    assert not client.has_collection("other")
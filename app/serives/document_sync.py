@@ -0,0 +1,275 @@
+# app/serives/document_sync.py
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from llama_index.core import Document, Settings
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import BaseNode, NodeRelationship
+
+from app.serives.embedding_manager import EmbeddingManager
+from app.serives.keyword_index_manager import KeywordIndexManager
+from app.serives.milvus_executor import ADMIN, MilvusExecutor
+from app.serives.milvus_manager import MilvusManager
+from app.serives.search_cache import get_search_cache
+from app.utils.log import log
+from config.setting import INGEST_EMBED_BATCH_SIZE, SYNC_DOCUMENT_BATCH_SIZE
+
+
+def chunk_hash(text: str, metadata: Dict[str, Any]) -> str:
+    """
+    chunk 内容哈希：文本和元数据任一变化都会得到新的 chunk id
+    """
+    content = json.dumps(
+        {"text": text, "metadata": metadata},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+
+def split_document(
+    splitter: SentenceSplitter, doc_id: str, text: str, metadata: Dict[str, Any]
+) -> List[BaseNode]:
+    """
+    切分文档，chunk id 为 "{doc_id}:{内容哈希}"，内容不变时 id 不变
+
+    同一文档中重复出现的相同 chunk 追加序号，保证 id 唯一
+    """
+    document = Document(text=text, metadata=metadata, doc_id=doc_id)
+    nodes = splitter.get_nodes_from_documents([document])
+    seen: Dict[str, int] = {}
+    for node in nodes:
+        node_id = f"{doc_id}:{chunk_hash(node.get_content(), node.metadata)}"
+        occurrence = seen.get(node_id, 0)
+        seen[node_id] = occurrence + 1
+        if occurrence:
+            node_id = f"{node_id}:{occurrence}"
+        node.id_ = node_id
+        # 相邻 chunk 的关系中包含随机生成的 id，只保留来源文档
+        node.relationships = {
+            NodeRelationship.SOURCE: node.relationships[NodeRelationship.SOURCE]
+        }
+    return nodes
+
+
+def _query_existing_ids(
+    connection, doc_ids: List[str], collection: Optional[str] = None
+) -> Dict[str, Set[str]]:
+    """
+    查询一批文档在 Milvus 中已有的 chunk id
+    """
+    vector_store = connection.get_store(collection)
+    doc_id_field = vector_store.doc_id_field
+    iterator = connection.client.query_iterator(
+        collection_name=vector_store.collection_name,
+        filter=f"{doc_id_field} in {json.dumps(doc_ids, ensure_ascii=False)}",
+        output_fields=["id", doc_id_field],
+    )
+    existing: Dict[str, Set[str]] = {doc_id: set() for doc_id in doc_ids}
+    try:
+        while True:
+            rows = iterator.next()
+            if not rows:
+                break
+            for row in rows:
+                existing.setdefault(row.get(doc_id_field), set()).add(str(row["id"]))
+    finally:
+        iterator.close()
+    return existing
+
+
+def _new_result(index: int, doc_id: Optional[str]) -> Dict[str, Any]:
+    return {
+        "index": index,
+        "doc_id": doc_id,
+        "status": "success",
+        "chunks": 0,
+        "unchanged": 0,
+        "upserted": 0,
+        "deleted": 0,
+        "error": None,
+    }
+
+
+def _mark_failed(result: Dict[str, Any], error: str):
+    result["status"] = "failed"
+    result["error"] = error
+
+
+async def _embed_nodes(
+    nodes: List[BaseNode], embed_batch_size: int, collection: Optional[str] = None
+):
+    for i in range(0, len(nodes), embed_batch_size):
+        batch = nodes[i : i + embed_batch_size]
+        embeddings = await EmbeddingManager.aget_embeddings(
+            [node.get_content() for node in batch], collection
+        )
+        for node, embedding in zip(batch, embeddings):
+            node.embedding = embedding
+
+
+async def _sync_document(
+    result: Dict[str, Any],
+    nodes: List[BaseNode],
+    existing_ids: Set[str],
+    embed_batch_size: int,
+    collection: Optional[str] = None,
+) -> bool:
+    """
+    同步单个文档：只对新 chunk 生成嵌入并写入，写入成功后再删除旧版本多出的 chunk
+
+    返回集合是否发生变化
+    """
+    node_ids = {node.node_id for node in nodes}
+    new_nodes = [node for node in nodes if node.node_id not in existing_ids]
+    stale_ids = sorted(existing_ids - node_ids)
+    result["chunks"] = len(nodes)
+    result["unchanged"] = len(nodes) - len(new_nodes)
+
+    try:
+        await _embed_nodes(new_nodes, embed_batch_size, collection)
+    except Exception as e:
+        _mark_failed(result, f"embedding failed: {e}")
+        return False
+
+    changed = False
+    try:
+        if new_nodes:
+            await MilvusExecutor.aupsert(new_nodes, collection)
+            # 分词和倒排表更新是 CPU 密集操作，不在事件循环中执行
+            await asyncio.to_thread(
+                KeywordIndexManager.add_nodes, new_nodes, collection
+            )
+            result["upserted"] = len(new_nodes)
+            changed = True
+        # 先写入再删除，同步过程中文档不会出现空窗
+        if stale_ids:
+            await MilvusExecutor.adelete(stale_ids, collection)
+            await asyncio.to_thread(
+                KeywordIndexManager.remove_nodes, stale_ids, collection
+            )
+            result["deleted"] = len(stale_ids)
+            changed = True
+    except Exception as e:
+        _mark_failed(result, f"sync failed: {e}")
+    return changed
+
+
+async def sync_documents(
+    items: List[Dict[str, Any]],
+    embed_batch_size: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    collection: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    增量同步：以调用方的 doc_id 标识文档，按 chunk 内容哈希对比 Milvus 中的已有版本
+
+    - 未变化的 chunk 直接跳过，不调用 Ollama
+    - 新增或变化的 chunk 生成嵌入后 upsert
+    - 新版本中已不存在的 chunk 删除；text 为空时删除整个文档
+
+    items 中每一项为 {"doc_id": ..., "text": ..., "metadata": ...}，解析失败的项以 {"error": ...} 传入；
+    doc_id 在集合内唯一，collection 为空时同步到默认集合
+    """
+    start_time = time.time()
+    embed_batch_size = embed_batch_size or INGEST_EMBED_BATCH_SIZE
+    batch_size = batch_size or SYNC_DOCUMENT_BATCH_SIZE
+
+    if not MilvusManager.get_vector_store(collection):
+        raise ValueError("Milvus vector store not initialized")
+
+    splitter = SentenceSplitter(
+        chunk_size=Settings.chunk_size, chunk_overlap=Settings.chunk_overlap
+    )
+    results: List[Dict[str, Any]] = []
+    entries = []
+    seen_doc_ids: Set[str] = set()
+    for index, item in enumerate(items):
+        doc_id = item.get("doc_id")
+        result = _new_result(index, doc_id)
+        results.append(result)
+
+        if item.get("error"):
+            _mark_failed(result, item["error"])
+        elif not doc_id:
+            _mark_failed(result, "doc_id is required")
+        elif doc_id in seen_doc_ids:
+            _mark_failed(result, "duplicate doc_id in request")
+        else:
+            seen_doc_ids.add(doc_id)
+            entries.append((result, item))
+
+    search_cache = get_search_cache(MilvusManager.get_collection_name(collection))
+    for i in range(0, len(entries), batch_size):
+        batch = entries[i : i + batch_size]
+        nodes_by_doc = {}
+        for result, item in batch:
+            text = item.get("text") or ""
+            try:
+                nodes_by_doc[result["doc_id"]] = (
+                    await asyncio.to_thread(
+                        split_document,
+                        splitter,
+                        result["doc_id"],
+                        text,
+                        item.get("metadata") or {},
+                    )
+                    if text.strip()
+                    else []
+                )
+            except Exception as e:
+                _mark_failed(result, f"split failed: {e}")
+
+        doc_ids = list(nodes_by_doc)
+        if not doc_ids:
+            continue
+        try:
+            existing = await MilvusExecutor.arun(
+                ADMIN, _query_existing_ids, doc_ids, collection
+            )
+        except Exception as e:
+            for result, _ in batch:
+                if result["status"] == "success":
+                    _mark_failed(result, f"query existing chunks failed: {e}")
+            continue
+
+        changed = False
+        try:
+            for result, _ in batch:
+                doc_id = result["doc_id"]
+                if doc_id not in nodes_by_doc:
+                    continue
+                changed |= await _sync_document(
+                    result,
+                    nodes_by_doc[doc_id],
+                    existing.get(doc_id, set()),
+                    embed_batch_size,
+                    collection,
+                )
+        finally:
+            # 每批文档同步后清空检索结果缓存，不等全部同步结束
+            if changed:
+                search_cache.invalidate()
+
+    totals = {
+        key: sum(result[key] for result in results)
+        for key in ("chunks", "unchanged", "upserted", "deleted")
+    }
+    succeeded = sum(1 for result in results if result["status"] == "success")
+    duration = int((time.time() - start_time) * 1000)
+    log.info(
+        f"sync documents total: {len(items)}, succeeded: {succeeded}, {totals}, "
+        f"duration: {duration} ms"
+    )
+    return {
+        "total": len(items),
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        **totals,
+        "duration": duration,
+        "results": results,
+    }
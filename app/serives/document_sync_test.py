@@ -0,0 +1,89 @@
+# app/serives/document_sync_test.py
+import asyncio
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from llama_index.core.node_parser import SentenceSplitter
+
+import app.serives.document_sync as document_sync
+from app.serives.document_sync import split_document, sync_documents
+
+splitter = SentenceSplitter(chunk_size=64, chunk_overlap=0)
+paragraphs = [f"Paragraph {i} talks about topic number {i}." * 3 for i in range(6)]
+
+
+def chunk_ids(text, metadata=None):
+    return [
+        node.node_id for node in split_document(splitter, "doc-1", text, metadata or {})
+    ]
+
+
+def test_chunk_ids_are_stable():
+    text = "\n\n".join(paragraphs)
+    ids = chunk_ids(text)
+    assert len(ids) > 1
+    assert ids == chunk_ids(text)
+    assert all(node_id.startswith("doc-1:") for node_id in ids)
+
+
+def test_only_changed_chunks_get_new_ids():
+    ids = chunk_ids("\n\n".join(paragraphs))
+    changed = chunk_ids("\n\n".join(paragraphs[:-1] + ["A rewritten last paragraph."]))
+    assert ids[:-1] == changed[:-1]
+    assert ids[-1] != changed[-1]
+    assert chunk_ids("\n\n".join(paragraphs), {"lang": "en"})[0] != ids[0]
+
+
+def test_repeated_chunks_get_unique_ids():
+    ids = chunk_ids("\n\n".join([paragraphs[0]] * 4))
+    assert len(ids) == len(set(ids))
+
+
+def test_search_cache_invalidated_after_each_batch(monkeypatch):
+    events = []
+    keyword_threads = set()
+
+    async def aget_embeddings(texts, collection=None):
+        return [[0.0, 1.0] for _ in texts]
+
+    async def query_existing(operation, fn, doc_ids, collection=None):
+        return {}
+
+    async def aupsert(nodes, collection=None):
+        events.append(("upsert", nodes[0].ref_doc_id))
+
+    def add_nodes(nodes, collection=None):
+        keyword_threads.add(threading.current_thread())
+
+    monkeypatch.setattr(
+        document_sync.EmbeddingManager, "aget_embeddings", aget_embeddings
+    )
+    monkeypatch.setattr(document_sync.MilvusExecutor, "arun", query_existing)
+    monkeypatch.setattr(document_sync.MilvusExecutor, "aupsert", aupsert)
+    monkeypatch.setattr(document_sync.KeywordIndexManager, "add_nodes", add_nodes)
+    monkeypatch.setattr(
+        document_sync.MilvusManager, "get_vector_store", lambda c=None: object()
+    )
+    cache = SimpleNamespace(invalidate=lambda: events.append(("invalidate",)))
+    monkeypatch.setattr(document_sync, "get_search_cache", lambda name: cache)
+
+    items = [{"doc_id": f"doc-{i}", "text": paragraphs[i]} for i in range(3)]
+    result = asyncio.run(sync_documents(items, batch_size=2))
+    assert result["succeeded"] == 3
+    # 每批写入后立即清空缓存，不等全部同步结束
+    assert events == [
+        ("upsert", "doc-0"),
+        ("upsert", "doc-1"),
+        ("invalidate",),
+        ("upsert", "doc-2"),
+        ("invalidate",),
+    ]
+    # 关键词索引在线程池中更新，不阻塞事件循环
+    assert threading.main_thread() not in keyword_threads
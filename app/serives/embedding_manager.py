@@ -1,14 +1,98 @@
 # app/services/embedding_manager.py
-from llama_index.embeddings.ollama import OllamaEmbedding
+import asyncio
+import threading
+from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.settings import Settings
 import time
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
+from app.custom.custom_timed_embedding_wrapper import CustomTimedEmbeddingWrapper
+from app.serives.collection_registry import CollectionRegistry
 from app.utils.log import log
+from app.utils.tracing import tracer
+from config.setting import (
+    EMBEDDING_DIM_PROBE_TEXT,
+    EMBEDDING_MODEL_IDLE_TTL,
+    EMBEDDING_MODEL_SWEEP_INTERVAL,
+    EMBEDDING_MODELS,
+)
+
+
+class LoadedEmbeddingModel:
+    """
+    一个已加载的 embedding 模型：Ollama 客户端外层依次为计时、合批、缓存，
+    集合维度小于模型维度时再按维度包一层 Matryoshka 截断
+    """
+
+    def __init__(
+        self,
+        name: str,
+        native_dim: int,
+        batching_model: BaseEmbedding,
+        cached_model: BaseEmbedding,
+    ):
+        self.name = name
+        self.native_dim = native_dim
+        # 合批层，用于查询批大小和排队耗时统计
+        self.batching_model = batching_model
+        # 缓存层，保存完整维度的向量，修改截断维度后仍可复用
+        self.cached_model = cached_model
+        self.loaded_at = time.time()
+        self.last_used = time.monotonic()
+        self._truncated: Dict[int, BaseEmbedding] = {}
+
+    def for_dim(self, dim: int) -> BaseEmbedding:
+        if dim == self.native_dim:
+            return self.cached_model
+        model = self._truncated.get(dim)
+        if model is None:
+            from config.embedding import with_matryoshka_truncation
+
+            model = self._truncated.setdefault(
+                dim, with_matryoshka_truncation(self.cached_model, dim)
+            )
+        return model
+
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self.last_used
+
+    def cache_stats(self) -> Optional[dict]:
+        if hasattr(self.cached_model, "get_cache_stats"):
+            return self.cached_model.get_cache_stats()
+        return None
+
+    def batch_stats(self) -> Optional[dict]:
+        if hasattr(self.batching_model, "get_batch_stats"):
+            return self.batching_model.get_batch_stats()
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model_name": self.cached_model.model_name,
+            "native_dim": self.native_dim,
+            "idle_seconds": round(self.idle_seconds(), 1),
+            "cache": self.cache_stats(),
+            "batch": self.batch_stats(),
+        }
 
 
 class EmbeddingManager:
+    """
+    管理 config/setting.py 中 EMBEDDING_MODELS 注册的 embedding 模型
+
+    - 请求按集合选择模型：集合对应的模型和维度来自 CollectionRegistry
+    - 模型在第一次使用时加载，已加载的实例在请求之间复用
+    - 空闲超过 EMBEDDING_MODEL_IDLE_TTL 的模型被释放，默认集合的模型常驻
+    """
+
     _instance = None
-    _embed_model = None
+    _models: Dict[str, LoadedEmbeddingModel] = {}
+    _lock = threading.Lock()
+    # 每个模型一把加载锁，加载（含探测请求）时不阻塞其它模型
+    _load_locks: Dict[str, threading.Lock] = {}
+    # reload 时递增，丢弃 reload 前开始加载的模型
+    _generation = 0
+    _sweeper: Optional[threading.Thread] = None
+    _stop_event = threading.Event()
 
     def __new__(cls):
         if cls._instance is None:
@@ -18,24 +102,27 @@ class EmbeddingManager:
     @classmethod
     def init(cls) -> bool:
         """
-        初始化 Embedding 模型
+        加载默认集合的 Embedding 模型
+
+        加载时请求一次模型探测实际输出的维度：与集合配置的维度一致时直接使用；
+        集合维度更小且开启了 matryoshka 时截断到集合维度，否则初始化失败
         """
         start_time = time.time()
         try:
-            from config.etcd_config import ETCD_CONFIG
-
-            # 初始化 Embedding 模型
-            cls._embed_model = OllamaEmbedding(
-                model_name="nomic-embed-text",
-                base_url=ETCD_CONFIG.ollamaConfig.url,
-                embed_batch_size=100,
-            )
+            config = CollectionRegistry.get()
+            embed_model = cls.get_model()
 
             # 设置为全局默认 embedding 模型
-            Settings.embed_model = cls._embed_model
+            Settings.embed_model = embed_model
+            cls._start_sweeper()
 
             duration = int((time.time() - start_time) * 1000)
-            log.info(f"init embedding model[nomic-embed-text], duration: {duration} ms")
+            log.info(
+                f"init embedding model[{config.embeddingModel}, "
+                f"collection: {config.collectionName}, dim: {config.dim}, "
+                f"native dim: {cls._models[config.embeddingModel].native_dim}], "
+                f"duration: {duration} ms"
+            )
             return True
 
         except Exception as e:
@@ -43,23 +130,236 @@ class EmbeddingManager:
             return False
 
     @classmethod
-    def get_embedding(cls, text: str) -> Optional[List[float]]:
+    def _load(cls, name: str) -> LoadedEmbeddingModel:
+        from config.embedding import (
+            build_ollama_embedding,
+            with_embedding_batching,
+            with_embedding_cache,
+        )
+
+        start_time = time.time()
+        ollama_embedding = build_ollama_embedding(name)
+        native_dim = cls.probe_dim(ollama_embedding)
+        if native_dim != EMBEDDING_MODELS[name]["dim"]:
+            log.warning(
+                f"embedding model {name} outputs {native_dim} dimensions, "
+                f"registered {EMBEDDING_MODELS[name]['dim']}"
+            )
+        # 缓存未命中的请求再合批发往 Ollama，每次实际调用 Ollama 的耗时和批大小计入指标
+        batching_model = with_embedding_batching(
+            CustomTimedEmbeddingWrapper(
+                ollama_embedding, message=f"ollama {name}", dim=native_dim
+            )
+        )
+        model = LoadedEmbeddingModel(
+            name, native_dim, batching_model, with_embedding_cache(batching_model)
+        )
+        duration = int((time.time() - start_time) * 1000)
+        log.info(
+            f"load embedding model[{name}, native dim: {native_dim}], "
+            f"duration: {duration} ms"
+        )
+        return model
+
+    @classmethod
+    def _acquire(cls, name: str) -> LoadedEmbeddingModel:
+        """
+        获取已加载的模型，未加载时加载，同一模型只加载一次
+
+        加载在该模型的锁内进行，不同模型可以同时加载，已加载的模型不需要等待
+        """
+        model = cls._models.get(name)
+        if model is None:
+            with cls._lock:
+                load_lock = cls._load_locks.setdefault(name, threading.Lock())
+            with load_lock:
+                model = cls._models.get(name)
+                if model is None:
+                    generation = cls._generation
+                    model = cls._load(name)
+                    with cls._lock:
+                        if generation == cls._generation:
+                            cls._models[name] = model
+        model.last_used = time.monotonic()
+        return model
+
+    @classmethod
+    def get_model(cls, collection: Optional[str] = None) -> BaseEmbedding:
+        """
+        获取集合对应的 Embedding 模型实例，模型未加载时加载（会请求一次 Ollama）
+        """
+        config = CollectionRegistry.get(collection)
+        model = cls._acquire(config.embeddingModel)
+        dim = config.dim
+        if dim > model.native_dim or (dim < model.native_dim and not config.matryoshka):
+            raise ValueError(
+                f"{config.embeddingModel} outputs {model.native_dim} dimensions, "
+                f"collection {config.collectionName} expects {dim}"
+            )
+        return model.for_dim(dim)
+
+    @classmethod
+    async def aget_model(cls, collection: Optional[str] = None) -> BaseEmbedding:
+        """
+        异步获取集合对应的模型，模型未加载时在线程池中加载，不阻塞事件循环
+        """
+        if CollectionRegistry.get(collection).embeddingModel in cls._models:
+            return cls.get_model(collection)
+        return await asyncio.to_thread(cls.get_model, collection)
+
+    @staticmethod
+    def probe_dim(embed_model: BaseEmbedding) -> int:
+        """
+        请求一次模型获取实际输出的维度，不经过缓存
+        """
+        return len(embed_model.get_text_embedding(EMBEDDING_DIM_PROBE_TEXT))
+
+    @classmethod
+    def get_dim(cls, collection: Optional[str] = None) -> int:
+        """
+        写入集合的向量维度，开启截断时小于模型的原始维度
+        """
+        return CollectionRegistry.get(collection).dim
+
+    @classmethod
+    def get_native_dim(cls, collection: Optional[str] = None) -> Optional[int]:
+        """
+        集合对应模型的原始维度，模型未加载时返回 None
+        """
+        model = cls._models.get(CollectionRegistry.get(collection).embeddingModel)
+        return model.native_dim if model else None
+
+    @classmethod
+    def get_embedding(
+        cls, text: str, collection: Optional[str] = None
+    ) -> Optional[List[float]]:
         """
         获取文本的嵌入向量
         """
         try:
-            if cls._embed_model is None:
-                raise ValueError("Embedding model not initialized")
+            embed_model = cls.get_model(collection)
+            with tracer.start_span("embedding", {"embedding.count": 1}):
+                return embed_model.get_text_embedding(text)
+
+        except Exception as e:
+            log.error(f"Error getting embedding: {e}")
+            return None
+
+    @classmethod
+    def get_embeddings(
+        cls, texts: List[str], collection: Optional[str] = None
+    ) -> List[List[float]]:
+        """
+        批量获取文本的嵌入向量，失败时抛出异常由调用方处理
+        """
+        embed_model = cls.get_model(collection)
+        with tracer.start_span("embedding", {"embedding.count": len(texts)}):
+            return embed_model.get_text_embedding_batch(texts)
 
-            return cls._embed_model.get_text_embedding(text)
+    @classmethod
+    async def aget_embedding(
+        cls, text: str, collection: Optional[str] = None
+    ) -> Optional[List[float]]:
+        """
+        异步获取文本的嵌入向量，不阻塞事件循环
+        """
+        try:
+            embed_model = await cls.aget_model(collection)
+            with tracer.start_span("embedding", {"embedding.count": 1}):
+                return await embed_model.aget_text_embedding(text)
 
         except Exception as e:
             log.error(f"Error getting embedding: {e}")
             return None
 
     @classmethod
-    def get_model(cls) -> Optional[OllamaEmbedding]:
+    async def aget_embeddings(
+        cls, texts: List[str], collection: Optional[str] = None
+    ) -> List[List[float]]:
+        """
+        异步批量获取文本的嵌入向量，失败时抛出异常由调用方处理
+        """
+        embed_model = await cls.aget_model(collection)
+        with tracer.start_span("embedding", {"embedding.count": len(texts)}):
+            return await embed_model.aget_text_embedding_batch(texts)
+
+    @classmethod
+    def release_idle(cls, ttl: Optional[float] = None) -> List[str]:
+        """
+        释放空闲超过 ttl 秒的模型，默认集合的模型常驻；返回释放的模型名
+
+        释放后丢弃客户端和合批状态并清空内存缓存，磁盘缓存保留，下次使用时重新加载
+        """
+        ttl = EMBEDDING_MODEL_IDLE_TTL if ttl is None else ttl
+        pinned = CollectionRegistry.get().embeddingModel
+        released = []
+        with cls._lock:
+            for name, model in list(cls._models.items()):
+                if name == pinned or model.idle_seconds() < ttl:
+                    continue
+                del cls._models[name]
+                if hasattr(model.cached_model, "clear_memory_cache"):
+                    model.cached_model.clear_memory_cache()
+                released.append(name)
+        for name in released:
+            log.info(f"release idle embedding model[{name}]")
+        return released
+
+    @classmethod
+    def _start_sweeper(cls):
+        if cls._sweeper is not None and cls._sweeper.is_alive():
+            return
+        cls._stop_event.clear()
+        cls._sweeper = threading.Thread(
+            target=cls._sweep, name="embedding_model_sweeper", daemon=True
+        )
+        cls._sweeper.start()
+
+    @classmethod
+    def _sweep(cls):
+        while not cls._stop_event.wait(EMBEDDING_MODEL_SWEEP_INTERVAL):
+            try:
+                cls.release_idle()
+            except Exception as e:
+                log.warning(f"Failed to release idle embedding models: {e}")
+
+    @classmethod
+    def reload(cls) -> bool:
+        """
+        丢弃已加载的模型并重新加载默认集合的模型，用于 Ollama 地址变更后切换到新的服务；
+        其它模型在下次使用时按新地址加载
+        """
+        with cls._lock:
+            models, cls._models = cls._models, {}
+            cls._generation += 1
+        for model in models.values():
+            if hasattr(model.cached_model, "clear_memory_cache"):
+                model.cached_model.clear_memory_cache()
+        return cls.init()
+
+    @classmethod
+    def shutdown(cls):
+        cls._stop_event.set()
+
+    @classmethod
+    def get_cache_stats(cls, collection: Optional[str] = None) -> Optional[dict]:
+        """
+        获取集合对应模型的 embedding 缓存命中统计，未启用缓存或模型未加载时返回 None
+        """
+        model = cls._models.get(CollectionRegistry.get(collection).embeddingModel)
+        return model.cache_stats() if model else None
+
+    @classmethod
+    def get_batch_stats(cls, collection: Optional[str] = None) -> Optional[dict]:
+        """
+        获取集合对应模型的合批统计，未启用合批或模型未加载时返回 None
+        """
+        model = cls._models.get(CollectionRegistry.get(collection).embeddingModel)
+        return model.batch_stats() if model else None
+
+    @classmethod
+    def get_models_stats(cls) -> Dict[str, Any]:
         """
-        获取 Embedding 模型实例
+        已加载模型的原始维度、空闲时间、缓存和合批统计
         """
-        return cls._embed_model
+        return {name: model.stats() for name, model in list(cls._models.items())}
@@ -0,0 +1,75 @@
+# app/serives/embedding_manager_test.py
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from app.serives.embedding_manager import EmbeddingManager
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """
+    替换模型加载，slow 模型在 release 事件触发前一直处于加载中
+    """
+    state = SimpleNamespace(
+        names=[], loading=threading.Event(), release=threading.Event()
+    )
+
+    def load(name):
+        state.names.append(name)
+        if name == "slow":
+            state.loading.set()
+            assert state.release.wait(5)
+        return SimpleNamespace(name=name, last_used=0.0)
+
+    monkeypatch.setattr(EmbeddingManager, "_models", {})
+    monkeypatch.setattr(EmbeddingManager, "_load_locks", {})
+    monkeypatch.setattr(EmbeddingManager, "_load", load)
+    yield state
+    state.release.set()
+
+
+def test_slow_load_does_not_block_other_models(loads):
+    slow_results = []
+    threads = [
+        threading.Thread(
+            target=lambda: slow_results.append(EmbeddingManager._acquire("slow"))
+        )
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    assert loads.loading.wait(5)
+
+    # slow 模型加载期间，其它模型照常加载和获取
+    assert EmbeddingManager._acquire("fast").name == "fast"
+    assert EmbeddingManager._acquire("fast").name == "fast"
+    assert not slow_results
+
+    loads.release.set()
+    for thread in threads:
+        thread.join(5)
+    # 同一模型的并发请求只加载一次
+    assert [model.name for model in slow_results] == ["slow"] * 3
+    assert sorted(loads.names) == ["fast", "slow"]
+
+
+def test_load_started_before_reload_is_discarded(loads, monkeypatch):
+    monkeypatch.setattr(EmbeddingManager, "init", classmethod(lambda cls: True))
+    thread = threading.Thread(target=EmbeddingManager._acquire, args=("slow",))
+    thread.start()
+    assert loads.loading.wait(5)
+
+    EmbeddingManager.reload()
+    loads.release.set()
+    thread.join(5)
+    # reload 前开始加载的模型可能使用旧的 Ollama 地址，不放入新的模型表
+    assert "slow" not in EmbeddingManager._models
@@ -0,0 +1,162 @@
+# app/serives/ingestion.py
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from llama_index.core import Document
+
+from app.serives.embedding_manager import EmbeddingManager
+from app.serives.keyword_index_manager import KeywordIndexManager
+from app.serives.milvus_executor import MilvusExecutor
+from app.serives.milvus_manager import MilvusManager
+from app.serives.search_cache import get_search_cache
+from app.utils.log import log
+from config.setting import INGEST_EMBED_BATCH_SIZE, INGEST_INSERT_BATCH_SIZE
+
+# (输入位置, 文档)
+IndexedDocument = Tuple[int, Document]
+
+
+def _iter_batch(items: List[Any], batch_size: int):
+    for i in range(0, len(items), batch_size):
+        yield items[i : i + batch_size]
+
+
+def _mark_failed(result: Dict[str, Any], error: str):
+    result["status"] = "failed"
+    result["id"] = None
+    result["error"] = error
+
+
+def _embed_batch(
+    entries: List[IndexedDocument],
+    results: List[Dict[str, Any]],
+    collection: Optional[str] = None,
+) -> List[IndexedDocument]:
+    """
+    对一批文档生成嵌入向量，整批失败时逐条重试以定位出错的文档
+    """
+    try:
+        embeddings = EmbeddingManager.get_embeddings(
+            [doc.text for _, doc in entries], collection
+        )
+        for (_, doc), embedding in zip(entries, embeddings):
+            doc.embedding = embedding
+        return entries
+    except Exception as e:
+        log.warning(f"embed batch of {len(entries)} failed, retry one by one: {e}")
+
+    embedded = []
+    for index, doc in entries:
+        try:
+            doc.embedding = EmbeddingManager.get_embeddings([doc.text], collection)[0]
+            embedded.append((index, doc))
+        except Exception as e:
+            _mark_failed(results[index], f"embedding failed: {e}")
+    return embedded
+
+
+def _insert_batch(
+    entries: List[IndexedDocument],
+    results: List[Dict[str, Any]],
+    collection: Optional[str] = None,
+) -> List[Any]:
+    """
+    批量写入 Milvus，整批失败时逐条重试以定位出错的文档，写入成功的文档再加入关键词索引
+
+    返回写入成功的文档
+    """
+    docs = [doc for _, doc in entries]
+    try:
+        MilvusExecutor.insert(docs, collection)
+    except Exception as e:
+        log.warning(f"insert batch of {len(entries)} failed, retry one by one: {e}")
+        docs = []
+        for index, doc in entries:
+            try:
+                MilvusExecutor.insert([doc], collection)
+                docs.append(doc)
+            except Exception as e:
+                _mark_failed(results[index], f"insert failed: {e}")
+    add_keyword_nodes(docs, collection)
+    return docs
+
+
+def add_keyword_nodes(nodes: List[Any], collection: Optional[str] = None):
+    """
+    把已写入 Milvus 的文档加入关键词索引
+
+    文档已经写入，索引更新失败时不重试写入、也不标记文档失败，只记录日志；
+    关键词索引在重启时从 Milvus 重建
+    """
+    if not nodes:
+        return
+    try:
+        KeywordIndexManager.add_nodes(nodes, collection)
+    except Exception as e:
+        log.error(f"Failed to add {len(nodes)} documents to keyword index: {e}")
+
+
+def ingest_documents(
+    items: List[Dict[str, Any]],
+    embed_batch_size: Optional[int] = None,
+    insert_batch_size: Optional[int] = None,
+    collection: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    批量入库：分批生成嵌入向量，再按大批次写入 Milvus
+
+    collection 为空时写入默认集合，嵌入向量使用集合对应的 embedding 模型
+
+    items 中每一项为 {"text": ..., "metadata": ...}，解析失败的项以 {"error": ...} 传入。
+    单个文档失败不会影响其它文档，结果中按输入顺序返回每个文档的状态。
+    """
+    start_time = time.time()
+    embed_batch_size = embed_batch_size or INGEST_EMBED_BATCH_SIZE
+    insert_batch_size = insert_batch_size or INGEST_INSERT_BATCH_SIZE
+
+    if not MilvusManager.get_vector_store(collection):
+        raise ValueError("Milvus vector store not initialized")
+
+    results: List[Dict[str, Any]] = []
+    entries: List[IndexedDocument] = []
+    for index, item in enumerate(items):
+        result = {"index": index, "status": "success", "id": None, "error": None}
+        results.append(result)
+
+        if item.get("error"):
+            _mark_failed(result, item["error"])
+            continue
+        text = item.get("text")
+        if not text or not text.strip():
+            _mark_failed(result, "text is empty")
+            continue
+
+        doc = Document(text=text, metadata=item.get("metadata") or {})
+        result["id"] = doc.doc_id
+        entries.append((index, doc))
+
+    # 先分批生成嵌入向量
+    embedded: List[IndexedDocument] = []
+    for batch in _iter_batch(entries, embed_batch_size):
+        embedded.extend(_embed_batch(batch, results, collection))
+    embed_duration = int((time.time() - start_time) * 1000)
+
+    # 再按大批次写入 Milvus，每批写入后立即清空检索结果缓存，不等全部写入结束
+    search_cache = get_search_cache(MilvusManager.get_collection_name(collection))
+    for batch in _iter_batch(embedded, insert_batch_size):
+        if _insert_batch(batch, results, collection):
+            search_cache.invalidate()
+
+    succeeded = sum(1 for result in results if result["status"] == "success")
+    duration = int((time.time() - start_time) * 1000)
+    log.info(
+        f"ingest documents total: {len(items)}, succeeded: {succeeded}, "
+        f"embed duration: {embed_duration} ms, duration: {duration} ms"
+    )
+    return {
+        "total": len(items),
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        "duration": duration,
+        "results": results,
+    }
@@ -0,0 +1,394 @@
+# app/serives/ingestion_pipeline.py
+import asyncio
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from llama_index.core import Document
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import BaseNode
+from llama_index.core.settings import Settings
+
+from app.serives.embedding_manager import EmbeddingManager
+from app.serives.ingestion import add_keyword_nodes
+from app.serives.keyword_index_manager import KeywordIndexManager
+from app.serives.milvus_executor import MilvusExecutor
+from app.serives.milvus_manager import MilvusManager
+from app.serives.search_cache import get_search_cache
+from app.utils.log import log
+from config.setting import (
+    INGEST_EMBED_BATCH_SIZE,
+    INGEST_EMBED_WORKERS,
+    INGEST_FLUSH_INTERVAL,
+    INGEST_INSERT_BATCH_SIZE,
+    INGEST_INSERT_WORKERS,
+    INGEST_PARSE_WORKERS,
+    INGEST_QUEUE_SIZE,
+    INGEST_SPLIT_WORKERS,
+)
+
+# 队列结束标记
+_DONE = object()
+
+
+class StageStats:
+    """
+    单个阶段的统计：处理数量、忙碌耗时、下游队列深度
+    """
+
+    def __init__(self, name: str, workers: int, queue: Optional[asyncio.Queue]):
+        self.name = name
+        self.workers = workers
+        self.queue = queue
+        self.items = 0
+        self.batches = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self.start_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+
+    def observe_queue(self):
+        if self.queue is not None:
+            self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+
+    def to_dict(self) -> Dict[str, Any]:
+        end_time = self.end_time or time.time()
+        elapsed = end_time - self.start_time if self.start_time else 0.0
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "batches": self.batches,
+            "errors": self.errors,
+            "busy_ms": int(self.busy_seconds * 1000),
+            "throughput": round(self.items / elapsed, 2) if elapsed > 0 else 0.0,
+            # 当前阶段的输出队列（即下一阶段的输入队列）
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+class IngestionPipeline:
+    """
+    流式入库流水线：parse -> split -> embed -> insert
+
+    阶段之间使用有界队列连接，下游处理不过来时上游会等待（背压）；
+    每个阶段有独立的并发数，切分（CPU）、embedding（Ollama）和写入（Milvus）可以同时进行。
+    """
+
+    # 正在运行的流水线，用于查询实时统计
+    running: Dict[str, "IngestionPipeline"] = {}
+
+    def __init__(
+        self,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        parse_workers: int = INGEST_PARSE_WORKERS,
+        split_workers: int = INGEST_SPLIT_WORKERS,
+        embed_workers: int = INGEST_EMBED_WORKERS,
+        insert_workers: int = INGEST_INSERT_WORKERS,
+        embed_batch_size: int = INGEST_EMBED_BATCH_SIZE,
+        insert_batch_size: int = INGEST_INSERT_BATCH_SIZE,
+        flush_interval: float = INGEST_FLUSH_INTERVAL,
+        collection: Optional[str] = None,
+    ):
+        self.id = uuid.uuid4().hex
+        # 写入的集合，为空时为默认集合
+        self.collection = collection
+        self.embed_batch_size = embed_batch_size
+        self.insert_batch_size = insert_batch_size
+        self.flush_interval = flush_interval
+        self.splitter = SentenceSplitter(
+            chunk_size=Settings.chunk_size, chunk_overlap=Settings.chunk_overlap
+        )
+
+        self._source_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._split_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._embed_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._insert_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.stages = {
+            "parse": StageStats("parse", parse_workers, self._split_queue),
+            "split": StageStats("split", split_workers, self._embed_queue),
+            "embed": StageStats("embed", embed_workers, self._insert_queue),
+            "insert": StageStats("insert", insert_workers, None),
+        }
+
+        self.results: List[Dict[str, Any]] = []
+        # 每个文档还未写入的 chunk 数
+        self._pending_chunks: Dict[int, int] = {}
+        # 每个文档已写入的 chunk id，文档失败时删除，重试时不会重复
+        self._inserted: Dict[int, List[str]] = {}
+
+    async def run(self, items: AsyncIterator[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        运行流水线直到输入耗尽，返回每个文档的结果和各阶段统计
+        """
+        if not MilvusManager.get_vector_store(self.collection):
+            raise ValueError("Milvus vector store not initialized")
+
+        start_time = time.time()
+        IngestionPipeline.running[self.id] = self
+        tasks = [
+            asyncio.ensure_future(coroutine)
+            for coroutine in (
+                self._feed(items),
+                self._run_stage(
+                    "parse", self._source_queue, self._split_queue, self._parse
+                ),
+                self._run_stage(
+                    "split", self._split_queue, self._embed_queue, self._split
+                ),
+                self._run_stage(
+                    "embed",
+                    self._embed_queue,
+                    self._insert_queue,
+                    self._embed,
+                    self.embed_batch_size,
+                ),
+                self._run_stage(
+                    "insert",
+                    self._insert_queue,
+                    None,
+                    self._insert,
+                    self.insert_batch_size,
+                ),
+            )
+        ]
+        try:
+            await asyncio.gather(*tasks)
+            await self._rollback_failed()
+        except BaseException:
+            # 任一阶段异常退出时取消其它阶段，避免它们一直阻塞在队列上
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            IngestionPipeline.running.pop(self.id, None)
+
+        succeeded = sum(1 for result in self.results if result["status"] == "success")
+        duration = int((time.time() - start_time) * 1000)
+        log.info(
+            f"ingestion pipeline[{self.id}] total: {len(self.results)}, "
+            f"succeeded: {succeeded}, duration: {duration} ms, stats: {self.stats()}"
+        )
+        return {
+            "total": len(self.results),
+            "succeeded": succeeded,
+            "failed": len(self.results) - succeeded,
+            "duration": duration,
+            "stages": self.stats(),
+            "results": self.results,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: stage.to_dict() for name, stage in self.stages.items()}
+
+    async def _feed(self, items: AsyncIterator[Dict[str, Any]]):
+        try:
+            async for item in items:
+                index = len(self.results)
+                self.results.append(
+                    {
+                        "index": index,
+                        "status": "success",
+                        "id": None,
+                        "chunks": 0,
+                        "error": None,
+                    }
+                )
+                await self._source_queue.put((index, item))
+        finally:
+            for _ in range(self.stages["parse"].workers):
+                await self._source_queue.put(_DONE)
+
+    async def _run_stage(
+        self,
+        name: str,
+        in_queue: asyncio.Queue,
+        out_queue: Optional[asyncio.Queue],
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        batch_size: int = 1,
+    ):
+        stage = self.stages[name]
+        stage.start_time = time.time()
+        await asyncio.gather(
+            *[
+                self._run_worker(stage, in_queue, out_queue, handler, batch_size)
+                for _ in range(stage.workers)
+            ]
+        )
+        stage.end_time = time.time()
+        # 当前阶段全部结束后，通知下一阶段的每个 worker
+        if out_queue is not None:
+            next_stage = list(self.stages)[list(self.stages).index(name) + 1]
+            for _ in range(self.stages[next_stage].workers):
+                await out_queue.put(_DONE)
+
+    async def _run_worker(
+        self,
+        stage: StageStats,
+        in_queue: asyncio.Queue,
+        out_queue: Optional[asyncio.Queue],
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        batch_size: int,
+    ):
+        batch: List[Any] = []
+        done = False
+        while not done:
+            timed_out = False
+            try:
+                # 攒批时最多等待 flush_interval，避免上游变慢时数据一直等不满一批
+                timeout = self.flush_interval if batch else None
+                item = await asyncio.wait_for(in_queue.get(), timeout=timeout)
+                if item is _DONE:
+                    done = True
+                else:
+                    batch.append(item)
+            except asyncio.TimeoutError:
+                timed_out = True
+
+            if batch and (done or timed_out or len(batch) >= batch_size):
+                current, batch = batch, []
+                begin = time.time()
+                outputs = await handler(current)
+                stage.busy_seconds += time.time() - begin
+                stage.items += len(current)
+                stage.batches += 1
+                if out_queue is not None:
+                    for output in outputs:
+                        await out_queue.put(output)
+                    stage.observe_queue()
+
+    def _fail(self, index: int, error: str):
+        result = self.results[index]
+        if result["status"] == "success":
+            result["status"] = "failed"
+            result["id"] = None
+            result["error"] = error
+        self._pending_chunks.pop(index, None)
+
+    async def _parse(self, entries: List[Any]) -> List[Any]:
+        outputs = []
+        for index, item in entries:
+            if item.get("error"):
+                self._fail(index, item["error"])
+                self.stages["parse"].errors += 1
+                continue
+            text = item.get("text")
+            if not text or not text.strip():
+                self._fail(index, "text is empty")
+                self.stages["parse"].errors += 1
+                continue
+            doc = Document(text=text, metadata=item.get("metadata") or {})
+            self.results[index]["id"] = doc.doc_id
+            outputs.append((index, doc))
+        return outputs
+
+    async def _split(self, entries: List[Any]) -> List[Any]:
+        outputs = []
+        for index, doc in entries:
+            try:
+                # 切分是 CPU 密集操作，放到线程池中执行，不阻塞事件循环
+                nodes = await asyncio.to_thread(
+                    self.splitter.get_nodes_from_documents, [doc]
+                )
+            except Exception as e:
+                self._fail(index, f"split failed: {e}")
+                self.stages["split"].errors += 1
+                continue
+            if not nodes:
+                self._fail(index, "no chunks after split")
+                continue
+            self.results[index]["chunks"] = len(nodes)
+            self._pending_chunks[index] = len(nodes)
+            outputs.extend((index, node) for node in nodes)
+        return outputs
+
+    async def _embed(self, entries: List[Any]) -> List[Any]:
+        entries = [
+            (index, node) for index, node in entries if index in self._pending_chunks
+        ]
+        if not entries:
+            return []
+        try:
+            embeddings = await EmbeddingManager.aget_embeddings(
+                [node.get_content() for _, node in entries], self.collection
+            )
+        except Exception as e:
+            log.warning(f"embed batch of {len(entries)} failed: {e}")
+            self.stages["embed"].errors += len(entries)
+            for index, _ in entries:
+                self._fail(index, f"embedding failed: {e}")
+            return []
+        for (_, node), embedding in zip(entries, embeddings):
+            node.embedding = embedding
+        return entries
+
+    def _invalidate_search_cache(self):
+        # 集合已变化，清空检索结果缓存
+        get_search_cache(
+            MilvusManager.get_collection_name(self.collection)
+        ).invalidate()
+
+    async def _insert(self, entries: List[Any]) -> List[Any]:
+        entries = [
+            (index, node) for index, node in entries if index in self._pending_chunks
+        ]
+        if not entries:
+            return []
+        nodes: List[BaseNode] = [node for _, node in entries]
+        try:
+            await MilvusExecutor.ainsert(nodes, self.collection)
+        except Exception as e:
+            log.warning(f"insert batch of {len(entries)} failed: {e}")
+            self.stages["insert"].errors += len(entries)
+            for index, _ in entries:
+                self._fail(index, f"insert failed: {e}")
+            return []
+        # 已写入 Milvus，关键词索引更新失败只记录日志，不标记文档失败
+        await asyncio.to_thread(add_keyword_nodes, nodes, self.collection)
+        self._invalidate_search_cache()
+        for index, node in entries:
+            self._inserted.setdefault(index, []).append(node.node_id)
+            if index in self._pending_chunks:
+                self._pending_chunks[index] -= 1
+                if self._pending_chunks[index] == 0:
+                    del self._pending_chunks[index]
+        return []
+
+    async def _rollback_failed(self):
+        """
+        删除失败文档已写入的 chunk
+
+        文档的部分 chunk 写入后其它 chunk 失败时，文档被标记为失败，已写入的 chunk 需要删除，
+        否则重试会产生重复。所有阶段结束后执行，不会与仍在写入的批次交错。
+        """
+        node_ids = [
+            node_id
+            for index, ids in self._inserted.items()
+            if self.results[index]["status"] == "failed"
+            for node_id in ids
+        ]
+        if not node_ids:
+            return
+        try:
+            await MilvusExecutor.adelete(node_ids, self.collection)
+        except Exception as e:
+            log.error(
+                f"Failed to delete {len(node_ids)} chunks of failed documents: {e}"
+            )
+            for index, ids in self._inserted.items():
+                result = self.results[index]
+                if result["status"] == "failed":
+                    result["error"] += f", {len(ids)} chunks not deleted"
+            return
+        finally:
+            self._invalidate_search_cache()
+        try:
+            await asyncio.to_thread(
+                KeywordIndexManager.remove_nodes, node_ids, self.collection
+            )
+        except Exception as e:
+            log.error(
+                f"Failed to remove {len(node_ids)} chunks from keyword index: {e}"
+            )
+        log.info(f"deleted {len(node_ids)} chunks of failed documents")
@@ -0,0 +1,149 @@
+# app/serives/ingestion_pipeline_test.py
+import asyncio
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from llama_index.core.node_parser import SentenceSplitter
+
+import app.serives.ingestion_pipeline as ingestion_pipeline
+from app.serives.ingestion_pipeline import IngestionPipeline
+
+
+class FakeStore:
+    """记录写入和删除的假 Milvus 集合、关键词索引和检索缓存"""
+
+    def __init__(self, insert_delay: float = 0.0, fail_text: str = None):
+        self.insert_delay = insert_delay
+        self.fail_text = fail_text
+        self.nodes = {}
+        self.keyword_ids = set()
+        self.inserts = 0
+        self.invalidations = 0
+
+    async def aget_embeddings(self, texts, collection=None):
+        return [[0.0, 1.0] for _ in texts]
+
+    async def ainsert(self, nodes, collection=None):
+        await asyncio.sleep(self.insert_delay)
+        if self.fail_text and any(self.fail_text in n.get_content() for n in nodes):
+            raise RuntimeError("insert rejected")
+        self.inserts += 1
+        self.nodes.update({node.node_id: node for node in nodes})
+
+    async def adelete(self, node_ids, collection=None):
+        for node_id in node_ids:
+            self.nodes.pop(node_id, None)
+
+    def add_nodes(self, nodes, collection=None):
+        self.keyword_ids.update(node.node_id for node in nodes)
+
+    def remove_nodes(self, node_ids, collection=None):
+        self.keyword_ids.difference_update(node_ids)
+
+    def invalidate(self):
+        self.invalidations += 1
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeStore()
+    monkeypatch.setattr(
+        ingestion_pipeline.EmbeddingManager, "aget_embeddings", store.aget_embeddings
+    )
+    monkeypatch.setattr(ingestion_pipeline.MilvusExecutor, "ainsert", store.ainsert)
+    monkeypatch.setattr(ingestion_pipeline.MilvusExecutor, "adelete", store.adelete)
+    monkeypatch.setattr(
+        ingestion_pipeline.KeywordIndexManager, "add_nodes", store.add_nodes
+    )
+    monkeypatch.setattr(
+        ingestion_pipeline.KeywordIndexManager, "remove_nodes", store.remove_nodes
+    )
+    monkeypatch.setattr(
+        ingestion_pipeline.MilvusManager, "get_vector_store", lambda c=None: object()
+    )
+    monkeypatch.setattr(ingestion_pipeline, "get_search_cache", lambda name: store)
+    return store
+
+
+def run_pipeline(items, **kwargs):
+    pipeline = IngestionPipeline(flush_interval=0.01, **kwargs)
+    pipeline.splitter = SentenceSplitter(chunk_size=64, chunk_overlap=0)
+
+    async def source():
+        for item in items:
+            yield item
+
+    return asyncio.run(pipeline.run(source()))
+
+
+def test_bounded_queues_hold_back_the_source(store):
+    store.insert_delay = 0.01
+    fed = []
+
+    async def source():
+        for i in range(40):
+            fed.append(i)
+            yield {"text": f"document {i}"}
+
+    async def run():
+        pipeline = IngestionPipeline(
+            queue_size=2,
+            parse_workers=1,
+            split_workers=1,
+            embed_workers=1,
+            insert_workers=1,
+            embed_batch_size=1,
+            insert_batch_size=1,
+            flush_interval=0.01,
+        )
+        task = asyncio.ensure_future(pipeline.run(source()))
+        # 写入变慢时上游停在有界队列上，不会一次读完输入
+        while store.inserts < 3:
+            await asyncio.sleep(0.005)
+        fed_during_insert = len(fed)
+        return fed_during_insert, await task
+
+    fed_during_insert, result = asyncio.run(run())
+    # 已写入的 3 个、4 个队列各 2 个、每个阶段处理中的 1 个和等待入队的 1 个
+    assert fed_during_insert <= 3 + 4 * 2 + 4 + 1
+    assert result["succeeded"] == 40
+    assert all(stage["max_queue_depth"] <= 2 for stage in result["stages"].values())
+
+
+def test_failed_document_chunks_are_deleted(store):
+    store.fail_text = "BROKEN"
+    paragraphs = [f"Paragraph {i} talks about topic number {i}." * 3 for i in range(4)]
+    result = run_pipeline(
+        [
+            {"text": "\n\n".join(paragraphs + ["BROKEN paragraph at the end."])},
+            {"text": "\n\n".join(paragraphs)},
+        ],
+        insert_batch_size=1,
+        embed_batch_size=1,
+    )
+    assert [item["status"] for item in result["results"]] == ["failed", "success"]
+    # 失败文档已写入的 chunk 被删除，重试不会产生重复
+    assert len(store.nodes) == result["results"][1]["chunks"]
+    assert store.keyword_ids == set(store.nodes)
+    # 每个写入批次后都清空检索缓存
+    assert store.invalidations >= store.inserts
+
+
+def test_keyword_index_failure_keeps_inserted_documents(store, monkeypatch):
+    def broken_add_nodes(nodes, collection=None):
+        raise RuntimeError("tokenizer crashed")
+
+    monkeypatch.setattr(
+        ingestion_pipeline.KeywordIndexManager, "add_nodes", broken_add_nodes
+    )
+    result = run_pipeline([{"text": "first document"}, {"text": "second document"}])
+    # 文档已写入 Milvus，不标记失败，也不会被删除
+    assert result["succeeded"] == 2
+    assert len(store.nodes) == 2
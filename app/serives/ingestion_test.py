@@ -0,0 +1,67 @@
+# app/serives/ingestion_test.py
+import os
+import sys
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from llama_index.core import Document
+
+from app.serives import ingestion
+
+
+def test_search_cache_invalidated_after_each_batch(monkeypatch):
+    events = []
+
+    def insert(docs, collection=None):
+        if any(doc.text == "broken" for doc in docs):
+            raise RuntimeError("insert failed")
+        events.append(("insert", [doc.text for doc in docs]))
+
+    monkeypatch.setattr(
+        ingestion.EmbeddingManager,
+        "get_embeddings",
+        lambda texts, c=None: [[0.0, 1.0] for _ in texts],
+    )
+    monkeypatch.setattr(ingestion.MilvusExecutor, "insert", insert)
+    monkeypatch.setattr(
+        ingestion.KeywordIndexManager, "add_nodes", lambda n, c=None: None
+    )
+    monkeypatch.setattr(
+        ingestion.MilvusManager, "get_vector_store", lambda c=None: object()
+    )
+    monkeypatch.setattr(
+        ingestion.MilvusManager, "get_collection_name", lambda c=None: "documents"
+    )
+    cache = SimpleNamespace(invalidate=lambda: events.append(("invalidate",)))
+    monkeypatch.setattr(ingestion, "get_search_cache", lambda name: cache)
+
+    items = [{"text": text} for text in ["a", "b", "broken", "c", "broken"]]
+    result = ingestion.ingest_documents(items, insert_batch_size=2)
+    assert result["succeeded"] == 3
+    # 每批写入后立即清空缓存，整批都没有写入时不清空
+    assert events == [
+        ("insert", ["a", "b"]),
+        ("invalidate",),
+        ("insert", ["c"]),
+        ("invalidate",),
+    ]
+
+
+def test_batch_insert_does_not_retry_when_keyword_index_fails(monkeypatch):
+    inserts = []
+    monkeypatch.setattr(
+        ingestion.MilvusExecutor, "insert", lambda docs, c=None: inserts.append(docs)
+    )
+
+    def broken_add_nodes(nodes, collection=None):
+        raise RuntimeError("tokenizer crashed")
+
+    monkeypatch.setattr(ingestion.KeywordIndexManager, "add_nodes", broken_add_nodes)
+    results = [{"status": "success"}, {"status": "success"}]
+    ingestion._insert_batch([(0, Document(text="a")), (1, Document(text="b"))], results)
+    assert len(inserts) == 1
+    assert [result["status"] for result in results] == ["success", "success"]
@@ -1,46 +1,104 @@
+import threading
 import time
 
-import requests
+from app.serives.collection_registry import CollectionRegistry, resolve_collections
 from app.serives.embedding_manager import EmbeddingManager
 from app.utils.log import log
 from llama_index.core.settings import Settings
 from llama_index.core.callbacks import LlamaDebugHandler, CallbackManager
 from llama_index.llms.ollama import Ollama
+from app.serives.keyword_index_manager import KeywordIndexManager
 from app.serives.milvus_manager import MilvusManager
+from app.serives.ollama_pool import OllamaPoolManager
+from app.serives.search_cache import drop_search_cache, get_search_cache
+from app.serives.startup import startup_scheduler
+from config.setting import (
+    LLAMA_DEBUG_HANDLER_ENABLED,
+    OLLAMA_CHECK_TIMEOUT,
+    OLLAMA_LLM_REQUEST_TIMEOUT,
+)
 
 
 def init_embedding():
     """
     初始化 Embedding 服务
     """
-    EmbeddingManager.init()
+    return EmbeddingManager.init()
 
 
 def init_milvus():
     """
-    初始化 Milvus 服务
+    初始化 Milvus 服务，加载默认集合和 milvus.collections 中配置的其它集合
     """
     start_time = time.time()
     from config.etcd_config import ETCD_CONFIG
 
     try:
-        MilvusManager.init(
-            host=ETCD_CONFIG.milvusConfig.host,
-            port=ETCD_CONFIG.milvusConfig.port,
-            collection_name=ETCD_CONFIG.milvusConfig.collectionName,
-            dim=ETCD_CONFIG.milvusConfig.dim,
-        )
+        collections = CollectionRegistry.list()
+        milvus_config = ETCD_CONFIG.milvusConfig
+        default = collections[0]
+        if not MilvusManager.init(
+            host=milvus_config.host,
+            port=milvus_config.port,
+            uri=milvus_config.uri,
+            collection_name=default.collectionName,
+            dim=default.dim,
+            index_type=default.indexType,
+            metric_type=default.metricType,
+            index_params=default.indexParams,
+            search_params=default.searchParams,
+            vector_type=default.vectorType,
+            rerank=default.rerank,
+            rerank_factor=default.rerankFactor,
+        ):
+            return False
+        for config in collections[1:]:
+            if not MilvusManager.add_collection(
+                collection_name=config.collectionName,
+                dim=config.dim,
+                index_type=config.indexType,
+                metric_type=config.metricType,
+                index_params=config.indexParams,
+                search_params=config.searchParams,
+                vector_type=config.vectorType,
+                rerank=config.rerank,
+                rerank_factor=config.rerankFactor,
+            ):
+                return False
     except Exception as e:
         log.error(f"Failed to initialize Milvus service: {e}")
         return False
 
     duration = int((time.time() - start_time) * 1000)
     log.info(
-        f"init milvus vector store[collection: {ETCD_CONFIG.milvusConfig.collectionName}], duration: {duration} ms"
+        f"init milvus vector store[collections: "
+        f"{[config.collectionName for config in collections]}], duration: {duration} ms"
     )
     return True
 
 
+def check_embedding_dim():
+    """
+    检查每个集合的实际维度与其 embedding 模型写入的维度一致，不一致时写入的向量无法检索，拒绝就绪
+
+    默认集合的模型已加载，同时核对模型的原始维度；其它集合的模型在第一次使用时加载并核对
+    """
+    passed = True
+    for config in CollectionRegistry.list():
+        embedding_dim = EmbeddingManager.get_dim(config.collectionName)
+        collection_dim = MilvusManager.get_dim(config.collectionName)
+        if embedding_dim != collection_dim:
+            log.error(
+                f"Embedding dim {embedding_dim} of {config.embeddingModel} "
+                f"(native {EmbeddingManager.get_native_dim(config.collectionName)}) "
+                f"does not match collection {config.collectionName} dim {collection_dim}"
+            )
+            passed = False
+    if passed:
+        log.info("embedding dim check passed")
+    return passed
+
+
 def init_ollama_llm():
     """
     初始化 Ollama LLM 服务
@@ -54,7 +112,9 @@ def init_ollama_llm():
         ollama_config = ETCD_CONFIG.ollamaConfig
 
         # 检查 Ollama 服务是否可用
-        response = requests.get(ollama_config.url)
+        response = OllamaPoolManager.get_http_client().get(
+            ollama_config.url, timeout=OLLAMA_CHECK_TIMEOUT
+        )
         if response.status_code != 200:
             log.error("Ollama service is not available")
             return False
@@ -63,18 +123,21 @@ def init_ollama_llm():
         llm = Ollama(
             model=ollama_config.model,  # 从配置中获取模型名称
             temperature=ollama_config.temperature,
-            request_timeout=120.0,
+            request_timeout=OLLAMA_LLM_REQUEST_TIMEOUT,
             base_url=ollama_config.url,
             # stop_sequences=["Human:", "Assistant:"],
+            # 与 embedding 共享 Ollama 连接池
+            client=OllamaPoolManager.get_client(
+                ollama_config.url, OLLAMA_LLM_REQUEST_TIMEOUT
+            ),
+            async_client=OllamaPoolManager.get_async_client(
+                ollama_config.url, OLLAMA_LLM_REQUEST_TIMEOUT
+            ),
         )
 
         # 设置为全局默认 LLM
         Settings.llm = llm
 
-        # 测试 LLM
-        test_response = llm.complete("Hello, are you ready?")
-        log.info(f"Ollama test response: {test_response}")
-
         duration = int((time.time() - start_time) * 1000)
         log.info(
             f"init llm ollama[model: {ollama_config.model}], duration: {duration} ms"
@@ -86,12 +149,26 @@ def init_ollama_llm():
         return False
 
 
+def warmup_ollama_llm():
+    """
+    预热 LLM，让 Ollama 提前加载模型，在后台执行不阻塞启动
+    """
+    start_time = time.time()
+    test_response = Settings.llm.complete("Hello, are you ready?")
+    log.info(f"Ollama test response: {test_response}")
+    log.info(f"warmup llm, duration: {int((time.time() - start_time) * 1000)} ms")
+
+
 def init_callback_manager():
     print("init_callback_manager")
     start_time = time.time()
-    llama_debug = LlamaDebugHandler(print_trace_on_end=True, logger=log)
+    # LlamaDebugHandler 每次操作结束都会格式化并打印完整事件链路，开销较大，只在调试时开启；
+    # 请求耗时分布通过 app.utils.tracing 的链路追踪查看
+    handlers = []
+    if LLAMA_DEBUG_HANDLER_ENABLED:
+        handlers.append(LlamaDebugHandler(print_trace_on_end=True, logger=log))
 
-    Settings.callback_manager = CallbackManager([llama_debug])
+    Settings.callback_manager = CallbackManager(handlers)
     log.info(
         f"init_callback_manager success, duration: {int((time.time() - start_time) * 1000)} ms"
     )
@@ -99,14 +176,167 @@ def init_callback_manager():
 
 def init_chunk_config():
     print("init_chunk_config")
-    Settings.chunk_size = 512
-    Settings.chunk_overlap = 32
+    from config.etcd_config import ETCD_CONFIG
+
+    # 入库时按当前值创建分块器，修改后对之后入库的文档生效
+    chunk_config = ETCD_CONFIG.chunkConfig
+    Settings.chunk_size = chunk_config.chunkSize
+    Settings.chunk_overlap = chunk_config.chunkOverlap
+    log.info(
+        f"init chunk config[size: {chunk_config.chunkSize}, "
+        f"overlap: {chunk_config.chunkOverlap}]"
+    )
 
 
-def init_llama_rag():
-    print("init_llama_rag")
-    init_callback_manager()
+# 修改后需要重建集合才能生效的集合配置
+MILVUS_RESTART_FIELDS = (
+    "embeddingModel",
+    "dim",
+    "indexType",
+    "metricType",
+    "indexParams",
+    "vectorType",
+    "matryoshka",
+)
+
+
+def on_ollama_config_change(new_config, old_config):
+    """
+    Ollama 配置变更：按新的模型、温度和地址重新创建 LLM，地址变更时重新加载 embedding 模型；
+    新配置初始化失败时继续使用原来的 LLM
+    """
     init_ollama_llm()
+    if new_config.url != old_config.url:
+        EmbeddingManager.reload()
+
+
+def on_milvus_config_change(new_config, old_config):
+    """
+    Milvus 配置变更：检索参数和精排配置立即生效，新增的集合加载后可用，删除的集合不再访问；
+    连接地址、默认集合以及已有集合的模型、维度和索引配置需要重启，此时不应用本次变更
+    """
+    if MilvusManager.get_collection() is None:
+        # 还在初始化，初始化时直接读取最新配置
+        return
+    current = {config.collectionName: config for config in CollectionRegistry.list()}
+    collections = resolve_collections(new_config)
+
+    restart = [
+        field
+        for field in ("host", "port", "uri")
+        if getattr(new_config, field) != getattr(old_config, field)
+    ]
+    if next(iter(collections)) != CollectionRegistry.get_default_name():
+        restart.append("collectionName")
+    for name, config in collections.items():
+        if name in current:
+            restart += [
+                f"{name}.{field}"
+                for field in MILVUS_RESTART_FIELDS
+                if getattr(config, field) != getattr(current[name], field)
+            ]
+    if restart:
+        log.warning(f"Milvus config {restart} changed, restart required to apply")
+        return
+
+    # 先加载全部新增集合，任一失败时移除本次已加载的集合，不应用本次变更的任何部分
+    added = []
+    for name, config in collections.items():
+        if name in current:
+            continue
+        if not MilvusManager.add_collection(
+            collection_name=config.collectionName,
+            dim=config.dim,
+            index_type=config.indexType,
+            metric_type=config.metricType,
+            index_params=config.indexParams,
+            search_params=config.searchParams,
+            vector_type=config.vectorType,
+            rerank=config.rerank,
+            rerank_factor=config.rerankFactor,
+        ):
+            for added_name in added:
+                MilvusManager.remove_collection(added_name)
+            log.error(f"Failed to add milvus collection {name}, config not applied")
+            return
+        added.append(name)
+
+    # 新集合加载后再注册，请求不会访问到未加载的集合；注册和参数修改一起生效
+    CollectionRegistry.init(new_config)
+    for name, config in collections.items():
+        if name in added:
+            threading.Thread(
+                target=KeywordIndexManager.load, args=(name,), daemon=True
+            ).start()
+        elif (config.searchParams, config.rerank, config.rerankFactor) != (
+            current[name].searchParams,
+            current[name].rerank,
+            current[name].rerankFactor,
+        ):
+            MilvusManager.update_collection(
+                name, config.searchParams, config.rerank, config.rerankFactor
+            )
+            # 缓存的结果按旧的检索参数得到
+            get_search_cache(name).invalidate()
+    for name in current:
+        if name not in collections:
+            MilvusManager.remove_collection(name)
+            KeywordIndexManager.drop(name)
+            drop_search_cache(name)
+
+
+def on_chunk_config_change(new_config, old_config):
     init_chunk_config()
-    init_milvus()
-    init_embedding()
\ No newline at end of file
+
+
+def subscribe_config_changes():
+    """
+    订阅 etcd 配置变更，Ollama、Milvus 和分块配置修改后不需要重启即可生效
+    """
+    from config.etcd_config import ETCD_CONFIG
+
+    ETCD_CONFIG.subscribe("ollama", on_ollama_config_change)
+    ETCD_CONFIG.subscribe("milvus", on_milvus_config_change)
+    ETCD_CONFIG.subscribe("chunk", on_chunk_config_change)
+
+
+def init_llama_rag(wait: bool = True) -> bool:
+    """
+    按依赖关系并发初始化各个服务
+
+    LLM 和 embedding 需要在回调管理器之后初始化，其余服务互不依赖；
+    LLM 预热在后台执行，不影响就绪状态。wait 为 True 时等待除预热外的服务初始化结束。
+    """
+    print("init_llama_rag")
+    subscribe_config_changes()
+    startup_scheduler.register("callback_manager", init_callback_manager)
+    startup_scheduler.register("chunk_config", init_chunk_config)
+    startup_scheduler.register(
+        "ollama_llm", init_ollama_llm, depends_on=["callback_manager"]
+    )
+    startup_scheduler.register(
+        "llm_warmup",
+        warmup_ollama_llm,
+        depends_on=["ollama_llm"],
+        required=False,
+        background=True,
+    )
+    startup_scheduler.register("milvus", init_milvus)
+    # 关键词索引从 Milvus 加载，集合较大时耗时较长，在后台执行，未完成时仍可向量检索
+    startup_scheduler.register(
+        "keyword_index",
+        KeywordIndexManager.init,
+        depends_on=["milvus"],
+        required=False,
+        background=True,
+    )
+    startup_scheduler.register(
+        "embedding", init_embedding, depends_on=["callback_manager"]
+    )
+    startup_scheduler.register(
+        "embedding_dim_check", check_embedding_dim, depends_on=["milvus", "embedding"]
+    )
+    startup_scheduler.start()
+    if wait:
+        return startup_scheduler.wait()
+    return startup_scheduler.is_ready()
@@ -0,0 +1,114 @@
+# app/serives/init_test.py
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+import app.serives.init as init
+import app.serives.search_cache as search_cache
+from app.models.config.milvus_config import CollectionConfig, MilvusConfig
+from app.serives.collection_registry import CollectionRegistry
+
+
+def milvus_config(*collections):
+    return MilvusConfig(
+        host="127.0.0.1",
+        port=19530,
+        collectionName="documents",
+        dim=768,
+        collections=list(collections),
+    )
+
+
+@pytest.fixture
+def milvus(monkeypatch):
+    """
+    记录集合的加载、修改和移除，名为 broken 的集合加载失败
+    """
+    state = SimpleNamespace(loaded={"documents", "short"}, updated=[], invalidated=[])
+
+    def add_collection(collection_name, **kwargs):
+        if collection_name == "broken":
+            return False
+        state.loaded.add(collection_name)
+        return True
+
+    def remove_collection(collection_name):
+        state.loaded.discard(collection_name)
+        return True
+
+    def update_collection(collection_name, *args):
+        state.updated.append(collection_name)
+        return True
+
+    monkeypatch.setattr(init.MilvusManager, "get_collection", lambda c=None: object())
+    monkeypatch.setattr(init.MilvusManager, "add_collection", add_collection)
+    monkeypatch.setattr(init.MilvusManager, "remove_collection", remove_collection)
+    monkeypatch.setattr(init.MilvusManager, "update_collection", update_collection)
+    monkeypatch.setattr(init.KeywordIndexManager, "load", lambda name: None)
+    monkeypatch.setattr(
+        init,
+        "get_search_cache",
+        lambda name: SimpleNamespace(invalidate=lambda: state.invalidated.append(name)),
+    )
+    CollectionRegistry.init(milvus_config(CollectionConfig(collectionName="short")))
+    return state
+
+
+def registered():
+    return [config.collectionName for config in CollectionRegistry.list()]
+
+
+def test_failed_new_collection_rolls_back_the_change(milvus):
+    old_config = milvus_config(CollectionConfig(collectionName="short"))
+    new_config = milvus_config(
+        CollectionConfig(collectionName="short", searchParams={"ef": 128}),
+        CollectionConfig(collectionName="extra"),
+        CollectionConfig(collectionName="broken"),
+    )
+    init.on_milvus_config_change(new_config, old_config)
+    # 已加载的 extra 被移除，已有集合的检索参数和注册表都不变
+    assert milvus.loaded == {"documents", "short"}
+    assert milvus.updated == [] and milvus.invalidated == []
+    assert registered() == ["documents", "short"]
+    assert CollectionRegistry.get("short").searchParams is None
+
+
+def test_config_change_applies_registry_and_params_together(milvus):
+    old_config = milvus_config(CollectionConfig(collectionName="short"))
+    new_config = milvus_config(
+        CollectionConfig(collectionName="short", searchParams={"ef": 128}),
+        CollectionConfig(collectionName="extra"),
+    )
+    init.on_milvus_config_change(new_config, old_config)
+    assert milvus.loaded == {"documents", "short", "extra"}
+    assert milvus.updated == ["short"] and milvus.invalidated == ["short"]
+    assert registered() == ["documents", "short", "extra"]
+    assert CollectionRegistry.get("short").searchParams == {"ef": 128}
+
+
+def test_removed_collection_drops_keyword_index_and_cache(milvus, monkeypatch):
+    keyword = init.KeywordIndexManager
+    monkeypatch.setattr(keyword, "_indexes", {"documents": object(), "short": object()})
+    monkeypatch.setattr(keyword, "_ready", {"documents", "short"})
+    monkeypatch.setattr(keyword, "_shared_seen", {"documents": 1, "short": 2})
+    monkeypatch.setattr(keyword, "_reloading", {"short": []})
+    monkeypatch.setattr(
+        search_cache, "_search_caches", {"documents": object(), "short": object()}
+    )
+    old_config = milvus_config(CollectionConfig(collectionName="short"))
+    init.on_milvus_config_change(milvus_config(), old_config)
+    assert milvus.loaded == {"documents"}
+    assert registered() == ["documents"]
+    # 移除的集合不再占用关键词索引和检索结果缓存
+    assert list(keyword._indexes) == ["documents"]
+    assert keyword._ready == {"documents"}
+    assert keyword._shared_seen == {"documents": 1}
+    assert keyword._reloading == {}
+    assert list(search_cache._search_caches) == ["documents"]
@@ -0,0 +1,219 @@
+# app/serives/keyword_index_manager.py
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+
+from app.core.bm25_index import BM25Index
+from app.serives.milvus_manager import MilvusManager
+from app.utils.log import log
+from app.utils.shared_generation import get_shared_generation
+from config.setting import BM25_B, BM25_K1, BM25_REBUILD_BATCH_SIZE
+
+
+class KeywordIndexManager:
+    """
+    管理进程内的 BM25 关键词索引，每个集合一个索引，与对应的 Milvus 集合保持同步
+
+    collection 为空时使用默认集合；多 worker 时检索前检查集合的共享写入代数，
+    其它 worker 写入过集合就在后台从 Milvus 重建索引，重建完成前继续使用旧索引
+    """
+
+    _indexes: Dict[str, BM25Index] = {}
+    _ready: Set[str] = set()
+    _lock = threading.Lock()
+    # 集合名 -> 索引已包含的共享写入代数
+    _shared_seen: Dict[str, int] = {}
+    # 集合名 -> 重建期间本进程的写入，重建完成后在新索引上重放
+    _reloading: Dict[str, List[Tuple[str, Any]]] = {}
+
+    @classmethod
+    def init(cls) -> bool:
+        """
+        从已加载的每个 Milvus 集合加载全部文档，重建关键词索引
+        """
+        names = MilvusManager.get_collection_names()
+        if not names:
+            log.error("Milvus vector store not initialized, skip keyword index")
+            return False
+        # 逐个加载，单个集合失败不影响其它集合
+        results = [cls.load(name) for name in names]
+        return all(results)
+
+    @classmethod
+    def load(cls, collection: str) -> bool:
+        """
+        从 Milvus 加载一个集合的全部文档到关键词索引
+        """
+        start_time = time.time()
+        vector_store = MilvusManager.get_vector_store(collection)
+        try:
+            shared = get_shared_generation(collection)
+            if shared is not None:
+                cls._shared_seen[collection] = shared.value
+            # 直接写入当前索引，加载期间新写入的文档按 id 覆盖，不会丢失
+            index = cls._get_index(collection)
+            cls._scan(vector_store, index)
+
+            cls._ready.add(collection)
+            duration = int((time.time() - start_time) * 1000)
+            log.info(
+                f"init keyword index[collection: {collection}], "
+                f"documents: {len(index)}, duration: {duration} ms"
+            )
+            return True
+        except Exception as e:
+            log.error(f"Failed to initialize keyword index of {collection}: {e}")
+            return False
+
+    @classmethod
+    def drop(cls, collection: str):
+        """
+        集合移除后删除它的关键词索引，进行中的重建完成后也不再写回
+        """
+        with cls._lock:
+            cls._indexes.pop(collection, None)
+            cls._ready.discard(collection)
+            cls._shared_seen.pop(collection, None)
+            cls._reloading.pop(collection, None)
+
+    @classmethod
+    def _scan(cls, vector_store, index: BM25Index):
+        iterator = vector_store.client.query_iterator(
+            collection_name=vector_store.collection_name,
+            batch_size=BM25_REBUILD_BATCH_SIZE,
+            filter="",
+            output_fields=["*"],
+        )
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                index.add_many(
+                    [cls._row_to_document(vector_store, row) for row in rows]
+                )
+        finally:
+            iterator.close()
+
+    @classmethod
+    def _check_shared(cls, name: str):
+        """
+        其它 worker 写入过集合时启动后台重建，同一集合同时只有一个重建
+        """
+        shared = get_shared_generation(name)
+        if shared is None or name not in cls._ready:
+            return
+        current = shared.value
+        with cls._lock:
+            seen = cls._shared_seen.get(name, 0)
+            if current == seen or name in cls._reloading:
+                return
+            cls._shared_seen[name] = current
+            if not shared.changed_elsewhere(seen, current):
+                # 只有本进程的写入，索引已经同步更新
+                return
+            cls._reloading[name] = []
+        threading.Thread(
+            target=cls._reload,
+            args=(name, seen),
+            name="keyword_index_reload",
+            daemon=True,
+        ).start()
+
+    @classmethod
+    def _reload(cls, name: str, seen: int):
+        start_time = time.time()
+        index = BM25Index(k1=BM25_K1, b=BM25_B)
+        try:
+            cls._scan(MilvusManager.get_vector_store(name), index)
+        except Exception as e:
+            log.error(f"Failed to reload keyword index of {name}: {e}")
+            with cls._lock:
+                if cls._reloading.pop(name, None) is not None:
+                    # 下次检索时重试
+                    cls._shared_seen[name] = seen
+            return
+        with cls._lock:
+            pending = cls._reloading.pop(name, None)
+            if pending is None:
+                # 重建期间集合已被移除
+                return
+            for operation, args in pending:
+                if operation == "add":
+                    index.add_many(args)
+                else:
+                    for node_id in args:
+                        index.remove(node_id)
+            cls._indexes[name] = index
+        duration = int((time.time() - start_time) * 1000)
+        log.info(
+            f"reload keyword index[collection: {name}], "
+            f"documents: {len(index)}, duration: {duration} ms"
+        )
+
+    @classmethod
+    def _writable_index(cls, collection: Optional[str], operation: str, args):
+        """
+        返回当前索引；集合正在重建时同时记录本次写入，重建完成后重放
+        """
+        name = MilvusManager.get_collection_name(collection)
+        with cls._lock:
+            pending = cls._reloading.get(name)
+            if pending is not None:
+                pending.append((operation, args))
+            return cls._get_index(name)
+
+    @classmethod
+    def _get_index(cls, collection: Optional[str] = None) -> BM25Index:
+        name = MilvusManager.get_collection_name(collection)
+        index = cls._indexes.get(name)
+        if index is None:
+            index = cls._indexes.setdefault(name, BM25Index(k1=BM25_K1, b=BM25_B))
+        return index
+
+    @staticmethod
+    def _row_to_document(vector_store, row: Dict[str, Any]):
+        text = row.get(vector_store.text_key) or ""
+        metadata = {}
+        if "_node_content" in row:
+            metadata = metadata_dict_to_node(row, text=text).metadata
+        return str(row["id"]), text, metadata
+
+    @classmethod
+    def add_nodes(cls, nodes: List[BaseNode], collection: Optional[str] = None):
+        """
+        写入 Milvus 成功后同步加入关键词索引
+        """
+        documents = [
+            (node.node_id, node.get_content(), node.metadata) for node in nodes
+        ]
+        cls._writable_index(collection, "add", documents).add_many(documents)
+
+    @classmethod
+    def remove(cls, doc_id: str, collection: Optional[str] = None) -> bool:
+        return cls._writable_index(collection, "remove", [doc_id]).remove(doc_id)
+
+    @classmethod
+    def remove_nodes(cls, node_ids: List[str], collection: Optional[str] = None):
+        """
+        从 Milvus 删除成功后同步移出关键词索引
+        """
+        index = cls._writable_index(collection, "remove", list(node_ids))
+        for node_id in node_ids:
+            index.remove(node_id)
+
+    @classmethod
+    def search(
+        cls, query: str, top_k: int, collection: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        name = MilvusManager.get_collection_name(collection)
+        cls._check_shared(name)
+        return cls._get_index(name).search(query, top_k)
+
+    @classmethod
+    def get_stats(cls, collection: Optional[str] = None) -> Dict[str, Any]:
+        name = MilvusManager.get_collection_name(collection)
+        return {"ready": name in cls._ready, **cls._get_index(name).stats()}
@@ -0,0 +1,113 @@
+# app/serives/keyword_index_manager_test.py
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from llama_index.core.schema import TextNode
+
+import app.serives.keyword_index_manager as keyword_index_manager
+from app.serives.keyword_index_manager import KeywordIndexManager
+from app.utils.shared_generation import SharedGeneration
+
+
+@pytest.fixture
+def workers(tmp_path, monkeypatch):
+    """
+    本进程作为 worker A，另一个计数器实例模拟写入同一集合的 worker B；
+    Milvus 中的文档保存在 state.rows，重建在 release 事件触发后完成
+    """
+    path = str(tmp_path / "documents.gen")
+    state = SimpleNamespace(
+        rows={"1": "milvus vector database"},
+        other=SharedGeneration(path),
+        scans=0,
+        release=threading.Event(),
+    )
+    shared = SharedGeneration(path)
+
+    def scan(vector_store, index):
+        state.scans += 1
+        if state.scans > 1:
+            assert state.release.wait(5)
+        index.add_many([(doc_id, text, {}) for doc_id, text in state.rows.items()])
+
+    monkeypatch.setattr(
+        keyword_index_manager, "get_shared_generation", lambda c: shared
+    )
+    monkeypatch.setattr(
+        keyword_index_manager.MilvusManager,
+        "get_collection_name",
+        lambda c=None: "docs",
+    )
+    monkeypatch.setattr(
+        keyword_index_manager.MilvusManager, "get_vector_store", lambda c=None: None
+    )
+    monkeypatch.setattr(KeywordIndexManager, "_scan", scan)
+    monkeypatch.setattr(KeywordIndexManager, "_indexes", {})
+    monkeypatch.setattr(KeywordIndexManager, "_ready", set())
+    monkeypatch.setattr(KeywordIndexManager, "_shared_seen", {})
+    monkeypatch.setattr(KeywordIndexManager, "_reloading", {})
+    assert KeywordIndexManager.load("docs")
+    state.shared = shared
+    yield state
+    state.release.set()
+
+
+def search_ids(query):
+    return [hit["id"] for hit in KeywordIndexManager.search(query, 5)]
+
+
+def wait_reloaded():
+    deadline = time.time() + 5
+    while KeywordIndexManager._reloading and time.time() < deadline:
+        time.sleep(0.01)
+    assert not KeywordIndexManager._reloading
+
+
+def test_own_writes_do_not_reload(workers):
+    KeywordIndexManager.add_nodes([TextNode(id_="2", text="keyword search")])
+    workers.shared.bump()
+    assert search_ids("keyword") == ["2"]
+    assert workers.scans == 1
+
+
+def test_writes_in_other_worker_reload_index(workers):
+    # worker B 写入新文档并删除旧文档
+    workers.rows = {"3": "hybrid keyword retrieval"}
+    workers.other.bump()
+    # 重建完成前继续使用旧索引
+    assert search_ids("milvus") == ["1"]
+    assert workers.scans == 2
+
+    # 重建期间本进程的写入在新索引上重放
+    KeywordIndexManager.add_nodes([TextNode(id_="4", text="keyword cache")])
+    workers.shared.bump()
+    workers.release.set()
+    wait_reloaded()
+    assert search_ids("milvus") == []
+    assert sorted(search_ids("keyword")) == ["3", "4"]
+    assert workers.scans == 2
+
+
+def test_drop_during_reload_discards_new_index(workers):
+    workers.rows = {"3": "hybrid keyword retrieval"}
+    workers.other.bump()
+    assert search_ids("milvus") == ["1"]
+    # 重建期间集合被移除，重建结果不再写回
+    KeywordIndexManager.drop("docs")
+    workers.release.set()
+    for thread in threading.enumerate():
+        if thread.name == "keyword_index_reload":
+            thread.join(5)
+    assert KeywordIndexManager._indexes == {}
+    assert KeywordIndexManager._ready == set()
+    assert KeywordIndexManager._shared_seen == {}
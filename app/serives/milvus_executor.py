@@ -0,0 +1,345 @@
+# app/serives/milvus_executor.py
+import asyncio
+import contextvars
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from pymilvus import MilvusClient, connections
+
+from app.utils.log import log
+from app.utils.metrics import MILVUS_EXECUTOR_QUEUE_DURATION
+from config.setting import (
+    MILVUS_ADMIN_CONCURRENCY,
+    MILVUS_CONNECTION_POOL_SIZE,
+    MILVUS_INSERT_CONCURRENCY,
+    MILVUS_SEARCH_CONCURRENCY,
+)
+
+SEARCH = "search"
+INSERT = "insert"
+ADMIN = "admin"
+
+
+class MilvusConnection:
+    """
+    一个独立的 Milvus 连接：vector_store 使用独立的 MilvusClient，alias 为对应的 ORM 连接别名
+
+    vector_store 为默认集合，其它集合的向量存储共用同一个 MilvusClient
+    """
+
+    def __init__(self, alias: str, vector_store):
+        self.alias = alias
+        self.vector_store = vector_store
+        self.stores: Dict[str, Any] = {}
+
+    @property
+    def client(self) -> MilvusClient:
+        return self.vector_store.client
+
+    def get_store(self, collection: Optional[str] = None):
+        """
+        集合对应的向量存储，collection 为空时为默认集合
+        """
+        if collection is None or collection == self.vector_store.collection_name:
+            return self.vector_store
+        store = self.stores.get(collection)
+        if store is None:
+            raise ValueError(f"Collection {collection} not registered")
+        return store
+
+
+class _OperationPool:
+    """
+    单一操作类型的线程池，线程数即该类操作的并发上限，超出的请求排队等待
+    """
+
+    def __init__(self, operation: str, max_workers: int, initializer: Callable):
+        self.operation = operation
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=f"milvus_{operation}",
+            initializer=initializer,
+        )
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.peak_active = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queue_ms = 0.0
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        submit_time = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+        # 在提交线程的上下文中执行，当前 span 等 contextvars 随任务传入线程池
+        context = contextvars.copy_context()
+        try:
+            future = self.executor.submit(
+                context.run, self._call, submit_time, fn, args, kwargs
+            )
+        except BaseException:
+            self._cancel_queued()
+            raise
+        future.add_done_callback(
+            lambda f: self._cancel_queued() if f.cancelled() else None
+        )
+        return future
+
+    def _cancel_queued(self):
+        with self._lock:
+            self.queued -= 1
+
+    def _call(self, submit_time: float, fn: Callable, args, kwargs):
+        queue_duration = time.perf_counter() - submit_time
+        MILVUS_EXECUTOR_QUEUE_DURATION.labels(self.operation).observe(queue_duration)
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            self.max_queue_ms = max(self.max_queue_ms, queue_duration * 1000)
+        failed = True
+        try:
+            result = fn(MilvusExecutor.current_connection(), *args, **kwargs)
+            failed = False
+            return result
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                if failed:
+                    self.failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "active": self.active,
+                "queued": self.queued,
+                "peak_active": self.peak_active,
+                "completed": self.completed,
+                "failed": self.failed,
+                "max_queue_ms": round(self.max_queue_ms, 3),
+            }
+
+
+class MilvusExecutor:
+    """
+    Milvus 访问层：pymilvus 的调用都是阻塞的，统一放到专用线程池中执行
+
+    - 检索、写入、管理操作各一个线程池，并发上限分别配置，互不占用
+    - 建立多个独立连接，线程启动时按轮询绑定一个连接，同一线程始终使用同一连接
+    - async 接口在线程池中执行并 await 结果，不阻塞事件循环
+    """
+
+    _pools: Dict[str, _OperationPool] = {}
+    _connections: List[MilvusConnection] = []
+    _counter = itertools.count()
+    _local = threading.local()
+
+    @classmethod
+    def init(
+        cls,
+        vector_store,
+        uri: str,
+        pool_size: Optional[int] = None,
+        concurrency: Optional[Dict[str, int]] = None,
+    ):
+        """
+        以已初始化的 vector_store 为第一个连接，再为同一集合建立 pool_size - 1 个独立连接
+        """
+        cls.shutdown()
+        pool_size = max(pool_size or MILVUS_CONNECTION_POOL_SIZE, 1)
+        concurrency = {
+            SEARCH: MILVUS_SEARCH_CONCURRENCY,
+            INSERT: MILVUS_INSERT_CONCURRENCY,
+            ADMIN: MILVUS_ADMIN_CONCURRENCY,
+            **(concurrency or {}),
+        }
+
+        connections_ = [MilvusConnection("default", vector_store)]
+        for i in range(1, pool_size):
+            alias = f"milvus_{i}"
+            connections.connect(alias=alias, uri=uri)
+            # 复制集合配置，替换为独立的 MilvusClient，避免共用同一个 gRPC 通道
+            store = vector_store.model_copy()
+            store._milvusclient = MilvusClient(uri=uri, dedicated=True)
+            connections_.append(MilvusConnection(alias, store))
+        cls._connections = connections_
+        cls._counter = itertools.count()
+        cls._pools = {
+            operation: _OperationPool(operation, max_workers, cls._bind_connection)
+            for operation, max_workers in concurrency.items()
+        }
+        log.info(
+            f"init milvus executor, connections: {pool_size}, concurrency: {concurrency}"
+        )
+
+    @classmethod
+    def register_collection(cls, vector_store):
+        """
+        在每个连接上注册默认集合之外的集合，复制集合配置并使用该连接的 MilvusClient
+        """
+        if not cls._connections:
+            raise ValueError("Milvus executor not initialized")
+        for i, connection in enumerate(cls._connections):
+            store = vector_store
+            if i > 0:
+                store = vector_store.model_copy()
+                store._milvusclient = connection.client
+            connection.stores[vector_store.collection_name] = store
+
+    @classmethod
+    def _bind_connection(cls):
+        connections_ = cls._connections
+        cls._local.connection = connections_[next(cls._counter) % len(connections_)]
+
+    @classmethod
+    def current_connection(cls) -> MilvusConnection:
+        """
+        当前线程绑定的连接，不在线程池中调用时使用第一个连接
+        """
+        connection = getattr(cls._local, "connection", None)
+        if connection is None:
+            if not cls._connections:
+                raise ValueError("Milvus executor not initialized")
+            return cls._connections[0]
+        return connection
+
+    @classmethod
+    def _get_pool(cls, operation: str) -> _OperationPool:
+        pool = cls._pools.get(operation)
+        if pool is None:
+            if not cls._pools:
+                raise ValueError("Milvus executor not initialized")
+            raise ValueError(f"Unknown Milvus operation: {operation}")
+        return pool
+
+    @classmethod
+    def run(cls, operation: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        在 operation 对应的线程池中执行 fn(connection, *args, **kwargs) 并等待结果
+
+        已在线程池中时直接执行，避免嵌套提交占满线程池导致死锁
+        """
+        if getattr(cls._local, "connection", None) is not None:
+            return fn(cls._local.connection, *args, **kwargs)
+        return cls._get_pool(operation).submit(fn, *args, **kwargs).result()
+
+    @classmethod
+    def submit(cls, operation: str, fn: Callable, *args, **kwargs) -> Future:
+        """
+        提交 fn(connection, *args, **kwargs) 到线程池，不等待结果
+        """
+        return cls._get_pool(operation).submit(fn, *args, **kwargs)
+
+    @classmethod
+    async def arun(cls, operation: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        异步执行，请求被取消时尚未开始的任务不再执行
+        """
+        future = cls._get_pool(operation).submit(fn, *args, **kwargs)
+        return await asyncio.wrap_future(future)
+
+    @classmethod
+    def search(
+        cls, query: VectorStoreQuery, collection: Optional[str] = None, **kwargs
+    ) -> VectorStoreQueryResult:
+        return cls.run(SEARCH, _query, query, collection, **kwargs)
+
+    @classmethod
+    async def asearch(
+        cls, query: VectorStoreQuery, collection: Optional[str] = None, **kwargs
+    ) -> VectorStoreQueryResult:
+        return await cls.arun(SEARCH, _query, query, collection, **kwargs)
+
+    @classmethod
+    def insert(
+        cls, nodes: List[BaseNode], collection: Optional[str] = None
+    ) -> List[str]:
+        return cls.run(INSERT, _add, nodes, collection)
+
+    @classmethod
+    async def ainsert(
+        cls, nodes: List[BaseNode], collection: Optional[str] = None
+    ) -> List[str]:
+        return await cls.arun(INSERT, _add, nodes, collection)
+
+    @classmethod
+    async def aupsert(
+        cls, nodes: List[BaseNode], collection: Optional[str] = None
+    ) -> List[str]:
+        return await cls.arun(INSERT, _upsert, nodes, collection)
+
+    @classmethod
+    async def adelete(cls, node_ids: List[str], collection: Optional[str] = None):
+        return await cls.arun(INSERT, _delete, node_ids, collection)
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        return {
+            "connections": len(cls._connections),
+            "operations": {
+                operation: pool.stats() for operation, pool in cls._pools.items()
+            },
+        }
+
+    @classmethod
+    def shutdown(cls):
+        """
+        关闭线程池和额外建立的连接，第一个连接属于 MilvusManager，不在这里关闭
+        """
+        pools, cls._pools = cls._pools, {}
+        for pool in pools.values():
+            pool.executor.shutdown(wait=False, cancel_futures=True)
+        connections_, cls._connections = cls._connections, []
+        for connection in connections_[1:]:
+            try:
+                connection.client.close()
+                connections.disconnect(connection.alias)
+            except Exception as e:
+                log.warning(
+                    f"Failed to close milvus connection {connection.alias}: {e}"
+                )
+
+
+def _query(
+    connection: MilvusConnection,
+    query: VectorStoreQuery,
+    collection: Optional[str] = None,
+    **kwargs,
+):
+    return connection.get_store(collection).query(query, **kwargs)
+
+
+def _add(
+    connection: MilvusConnection,
+    nodes: List[BaseNode],
+    collection: Optional[str] = None,
+):
+    return connection.get_store(collection).add(nodes)
+
+
+def _upsert(
+    connection: MilvusConnection,
+    nodes: List[BaseNode],
+    collection: Optional[str] = None,
+):
+    return connection.get_store(collection).upsert(nodes)
+
+
+def _delete(
+    connection: MilvusConnection,
+    node_ids: List[str],
+    collection: Optional[str] = None,
+):
+    return connection.get_store(collection).delete_nodes(node_ids=node_ids)
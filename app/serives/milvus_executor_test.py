@@ -0,0 +1,88 @@
+# app/serives/milvus_executor_test.py
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from app.serives.milvus_executor import ADMIN, INSERT, SEARCH, MilvusExecutor
+
+
+class FakeVectorStore:
+    def __init__(self, search_delay: float = 0.0):
+        self.search_delay = search_delay
+        self.added = []
+        self.threads = set()
+
+    def query(self, query, **kwargs):
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.search_delay)
+        return query
+
+    def add(self, nodes):
+        self.added.extend(nodes)
+        return nodes
+
+
+def init_executor(store, **concurrency):
+    MilvusExecutor.init(store, uri="", pool_size=1, concurrency=concurrency)
+
+
+def test_search_concurrency_is_bounded():
+    store = FakeVectorStore(search_delay=0.05)
+    init_executor(store, search=2)
+    try:
+
+        async def run():
+            return await asyncio.gather(*(MilvusExecutor.asearch(i) for i in range(6)))
+
+        assert asyncio.run(run()) == list(range(6))
+        stats = MilvusExecutor.get_stats()["operations"][SEARCH]
+        assert stats["peak_active"] == 2
+        assert stats["completed"] == 6
+        assert stats["queued"] == 0
+        assert all(name.startswith("milvus_search") for name in store.threads)
+    finally:
+        MilvusExecutor.shutdown()
+
+
+def test_inserts_are_not_blocked_by_searches():
+    store = FakeVectorStore(search_delay=0.5)
+    init_executor(store, search=1, insert=1)
+    try:
+
+        async def run():
+            searches = [
+                asyncio.ensure_future(MilvusExecutor.asearch(i)) for i in range(4)
+            ]
+            start_time = time.perf_counter()
+            await MilvusExecutor.ainsert(["doc"])
+            insert_duration = time.perf_counter() - start_time
+            for search in searches:
+                search.cancel()
+            return insert_duration
+
+        assert asyncio.run(run()) < 0.3
+        assert store.added == ["doc"]
+        # 取消的检索中尚未开始的不再执行，也不计入排队数
+        assert MilvusExecutor.get_stats()["operations"][SEARCH]["queued"] == 0
+    finally:
+        MilvusExecutor.shutdown()
+
+
+def test_nested_run_executes_inline():
+    store = FakeVectorStore()
+    init_executor(store, admin=1)
+    try:
+        result = MilvusExecutor.run(
+            ADMIN, lambda _: MilvusExecutor.run(ADMIN, lambda c: c.vector_store)
+        )
+        assert result is store
+        assert MilvusExecutor.run(INSERT, lambda c: c.alias) == "default"
+    finally:
+        MilvusExecutor.shutdown()
@@ -1,22 +1,82 @@
 # app/services/milvus_manager.py
 from llama_index.vector_stores.milvus import MilvusVectorStore
 from llama_index.core.settings import Settings
-from pymilvus import (
-    connections,
-    Collection,
-    utility,
-    CollectionSchema,
-    FieldSchema,
-    DataType,
-)
+from pymilvus import DataType, connections, utility
 import time
 from typing import Optional, List, Dict, Any
+from app.custom.custom_timed_milvus_vector_store import CustomTimedMilvusVectorStore
+from app.serives.milvus_executor import MilvusExecutor
 from app.utils.log import log
+from config.setting import (
+    INGEST_INSERT_BATCH_SIZE,
+    MILVUS_INDEX_PARAMS,
+    MILVUS_INDEX_TYPE,
+    MILVUS_RERANK_ENABLED,
+    MILVUS_RERANK_FACTOR,
+    MILVUS_SEARCH_PARAMS,
+    MILVUS_SIMILARITY_METRIC,
+    MILVUS_VECTOR_TYPE,
+)
+
+
+class MilvusCollection:
+    """
+    一个已加载的集合：向量存储、实际的索引类型和维度、检索参数和精排配置
+    """
+
+    def __init__(
+        self,
+        vector_store: CustomTimedMilvusVectorStore,
+        index_type: str,
+        dim: int,
+        search_params: Dict[str, Any],
+        rerank: bool,
+        rerank_factor: int,
+    ):
+        self.vector_store = vector_store
+        self.index_type = index_type
+        self.dim = dim
+        self.search_params = search_params
+        self.rerank = rerank
+        self.rerank_factor = rerank_factor
+
+    @property
+    def name(self) -> str:
+        return self.vector_store.collection_name
+
+    def get_rerank_candidates(
+        self, top_k: int, rerank: Optional[bool] = None
+    ) -> Optional[int]:
+        if not (self.rerank if rerank is None else rerank):
+            return None
+        return top_k * self.rerank_factor
+
+    def get_search_params(
+        self, top_k: int, ef: Optional[int] = None, nprobe: Optional[int] = None
+    ) -> Dict[str, Any]:
+        params = dict(self.search_params)
+        if ef is not None and self.index_type.startswith("HNSW"):
+            params["ef"] = ef
+        if nprobe is not None and self.index_type.startswith("IVF"):
+            params["nprobe"] = nprobe
+        if "ef" in params:
+            params["ef"] = max(params["ef"], top_k)
+        return {"params": params}
+
+
+def is_milvus_lite(uri: Optional[str]) -> bool:
+    """
+    uri 是否为 Milvus Lite 的本地 .db 文件，本地文件同时只能被一个进程打开
+    """
+    return bool(uri) and "://" not in uri
 
 
 class MilvusManager:
     _instance = None
-    _vector_store = None
+    _uri: Optional[str] = None
+    # 集合名 -> 已加载的集合，_default 为请求未指定集合时使用的集合
+    _collections: Dict[str, MilvusCollection] = {}
+    _default: Optional[str] = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -28,79 +88,56 @@ class MilvusManager:
         cls,
         host: str = "localhost",
         port: int = 19530,
+        uri: Optional[str] = None,
         collection_name: str = "document_vectors",
         dim: int = 768,  # nomic-embed-text 的维度是 768
+        index_type: Optional[str] = None,
+        metric_type: Optional[str] = None,
+        index_params: Optional[Dict[str, Any]] = None,
+        search_params: Optional[Dict[str, Any]] = None,
+        vector_type: Optional[str] = None,
+        rerank: Optional[bool] = None,
+        rerank_factor: Optional[int] = None,
     ) -> bool:
         """
-        初始化 Milvus 向量存储
+        初始化 Milvus 连接和默认集合
+
+        配置了 uri 时优先使用 uri 连接，可以是 Milvus 服务地址或 Milvus Lite 的本地 .db 文件。
+        其它集合在之后通过 add_collection 加载。
         """
         start_time = time.time()
         try:
+            # MilvusVectorStore 只接受 uri，未配置时由 host/port 拼接
+            uri = uri or f"http://{host}:{port}"
+
             # 首先建立连接
-            connections.connect(alias="default", host=host, port=port)
-
-            # 检查集合是否存在
-            if not utility.has_collection(collection_name):
-                # 只在集合不存在时创建
-                log.info(f"Creating new collection: {collection_name}")
-                # 定义集合的 schema
-                fields = [
-                    # 主键字段，用于唯一标识每条记录
-                    FieldSchema(
-                        name="id",
-                        dtype=DataType.VARCHAR,  # 字符串类型
-                        max_length=100,  # 最大长度100
-                        is_primary=True,  # 设为主键
-                    ),
-                    # 向量字段，存储文档的嵌入向量
-                    FieldSchema(
-                        name="vector",
-                        dtype=DataType.FLOAT_VECTOR,  # 浮点数向量类型
-                        dim=dim,  # 向量维度，这里是768（nomic-embed-text模型的输出维度）
-                    ),
-                    # 文本字段，存储原始文档内容
-                    FieldSchema(
-                        name="text",
-                        dtype=DataType.VARCHAR,  # 字符串类型
-                        max_length=65535,  # 最大长度65535，用于存储较长文本
-                    ),
-                    # 元数据字段，存储额外信息
-                    FieldSchema(
-                        name="metadata",
-                        dtype=DataType.JSON,  # JSON类型，可以存储结构化数据
-                    ),
-                ]
-                schema = CollectionSchema(fields=fields)
-
-                # 创建集合
-                collection = Collection(collection_name, schema)
-
-                # 创建索引
-                index_params = {
-                    "metric_type": "L2",  # 距离度量类型：L2 欧氏距离，用于计算向量之间的相似度
-                    "index_type": "IVF_FLAT",  # 索引类型：IVF_FLAT 是一种基于聚类的索引方法
-                    "params": {"nlist": 1024},  # 聚类簇的数量，影响检索精度和速度的平衡
-                }
-                collection.create_index("vector", index_params)
-            else:
-                log.info(f"Collection {collection_name} already exists, loading...")
-                collection = Collection(collection_name)
-
-            # 加载集合到内存
-            collection.load()
-
-            # 初始化 MilvusVectorStore
-            cls._vector_store = MilvusVectorStore(
-                host=host, port=port, collection_name=collection_name, dim=dim
+            connections.connect(alias="default", uri=uri)
+            cls._uri = uri
+
+            collection = cls._open_collection(
+                collection_name,
+                dim,
+                index_type,
+                metric_type,
+                index_params,
+                search_params,
+                vector_type,
+                rerank,
+                rerank_factor,
             )
+            cls._collections = {collection_name: collection}
+            cls._default = collection_name
 
             # 设置为全局默认向量存储
-            Settings.vector_store = cls._vector_store
+            Settings.vector_store = collection.vector_store
+
+            # 之后的 Milvus 调用都通过 MilvusExecutor 在专用线程池和连接上执行
+            MilvusExecutor.init(collection.vector_store, uri)
 
-            log.info(f"Collection schema: {collection.schema}")
             duration = int((time.time() - start_time) * 1000)
             log.info(
-                f"init milvus vector store[collection: {collection_name}], duration: {duration} ms"
+                f"init milvus[uri: {uri}, default collection: {collection_name}], "
+                f"duration: {duration} ms"
             )
             return True
 
@@ -109,52 +146,300 @@ class MilvusManager:
             return False
 
     @classmethod
-    def get_vector_store(cls) -> Optional[MilvusVectorStore]:
+    def add_collection(
+        cls,
+        collection_name: str,
+        dim: int,
+        index_type: Optional[str] = None,
+        metric_type: Optional[str] = None,
+        index_params: Optional[Dict[str, Any]] = None,
+        search_params: Optional[Dict[str, Any]] = None,
+        vector_type: Optional[str] = None,
+        rerank: Optional[bool] = None,
+        rerank_factor: Optional[int] = None,
+    ) -> bool:
         """
-        获取 Milvus 向量存储实例
+        加载默认集合之外的集合，集合不存在时创建，并在 MilvusExecutor 的每个连接上注册
         """
-        return cls._vector_store
+        try:
+            if cls._uri is None:
+                raise ValueError("Milvus not initialized")
+            collection = cls._open_collection(
+                collection_name,
+                dim,
+                index_type,
+                metric_type,
+                index_params,
+                search_params,
+                vector_type,
+                rerank,
+                rerank_factor,
+            )
+            MilvusExecutor.register_collection(collection.vector_store)
+            cls._collections = {**cls._collections, collection_name: collection}
+            return True
+
+        except Exception as e:
+            log.error(f"Failed to initialize Milvus collection {collection_name}: {e}")
+            return False
 
     @classmethod
-    def list_collections(cls):
+    def update_collection(
+        cls,
+        collection_name: str,
+        search_params: Optional[Dict[str, Any]] = None,
+        rerank: Optional[bool] = None,
+        rerank_factor: Optional[int] = None,
+    ) -> bool:
         """
-        列出所有集合
+        修改已加载集合的检索参数和精排配置，立即对之后的检索生效，未加载的集合返回 False
         """
-        try:
-            collections = utility.list_collections()
-            log.info(f"Available collections: {collections}")
-            return collections
-        except Exception as e:
-            log.error(f"Failed to list collections: {e}")
-            return []
+        loaded = cls._collections.get(collection_name)
+        if loaded is None:
+            return False
+        actual_search_params = {
+            **MILVUS_SEARCH_PARAMS.get(loaded.index_type, {}),
+            **(search_params or {}),
+        }
+        loaded.search_params = actual_search_params
+        loaded.vector_store.search_config = {"params": actual_search_params}
+        loaded.rerank = MILVUS_RERANK_ENABLED if rerank is None else rerank
+        loaded.rerank_factor = max(rerank_factor or MILVUS_RERANK_FACTOR, 1)
+        log.info(
+            f"update milvus collection[{collection_name}, "
+            f"search params: {actual_search_params}, rerank: {loaded.rerank}, "
+            f"rerank factor: {loaded.rerank_factor}]"
+        )
+        return True
 
     @classmethod
-    def show_collection_info(
-        cls, collection_name: str = "document_vectors"
-    ) -> Optional[List[Dict[str, Any]]]:
+    def remove_collection(cls, collection_name: str) -> bool:
         """
-        显示集合信息和数据
+        不再通过该进程访问集合，集合中的数据保留；默认集合不能移除
         """
-        try:
+        if collection_name == cls._default or collection_name not in cls._collections:
+            return False
+        cls._collections = {
+            name: collection
+            for name, collection in cls._collections.items()
+            if name != collection_name
+        }
+        log.info(f"remove milvus collection[{collection_name}]")
+        return True
 
-            if not cls._vector_store:
-                return None
+    @classmethod
+    def _open_collection(
+        cls,
+        collection_name: str,
+        dim: int,
+        index_type: Optional[str],
+        metric_type: Optional[str],
+        index_params: Optional[Dict[str, Any]],
+        search_params: Optional[Dict[str, Any]],
+        vector_type: Optional[str],
+        rerank: Optional[bool],
+        rerank_factor: Optional[int],
+    ) -> MilvusCollection:
+        """
+        打开集合，集合不存在时由 MilvusVectorStore 按配置创建集合和索引
 
-            collection = Collection(collection_name)
-            # 显示统计信息
-            log.info(
-                f"Collection {collection_name} statistics: {collection.num_entities}"
+        索引类型、距离度量和建索引参数未配置时使用 config/setting.py 中的默认值；
+        vector_type 为半精度类型或使用 SQ8 / PQ 索引时，可开启 rerank 按原始向量精排。
+        """
+        start_time = time.time()
+        index_type = (index_type or MILVUS_INDEX_TYPE).upper()
+        metric_type = (metric_type or MILVUS_SIMILARITY_METRIC).upper()
+        vector_type = (vector_type or MILVUS_VECTOR_TYPE).upper()
+        if index_type not in MILVUS_INDEX_PARAMS:
+            raise ValueError(
+                f"Unsupported index type: {index_type}, "
+                f"supported: {list(MILVUS_INDEX_PARAMS)}"
+            )
+
+        index_config = {
+            "index_type": index_type,
+            "metric_type": metric_type,
+            **MILVUS_INDEX_PARAMS[index_type],
+            **(index_params or {}),
+        }
+
+        # 初始化 MilvusVectorStore，集合不存在时按 index_config 创建索引
+        vector_store = CustomTimedMilvusVectorStore(
+            uri=cls._uri,
+            collection_name=collection_name,
+            dim=dim,
+            similarity_metric=metric_type,
+            vector_type=vector_type,
+            index_config=index_config,
+            batch_size=INGEST_INSERT_BATCH_SIZE,  # 单次 insert 的最大条数
+        )
+
+        # 加载集合到内存
+        vector_store.client.load_collection(collection_name)
+
+        # 已存在的集合以实际的索引类型为准
+        actual_index_type = cls._describe_index_type(vector_store) or index_type
+        if actual_index_type != index_type:
+            log.warning(
+                f"Collection {collection_name} already has {actual_index_type} index, "
+                f"configured {index_type} is ignored"
+            )
+        actual_search_params = {
+            **MILVUS_SEARCH_PARAMS.get(actual_index_type, {}),
+            **(search_params or {}),
+        }
+        vector_store.search_config = {"params": actual_search_params}
+
+        # 已存在的集合以实际的向量字段类型和维度为准
+        vector_field = cls._describe_vector_field(vector_store) or {}
+        actual_vector_type = (
+            DataType(vector_field["type"]).name if vector_field else vector_type
+        )
+        actual_dim = vector_field.get("params", {}).get("dim", dim)
+        if actual_dim != dim:
+            log.warning(
+                f"Collection {collection_name} has dim {actual_dim}, configured {dim}"
             )
+        if actual_vector_type != vector_type:
+            log.warning(
+                f"Collection {collection_name} stores {actual_vector_type}, "
+                f"configured {vector_type} is ignored"
+            )
+            vector_store.vector_type = actual_vector_type
+
+        collection = MilvusCollection(
+            vector_store,
+            actual_index_type,
+            actual_dim,
+            actual_search_params,
+            MILVUS_RERANK_ENABLED if rerank is None else rerank,
+            max(rerank_factor or MILVUS_RERANK_FACTOR, 1),
+        )
+        duration = int((time.time() - start_time) * 1000)
+        log.info(
+            f"init milvus vector store[collection: {collection_name}, "
+            f"index: {actual_index_type}, metric: {metric_type}, "
+            f"vector type: {actual_vector_type}, dim: {actual_dim}, "
+            f"search params: {actual_search_params}, rerank: {collection.rerank}], "
+            f"duration: {duration} ms"
+        )
+        return collection
 
-            # 查询所有数据
-            collection.load()
-            results = collection.query(
-                expr="id != ''",
-                output_fields=["id", "text", "metadata"],
-                limit=5,  # 限制返回前5条以避免输出过多
+    @staticmethod
+    def _describe_index_type(vector_store) -> Optional[str]:
+        try:
+            index = vector_store.client.describe_index(
+                vector_store.collection_name, vector_store.embedding_field
             )
-            log.info(f"Sample data from collection: {collection_name}")
-            return results
         except Exception as e:
-            log.error(f"Failed to show collection info: {e}")
+            log.warning(f"Failed to describe index: {e}")
             return None
+        return (index or {}).get("index_type")
+
+    @staticmethod
+    def _describe_vector_field(vector_store) -> Optional[Dict[str, Any]]:
+        try:
+            collection_info = vector_store.client.describe_collection(
+                vector_store.collection_name
+            )
+        except Exception as e:
+            log.warning(f"Failed to describe collection: {e}")
+            return None
+        for field in collection_info["fields"]:
+            if field["name"] == vector_store.embedding_field:
+                return field
+        return None
+
+    @classmethod
+    def get_collection(
+        cls, collection: Optional[str] = None
+    ) -> Optional[MilvusCollection]:
+        """
+        获取已加载的集合，collection 为空时返回默认集合，未加载时返回 None
+        """
+        return cls._collections.get(collection or cls._default)
+
+    @classmethod
+    def get_collection_names(cls) -> List[str]:
+        """
+        已加载的集合名，默认集合在最前
+        """
+        return list(cls._collections)
+
+    @classmethod
+    def get_collection_name(cls, collection: Optional[str] = None) -> Optional[str]:
+        return collection or cls._default
+
+    @classmethod
+    def get_index_type(cls, collection: Optional[str] = None) -> Optional[str]:
+        loaded = cls.get_collection(collection)
+        return loaded.index_type if loaded else None
+
+    @classmethod
+    def get_dim(cls, collection: Optional[str] = None) -> Optional[int]:
+        """
+        集合向量字段的实际维度
+        """
+        loaded = cls.get_collection(collection)
+        return loaded.dim if loaded else None
+
+    @classmethod
+    def get_vector_type(cls, collection: Optional[str] = None) -> Optional[str]:
+        loaded = cls.get_collection(collection)
+        return loaded.vector_store.vector_type if loaded else None
+
+    @classmethod
+    def get_rerank_candidates(
+        cls,
+        top_k: int,
+        rerank: Optional[bool] = None,
+        collection: Optional[str] = None,
+    ) -> Optional[int]:
+        """
+        精排的候选数，未开启精排时返回 None；rerank 覆盖集合的默认配置
+        """
+        loaded = cls.get_collection(collection)
+        if loaded is None:
+            return None
+        return loaded.get_rerank_candidates(top_k, rerank)
+
+    @classmethod
+    def get_search_params(
+        cls,
+        top_k: int,
+        ef: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        collection: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        生成单次检索的参数：HNSW 系列使用 ef（不小于 top_k），IVF 系列使用 nprobe
+        """
+        loaded = cls.get_collection(collection)
+        if loaded is None:
+            return {"params": {}}
+        return loaded.get_search_params(top_k, ef, nprobe)
+
+    @classmethod
+    def get_vector_store(
+        cls, collection: Optional[str] = None
+    ) -> Optional[MilvusVectorStore]:
+        """
+        获取 Milvus 向量存储实例，collection 为空时返回默认集合的向量存储
+        """
+        loaded = cls.get_collection(collection)
+        return loaded.vector_store if loaded else None
+
+    @classmethod
+    def list_collections(cls):
+        """
+        列出所有集合，在 MilvusExecutor 线程池中调用时使用当前线程的连接
+        """
+        try:
+            collections = utility.list_collections(
+                using=MilvusExecutor.current_connection().alias
+            )
+            log.info(f"Available collections: {collections}")
+            return collections
+        except Exception as e:
+            log.error(f"Failed to list collections: {e}")
+            return []
@@ -0,0 +1,308 @@
+# app/serives/ollama_pool.py
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, Optional
+
+import httpx
+from ollama import AsyncClient, Client
+
+from app.utils.log import log
+from config.setting import (
+    OLLAMA_POOL_CONNECT_TIMEOUT,
+    OLLAMA_POOL_HTTP2,
+    OLLAMA_POOL_KEEPALIVE_EXPIRY,
+    OLLAMA_POOL_MAX_CONNECTIONS,
+    OLLAMA_POOL_MAX_KEEPALIVE_CONNECTIONS,
+    OLLAMA_POOL_TIMEOUT,
+)
+
+
+class _RequestStats:
+    """
+    在途请求数：从发出请求到响应体读完或关闭
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_requests = 0
+        self.failed_requests = 0
+
+    def start(self):
+        with self._lock:
+            self.in_flight += 1
+            self.total_requests += 1
+            if self.in_flight > self.peak_in_flight:
+                self.peak_in_flight = self.in_flight
+
+    def finish(self, failed: bool = False):
+        with self._lock:
+            self.in_flight -= 1
+            if failed:
+                self.failed_requests += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "total_requests": self.total_requests,
+                "failed_requests": self.failed_requests,
+            }
+
+
+class _StatsByteStream(httpx.SyncByteStream):
+    def __init__(self, stream: httpx.SyncByteStream, stats: _RequestStats):
+        self._stream = stream
+        self._stats = stats
+        self._closed = False
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._stats.finish()
+
+
+class _AsyncStatsByteStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, stats: _RequestStats):
+        self._stream = stream
+        self._stats = stats
+        self._closed = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._stats.finish()
+
+
+def _pool_snapshot(transports) -> Dict[str, int]:
+    """
+    读取 httpcore 连接池中的连接数和排队请求数，只用于统计，不加锁
+    """
+    connections = idle = queued = 0
+    for transport in transports:
+        pool = getattr(transport, "_pool", None)
+        for connection in list(getattr(pool, "connections", [])):
+            connections += 1
+            if connection.is_idle():
+                idle += 1
+        for request in list(getattr(pool, "_requests", [])):
+            if request.is_queued():
+                queued += 1
+    return {
+        "connections": connections,
+        "idle_connections": idle,
+        "active_connections": connections - idle,
+        "queued_requests": queued,
+    }
+
+
+class _PooledTransport(httpx.BaseTransport):
+    def __init__(self, **transport_kwargs):
+        self._transport = httpx.HTTPTransport(**transport_kwargs)
+        self.stats = _RequestStats()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.start()
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            self.stats.finish(failed=True)
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_StatsByteStream(response.stream, self.stats),
+            extensions=response.extensions,
+        )
+
+    def pool_snapshot(self) -> Dict[str, int]:
+        return _pool_snapshot([self._transport])
+
+    def close(self):
+        self._transport.close()
+
+
+class _PooledAsyncTransport(httpx.AsyncBaseTransport):
+    """
+    连接绑定在创建它的事件循环上，每个事件循环使用各自的连接池，共享同一份配置和统计
+    """
+
+    def __init__(self, **transport_kwargs):
+        self._transport_kwargs = transport_kwargs
+        self._transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = (weakref.WeakKeyDictionary())
+        self._lock = threading.Lock()
+        self.stats = _RequestStats()
+
+    def _get_transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        transport = self._transports.get(loop)
+        if transport is None:
+            with self._lock:
+                transport = self._transports.get(loop)
+                if transport is None:
+                    transport = httpx.AsyncHTTPTransport(**self._transport_kwargs)
+                    self._transports[loop] = transport
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.start()
+        try:
+            response = await self._get_transport().handle_async_request(request)
+        except BaseException:
+            self.stats.finish(failed=True)
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_AsyncStatsByteStream(response.stream, self.stats),
+            extensions=response.extensions,
+        )
+
+    def pool_snapshot(self) -> Dict[str, int]:
+        transports = list(self._transports.values())
+        return {"event_loops": len(transports), **_pool_snapshot(transports)}
+
+
+class OllamaPoolManager:
+    """
+    所有访问 Ollama 的组件（LLM、各 embedding 模型、健康检查）共享的连接池
+
+    同步和异步各一个连接池，连接数上限、长连接和超时在 config/setting.py 中配置；
+    各组件的读超时不同，由各自的 Client 设置，底层共享同一个 transport。
+    """
+
+    _lock = threading.Lock()
+    _transport: Optional[_PooledTransport] = None
+    _async_transport: Optional[_PooledAsyncTransport] = None
+    _http_client: Optional[httpx.Client] = None
+    _http2 = False
+
+    @classmethod
+    def _transport_kwargs(cls) -> Dict[str, Any]:
+        http2 = OLLAMA_POOL_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                log.warning("h2 is not installed, Ollama pool falls back to HTTP/1.1")
+                http2 = False
+        cls._http2 = http2
+        return {
+            "limits": httpx.Limits(
+                max_connections=OLLAMA_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=OLLAMA_POOL_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=OLLAMA_POOL_KEEPALIVE_EXPIRY,
+            ),
+            "http2": http2,
+        }
+
+    @classmethod
+    def get_transport(cls) -> _PooledTransport:
+        if cls._transport is None:
+            with cls._lock:
+                if cls._transport is None:
+                    cls._transport = _PooledTransport(**cls._transport_kwargs())
+        return cls._transport
+
+    @classmethod
+    def get_async_transport(cls) -> _PooledAsyncTransport:
+        if cls._async_transport is None:
+            with cls._lock:
+                if cls._async_transport is None:
+                    cls._async_transport = _PooledAsyncTransport(
+                        **cls._transport_kwargs()
+                    )
+        return cls._async_transport
+
+    @staticmethod
+    def get_timeout(read_timeout: Optional[float]) -> httpx.Timeout:
+        """
+        读写超时按组件设置，建立连接和等待连接池的超时统一配置
+        """
+        return httpx.Timeout(
+            read_timeout,
+            connect=OLLAMA_POOL_CONNECT_TIMEOUT,
+            pool=OLLAMA_POOL_TIMEOUT,
+        )
+
+    @classmethod
+    def get_client(cls, host: str, timeout: Optional[float] = None) -> Client:
+        return Client(
+            host=host,
+            timeout=cls.get_timeout(timeout),
+            transport=cls.get_transport(),
+        )
+
+    @classmethod
+    def get_async_client(
+        cls, host: str, timeout: Optional[float] = None
+    ) -> AsyncClient:
+        return AsyncClient(
+            host=host,
+            timeout=cls.get_timeout(timeout),
+            transport=cls.get_async_transport(),
+        )
+
+    @classmethod
+    def attach(cls, component, host: str, timeout: Optional[float] = None):
+        """
+        让 OllamaEmbedding / Ollama 等组件改用共享连接池
+        """
+        component._client = cls.get_client(host, timeout)
+        component._async_client = cls.get_async_client(host, timeout)
+        return component
+
+    @classmethod
+    def get_http_client(cls) -> httpx.Client:
+        """
+        访问 Ollama 原生 HTTP 接口（如健康检查）的同步客户端
+        """
+        if cls._http_client is None:
+            transport = cls.get_transport()
+            with cls._lock:
+                if cls._http_client is None:
+                    cls._http_client = httpx.Client(
+                        timeout=cls.get_timeout(None), transport=transport
+                    )
+        return cls._http_client
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """
+        连接池使用情况：saturation 为活跃连接数占上限的比例，queued_requests 为等待连接的请求数
+        """
+        stats: Dict[str, Any] = {
+            "max_connections": OLLAMA_POOL_MAX_CONNECTIONS,
+            "max_keepalive_connections": OLLAMA_POOL_MAX_KEEPALIVE_CONNECTIONS,
+            "http2": cls._http2,
+        }
+        for name, transport in (
+            ("sync", cls._transport),
+            ("async", cls._async_transport),
+        ):
+            if transport is None:
+                stats[name] = None
+                continue
+            pool = transport.pool_snapshot()
+            pool_stats = {**transport.stats.snapshot(), **pool}
+            # 异步连接池按事件循环分开，上限针对每个事件循环
+            limit = OLLAMA_POOL_MAX_CONNECTIONS * max(pool.get("event_loops", 1), 1)
+            pool_stats["saturation"] = round(pool["active_connections"] / limit, 4)
+            stats[name] = pool_stats
+        return stats
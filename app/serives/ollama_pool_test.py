@@ -0,0 +1,69 @@
+# app/serives/ollama_pool_test.py
+import asyncio
+import os
+import sys
+
+import httpx
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from app.serives.ollama_pool import _PooledAsyncTransport, _PooledTransport
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/fail":
+        raise httpx.ConnectError("refused", request=request)
+    return httpx.Response(200, content=b'{"done": true}\n')
+
+
+def test_streaming_response_counts_as_in_flight_until_closed():
+    transport = _PooledTransport()
+    transport._transport = httpx.MockTransport(_handler)
+    client = httpx.Client(transport=transport)
+
+    with client.stream("POST", "http://ollama/api/chat") as response:
+        assert transport.stats.snapshot()["in_flight"] == 1
+        response.read()
+    stats = transport.stats.snapshot()
+    assert stats["in_flight"] == 0
+    assert stats["peak_in_flight"] == 1
+    assert stats["total_requests"] == 1
+
+
+def test_failed_request_is_counted():
+    transport = _PooledTransport()
+    transport._transport = httpx.MockTransport(_handler)
+    client = httpx.Client(transport=transport)
+
+    try:
+        client.get("http://ollama/fail")
+    except httpx.ConnectError:
+        pass
+    stats = transport.stats.snapshot()
+    assert stats["in_flight"] == 0
+    assert stats["failed_requests"] == 1
+
+
+def test_async_transport_per_event_loop():
+    transport = _PooledAsyncTransport()
+
+    async def request():
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get("http://127.0.0.1:1/")
+
+    def run():
+        try:
+            asyncio.run(request())
+        except httpx.ConnectError:
+            pass
+
+    run()
+    run()
+    stats = transport.stats.snapshot()
+    assert stats["total_requests"] == 2
+    assert stats["failed_requests"] == 2
+    assert stats["in_flight"] == 0
+    assert transport.pool_snapshot()["connections"] == 0
@@ -0,0 +1,86 @@
+# app/serives/rag_service.py
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from llama_index.core.prompts.default_prompts import DEFAULT_TEXT_QA_PROMPT
+
+from app.serives.retrieval import dense_search
+
+
+async def retrieve(query: str, top_k: int) -> List[Dict[str, Any]]:
+    """
+    检索与问题最相关的文档片段
+    """
+    return await dense_search(top_k, query_text=query)
+
+
+def build_prompt(query: str, sources: List[Dict[str, Any]]) -> str:
+    """
+    使用 llama_index 默认的问答模板拼接上下文
+    """
+    context_str = "\n\n".join(source["text"] for source in sources)
+    return DEFAULT_TEXT_QA_PROMPT.format(context_str=context_str, query_str=query)
+
+
+def _percentile(values: List[float], percent: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return round(values[index], 2)
+
+
+class RagMetrics:
+    """
+    记录最近若干次 RAG 请求的首 token 耗时、生成速度和总耗时
+    """
+
+    def __init__(self, max_records: int = 1000):
+        self._records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        self.total_requests = 0
+        self.failed_requests = 0
+
+    def record(
+        self,
+        retrieval_ms: float,
+        ttft_ms: Optional[float],
+        total_ms: float,
+        tokens: int,
+        tokens_per_second: Optional[float],
+        failed: bool = False,
+    ):
+        with self._lock:
+            self.total_requests += 1
+            if failed:
+                self.failed_requests += 1
+            self._records.append(
+                {
+                    "retrieval_ms": retrieval_ms,
+                    "ttft_ms": ttft_ms,
+                    "total_ms": total_ms,
+                    "tokens": tokens,
+                    "tokens_per_second": tokens_per_second,
+                }
+            )
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            records = list(self._records)
+            summary: Dict[str, Any] = {
+                "total_requests": self.total_requests,
+                "failed_requests": self.failed_requests,
+                "window": len(records),
+            }
+        for field in ("retrieval_ms", "ttft_ms", "total_ms", "tokens_per_second"):
+            values = [record[field] for record in records if record[field] is not None]
+            summary[field] = {
+                "p50": _percentile(values, 50),
+                "p95": _percentile(values, 95),
+                "p99": _percentile(values, 99),
+            }
+        return summary
+
+
+rag_metrics = RagMetrics()
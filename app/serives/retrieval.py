@@ -0,0 +1,150 @@
+# app/serives/retrieval.py
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from llama_index.core.vector_stores.types import (
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+
+from app.serives.embedding_manager import EmbeddingManager
+from app.serives.keyword_index_manager import KeywordIndexManager
+from app.serives.milvus_executor import MilvusExecutor
+from app.serives.milvus_manager import MilvusManager
+from app.utils.tracing import tracer
+from config.setting import HYBRID_CANDIDATES, HYBRID_RRF_K
+
+
+def format_query_result(result: VectorStoreQueryResult) -> List[Dict[str, Any]]:
+    """
+    将向量检索结果转换为 id/text/metadata/score 列表
+    """
+    similarities = result.similarities or []
+    ids = result.ids or []
+    formatted_results = []
+    for i, node in enumerate(result.nodes or []):
+        formatted_results.append(
+            {
+                "id": ids[i] if i < len(ids) else node.node_id,
+                "text": node.get_content(),
+                "metadata": node.metadata,
+                "score": similarities[i] if i < len(similarities) else None,
+            }
+        )
+    return formatted_results
+
+
+async def dense_search(
+    top_k: int,
+    query_text: Optional[str] = None,
+    embedding: Optional[List[float]] = None,
+    ef: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    rerank: Optional[bool] = None,
+    collection: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    向量检索，未传入查询向量时用集合对应的 embedding 模型对 query_text 生成嵌入向量
+
+    ef / nprobe 覆盖本次检索的参数，rerank 覆盖是否按原始向量精排，未传入时使用集合配置的默认值；
+    collection 为空时检索默认集合
+    """
+    vector_store = MilvusManager.get_vector_store(collection)
+    if not vector_store:
+        raise ValueError("Milvus vector store not initialized")
+
+    if embedding is None:
+        embedding = await EmbeddingManager.aget_embedding(query_text, collection)
+        if not embedding:
+            raise ValueError("Failed to generate embedding")
+
+    # 精排时先取回更多候选，ef 需要不小于实际的候选数
+    rerank_candidates = MilvusManager.get_rerank_candidates(top_k, rerank, collection)
+    result = await MilvusExecutor.asearch(
+        VectorStoreQuery(query_embedding=embedding, similarity_top_k=top_k),
+        collection,
+        rerank_candidates=rerank_candidates,
+        milvus_search_config=MilvusManager.get_search_params(
+            rerank_candidates or top_k, ef, nprobe, collection
+        ),
+    )
+    return format_query_result(result)
+
+
+async def keyword_search(
+    query_text: str, top_k: int, collection: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    BM25 关键词检索
+    """
+    with tracer.start_span("bm25.search", {"top_k": top_k}):
+        return await asyncio.to_thread(
+            KeywordIndexManager.search, query_text, top_k, collection
+        )
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: Dict[str, List[Dict[str, Any]]],
+    weights: Dict[str, float],
+    top_k: int,
+    k: int = HYBRID_RRF_K,
+) -> List[Dict[str, Any]]:
+    """
+    倒数排名融合：文档得分为各路 weight / (k + 排名) 之和，排名从 1 开始
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for source, results in ranked_lists.items():
+        weight = weights.get(source, 1.0)
+        for rank, item in enumerate(results, start=1):
+            entry = fused.get(item["id"])
+            if entry is None:
+                entry = {
+                    "id": item["id"],
+                    "text": item["text"],
+                    "metadata": item["metadata"],
+                    "score": 0.0,
+                    "ranks": {},
+                }
+                fused[item["id"]] = entry
+            entry["score"] += weight / (k + rank)
+            entry["ranks"][source] = rank
+    return sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)[
+        :top_k
+    ]
+
+
+async def hybrid_search(
+    query_text: str,
+    top_k: int,
+    embedding: Optional[List[float]] = None,
+    dense_weight: float = 1.0,
+    keyword_weight: float = 1.0,
+    rrf_k: int = HYBRID_RRF_K,
+    ef: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    rerank: Optional[bool] = None,
+    collection: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    同时执行向量检索和 BM25 检索，按倒数排名融合合并结果
+    """
+    candidates = max(top_k, HYBRID_CANDIDATES)
+    with tracer.start_span("hybrid_search", {"top_k": top_k, "candidates": candidates}):
+        dense_results, keyword_results = await asyncio.gather(
+            dense_search(
+                candidates,
+                query_text=query_text,
+                embedding=embedding,
+                ef=ef,
+                nprobe=nprobe,
+                rerank=rerank,
+                collection=collection,
+            ),
+            keyword_search(query_text, candidates, collection),
+        )
+    return reciprocal_rank_fusion(
+        {"dense": dense_results, "keyword": keyword_results},
+        {"dense": dense_weight, "keyword": keyword_weight},
+        top_k,
+        k=rrf_k,
+    )
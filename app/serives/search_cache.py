@@ -0,0 +1,279 @@
+# app/serives/search_cache.py
+import itertools
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.metrics import CACHE_REQUESTS
+from app.utils.shared_generation import SharedGeneration, get_shared_generation
+from config.setting import (
+    SEARCH_CACHE_ENABLED,
+    SEARCH_CACHE_MAX_BYTES,
+    SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_SIMILARITY_THRESHOLD,
+    SEARCH_CACHE_TTL_SECONDS,
+)
+
+
+def normalize_query(text: str) -> str:
+    """
+    归一化查询文本：忽略大小写、多余空白和首尾标点
+    """
+    text = re.sub(r"\s+", " ", text.casefold()).strip()
+    return text.strip("?？!！.。,，;；:： ")
+
+
+class _CacheEntry:
+    __slots__ = ("key", "top_k", "embedding", "results", "expires_at", "size")
+
+    def __init__(self, key, top_k, embedding, results, expires_at, size):
+        self.key = key
+        self.top_k = top_k
+        self.embedding = embedding
+        self.results = results
+        self.expires_at = expires_at
+        self.size = size
+
+
+class SearchCache:
+    """
+    检索结果缓存
+
+    - 精确命中：按 (归一化查询文本, top_k) 查找
+    - 语义命中：查询向量与已缓存查询的余弦相似度超过阈值，且缓存的 top_k 不小于请求的 top_k
+    - 每条缓存有 TTL，总条数和估算内存有上限，超出时按 LRU 淘汰
+    - 任何写入后调用 invalidate 清空缓存；写入前开始的检索结果不会再写回缓存
+    - 传入 shared 时，其它 worker 的写入也会使本进程的缓存失效
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 300,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        similarity_threshold: float = 0.95,
+        enabled: bool = True,
+        shared: Optional[SharedGeneration] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.similarity_threshold = similarity_threshold
+        self.enabled = enabled
+        self.shared = shared
+        self._shared_seen = shared.value if shared else 0
+
+        self._entries: "OrderedDict[Tuple[str, int], _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[Tuple[str, int]] = []
+        self._anonymous_ids = itertools.count()
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        """
+        缓存代数，每次失效加一；检索开始前读取，写回时传给 put
+        """
+        with self._lock:
+            self._sync_shared()
+            return self._generation
+
+    def get_exact(self, query_text: str, top_k: int) -> Optional[List[Dict[str, Any]]]:
+        if not self.enabled:
+            return None
+        key = (normalize_query(query_text), top_k)
+        with self._lock:
+            self._sync_shared()
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry):
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            CACHE_REQUESTS.labels("search", "exact_hit").inc()
+            return entry.results
+
+    def get_semantic(
+        self, embedding: List[float], top_k: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        if not self.enabled:
+            return None
+        query = self._normalize_vector(embedding)
+        with self._lock:
+            self._sync_shared()
+            if query is None or not self._entries:
+                self.misses += 1
+                CACHE_REQUESTS.labels("search", "miss").inc()
+                return None
+            matrix = self._get_matrix()
+            if matrix.shape[1] != query.shape[0]:
+                self.misses += 1
+                CACHE_REQUESTS.labels("search", "miss").inc()
+                return None
+
+            scores = matrix @ query
+            for index in np.argsort(-scores):
+                if scores[index] < self.similarity_threshold:
+                    break
+                entry = self._entries.get(self._matrix_keys[index])
+                if entry is None or entry.top_k < top_k or self._expired(entry):
+                    continue
+                self._entries.move_to_end(entry.key)
+                self.semantic_hits += 1
+                CACHE_REQUESTS.labels("search", "semantic_hit").inc()
+                return entry.results[:top_k]
+
+            self.misses += 1
+            CACHE_REQUESTS.labels("search", "miss").inc()
+            return None
+
+    def put(
+        self,
+        query_text: Optional[str],
+        embedding: List[float],
+        top_k: int,
+        results: List[Dict[str, Any]],
+        generation: int,
+    ):
+        if not self.enabled:
+            return
+        vector = self._normalize_vector(embedding)
+        if vector is None:
+            return
+        # 没有查询文本时（直接传向量检索）只参与语义命中
+        if query_text:
+            key = (normalize_query(query_text), top_k)
+        else:
+            key = (f"#{next(self._anonymous_ids)}", top_k)
+        size = len(json.dumps(results, ensure_ascii=False, default=str)) + vector.nbytes
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._sync_shared()
+            # 检索期间发生过写入，结果可能已过期
+            if generation != self._generation:
+                return
+            self._remove(key)
+            self._entries[key] = _CacheEntry(
+                key, top_k, vector, results, time.time() + self.ttl_seconds, size
+            )
+            self._bytes += size
+            self._matrix = None
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self):
+        """
+        集合有写入时清空全部缓存，并通知其它 worker
+        """
+        with self._lock:
+            if self.shared is not None:
+                self._shared_seen = self.shared.bump()
+            self._clear()
+
+    def _sync_shared(self):
+        # 其它 worker 写入过集合时清空缓存
+        if self.shared is None:
+            return
+        current = self.shared.value
+        if current == self._shared_seen:
+            return
+        if self.shared.changed_elsewhere(self._shared_seen, current):
+            self._clear()
+        self._shared_seen = current
+
+    def _clear(self):
+        self._generation += 1
+        self._entries.clear()
+        self._bytes = 0
+        self._matrix = None
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+    def _expired(self, entry: _CacheEntry) -> bool:
+        if entry.expires_at > time.time():
+            return False
+        self._remove(entry.key)
+        return True
+
+    def _remove(self, key: Tuple[str, int]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+            self._matrix = None
+
+    def _get_matrix(self) -> np.ndarray:
+        # 缓存条目变化时才重建向量矩阵
+        if self._matrix is None:
+            self._matrix_keys = list(self._entries.keys())
+            self._matrix = np.stack(
+                [self._entries[key].embedding for key in self._matrix_keys]
+            )
+        return self._matrix
+
+    @staticmethod
+    def _normalize_vector(embedding: List[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if vector.ndim != 1 or norm == 0:
+            return None
+        return vector / norm
+
+
+# 集合名 -> 检索结果缓存，不同集合使用不同的 embedding 模型，缓存互相独立
+_search_caches: Dict[str, SearchCache] = {}
+_search_caches_lock = threading.Lock()
+
+
+def get_search_cache(collection: str) -> SearchCache:
+    """
+    获取集合的检索结果缓存，不存在时创建
+    """
+    cache = _search_caches.get(collection)
+    if cache is None:
+        with _search_caches_lock:
+            cache = _search_caches.get(collection)
+            if cache is None:
+                cache = SearchCache(
+                    ttl_seconds=SEARCH_CACHE_TTL_SECONDS,
+                    max_entries=SEARCH_CACHE_MAX_ENTRIES,
+                    max_bytes=SEARCH_CACHE_MAX_BYTES,
+                    similarity_threshold=SEARCH_CACHE_SIMILARITY_THRESHOLD,
+                    enabled=SEARCH_CACHE_ENABLED,
+                    shared=get_shared_generation(collection),
+                )
+                _search_caches[collection] = cache
+    return cache
+
+
+def drop_search_cache(collection: str):
+    """
+    集合移除后删除它的检索结果缓存
+    """
+    with _search_caches_lock:
+        _search_caches.pop(collection, None)
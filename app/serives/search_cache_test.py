@@ -0,0 +1,83 @@
+# app/serives/search_cache_test.py
+import os
+import sys
+import time
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from app.serives.search_cache import SearchCache, normalize_query
+from app.utils.shared_generation import SharedGeneration
+
+RESULTS = [{"id": str(i), "text": f"doc {i}", "score": 1.0 - i / 10} for i in range(5)]
+
+
+def test_normalize_query():
+    assert normalize_query("  How do I   reset my password? ") == (
+        "how do i reset my password"
+    )
+
+
+def test_exact_and_semantic_hits():
+    cache = SearchCache(similarity_threshold=0.9)
+    cache.put("How to reset password?", [1.0, 0.0, 0.0], 5, RESULTS, cache.generation)
+
+    assert cache.get_exact("how to reset password", 5) == RESULTS
+    assert cache.get_exact("how to reset password", 3) is None
+    # 向量接近时命中，并按请求的 top_k 截断
+    assert cache.get_semantic([0.99, 0.05, 0.0], 3) == RESULTS[:3]
+    # 缓存的 top_k 不足时不命中
+    assert cache.get_semantic([0.99, 0.05, 0.0], 10) is None
+    assert cache.get_semantic([0.0, 1.0, 0.0], 3) is None
+
+    stats = cache.stats()
+    assert stats["exact_hits"] == 1
+    assert stats["semantic_hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_invalidate_rejects_stale_results():
+    cache = SearchCache()
+    generation = cache.generation
+    cache.put("q1", [1.0, 0.0], 5, RESULTS, generation)
+    cache.invalidate()
+    assert cache.get_exact("q1", 5) is None
+
+    # 检索开始后发生了写入，结果不再写回缓存
+    cache.put("q2", [0.0, 1.0], 5, RESULTS, generation)
+    assert cache.get_exact("q2", 5) is None
+
+
+def test_ttl_and_capacity():
+    cache = SearchCache(ttl_seconds=0.05, max_entries=2)
+    for i in range(3):
+        cache.put(f"q{i}", [1.0, float(i)], 5, RESULTS, cache.generation)
+    assert cache.get_exact("q0", 5) is None
+    assert cache.stats()["entries"] == 2
+
+    time.sleep(0.1)
+    assert cache.get_exact("q2", 5) is None
+    assert cache.get_semantic([1.0, 2.0], 5) is None
+
+
+def test_writes_in_other_workers_invalidate(tmp_path):
+    path = str(tmp_path / "documents.gen")
+    # 两个缓存各自持有计数器实例，模拟两个 worker
+    worker_a = SearchCache(shared=SharedGeneration(path))
+    worker_b = SearchCache(shared=SharedGeneration(path))
+    worker_a.put("q1", [1.0, 0.0], 5, RESULTS, worker_a.generation)
+
+    # 本进程的写入只清空一次
+    worker_a.invalidate()
+    assert worker_a.stats()["invalidations"] == 1
+    worker_a.put("q1", [1.0, 0.0], 5, RESULTS, worker_a.generation)
+    assert worker_a.get_exact("q1", 5) == RESULTS
+
+    generation = worker_a.generation
+    worker_b.invalidate()
+    assert worker_a.get_exact("q1", 5) is None
+    # 其它 worker 写入前开始的检索结果不写回缓存
+    worker_a.put("q2", [0.0, 1.0], 5, RESULTS, generation)
+    assert worker_a.get_exact("q2", 5) is None
@@ -0,0 +1,166 @@
+# app/serives/startup.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from app.utils.log import log
+
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+FAILED = "failed"
+# 依赖的服务初始化失败，未执行
+SKIPPED = "skipped"
+
+
+class StartupTask:
+    """
+    单个服务的初始化任务及其状态
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        depends_on: Iterable[str],
+        required: bool,
+        background: bool,
+    ):
+        self.name = name
+        self.func = func
+        self.depends_on = list(depends_on)
+        # 就绪检查是否要求该服务初始化成功
+        self.required = required
+        # 后台任务不阻塞启动，如 LLM 预热
+        self.background = background
+        self.state = PENDING
+        self.error: Optional[str] = None
+        self.start_time: Optional[float] = None
+        self.duration: Optional[int] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (READY, FAILED, SKIPPED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "required": self.required,
+            "background": self.background,
+            "depends_on": self.depends_on,
+            "duration": self.duration,
+            "error": self.error,
+        }
+
+
+class StartupScheduler:
+    """
+    按依赖关系并发初始化各个服务
+
+    没有依赖关系的服务同时初始化，依赖的服务全部成功后才开始初始化；
+    初始化函数返回 False 或抛出异常视为失败，依赖它的服务不再初始化。
+    """
+
+    def __init__(self):
+        self.tasks: Dict[str, StartupTask] = {}
+        self.start_time: Optional[float] = None
+        self._condition = threading.Condition()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def register(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        depends_on: Iterable[str] = (),
+        required: bool = True,
+        background: bool = False,
+    ):
+        if name in self.tasks:
+            raise ValueError(f"startup task {name} already registered")
+        self.tasks[name] = StartupTask(name, func, depends_on, required, background)
+
+    def start(self):
+        """
+        开始初始化，立即返回
+        """
+        for task in self.tasks.values():
+            for dependency in task.depends_on:
+                if dependency not in self.tasks:
+                    raise ValueError(
+                        f"startup task {task.name} depends on unknown task {dependency}"
+                    )
+        self.start_time = time.time()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, len(self.tasks)), thread_name_prefix="startup"
+        )
+        with self._condition:
+            self._schedule()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待所有非后台任务结束，返回是否已就绪
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: all(
+                    task.finished for task in self.tasks.values() if not task.background
+                ),
+                timeout=timeout,
+            )
+        duration = int((time.time() - self.start_time) * 1000)
+        log.info(f"startup finished, ready: {self.is_ready()}, duration: {duration} ms")
+        return self.is_ready()
+
+    def is_ready(self) -> bool:
+        return all(task.state == READY for task in self.tasks.values() if task.required)
+
+    def status(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "ready": self.is_ready(),
+                "components": {
+                    name: task.to_dict() for name, task in self.tasks.items()
+                },
+            }
+
+    def _schedule(self):
+        # 调用方需持有 _condition
+        for task in self.tasks.values():
+            if task.state != PENDING:
+                continue
+            states = [self.tasks[name].state for name in task.depends_on]
+            if any(state in (FAILED, SKIPPED) for state in states):
+                task.state = SKIPPED
+                task.error = "dependency failed"
+                log.warning(f"startup task {task.name} skipped, dependency failed")
+                # 依赖它的任务也需要跳过
+                self._schedule()
+                return
+            if all(state == READY for state in states):
+                task.state = RUNNING
+                task.start_time = time.time()
+                self._executor.submit(self._run, task)
+        self._condition.notify_all()
+
+    def _run(self, task: StartupTask):
+        try:
+            result = task.func()
+            error = "init returned False" if result is False else None
+        except Exception as e:
+            error = str(e)
+
+        with self._condition:
+            task.duration = int((time.time() - task.start_time) * 1000)
+            task.state = FAILED if error else READY
+            task.error = error
+            if error:
+                log.error(f"startup task {task.name} failed: {error}")
+            else:
+                log.info(
+                    f"startup task {task.name} ready, duration: {task.duration} ms"
+                )
+            self._schedule()
+
+
+startup_scheduler = StartupScheduler()
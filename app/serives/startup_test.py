@@ -0,0 +1,85 @@
+# app/serives/startup_test.py
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from app.serives.startup import FAILED, READY, SKIPPED, StartupScheduler
+
+
+def test_independent_tasks_run_concurrently():
+    scheduler = StartupScheduler()
+    barrier = threading.Barrier(2, timeout=1)
+    order = []
+    scheduler.register("a", lambda: barrier.wait())
+    scheduler.register("b", lambda: barrier.wait())
+    scheduler.register("c", lambda: order.append("c"), depends_on=["a", "b"])
+
+    scheduler.start()
+    assert scheduler.wait(timeout=2)
+    assert order == ["c"]
+    status = scheduler.status()
+    assert status["ready"]
+    assert all(c["state"] == READY for c in status["components"].values())
+
+
+def test_failed_dependency_skips_dependants():
+    scheduler = StartupScheduler()
+    scheduler.register("milvus", lambda: False)
+    scheduler.register("index", lambda: None, depends_on=["milvus"])
+    scheduler.register("embedding", lambda: True)
+
+    scheduler.start()
+    assert not scheduler.wait(timeout=2)
+    components = scheduler.status()["components"]
+    assert components["milvus"]["state"] == FAILED
+    assert components["index"]["state"] == SKIPPED
+    assert components["embedding"]["state"] == READY
+
+
+def test_background_task_does_not_block_ready():
+    scheduler = StartupScheduler()
+    release = threading.Event()
+    scheduler.register("llm", lambda: True)
+    scheduler.register(
+        "warmup",
+        lambda: release.wait(2),
+        depends_on=["llm"],
+        required=False,
+        background=True,
+    )
+
+    begin = time.time()
+    scheduler.start()
+    assert scheduler.wait(timeout=2)
+    assert time.time() - begin < 1
+    release.set()
+
+
+def test_failed_milvus_connection_is_not_ready(monkeypatch):
+    import config.etcd_config as etcd_config
+    from app.models.config.milvus_config import MilvusConfig
+    from app.serives import init
+    from app.serives.collection_registry import CollectionRegistry
+
+    milvus_config = MilvusConfig(
+        host="127.0.0.1", port=19530, collectionName="documents", dim=768
+    )
+    monkeypatch.setattr(
+        etcd_config, "ETCD_CONFIG", SimpleNamespace(milvusConfig=milvus_config)
+    )
+    CollectionRegistry.init(milvus_config)
+    # MilvusManager.init 自己捕获连接异常并返回 False
+    monkeypatch.setattr(init.MilvusManager, "init", lambda **kwargs: False)
+
+    scheduler = StartupScheduler()
+    scheduler.register("milvus", init.init_milvus)
+    scheduler.start()
+    assert not scheduler.wait(timeout=2)
+    assert scheduler.status()["components"]["milvus"]["state"] == FAILED
@@ -0,0 +1,305 @@
+# app/utils/embedding_cache.py
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.utils.log import log
+from app.utils.metrics import CACHE_REQUESTS
+
+
+def text_hash(text: str, kind: str = "text") -> str:
+    """
+    计算缓存键：query 和 text 的嵌入可能不同（带 instruction 的模型），分开存储
+    """
+    return hashlib.sha256(f"{kind}\0{text}".encode("utf-8")).hexdigest()
+
+
+class DiskVectorStore:
+    """
+    基于内存映射文件的 float32 向量存储，进程重启后仍可使用
+
+    目录结构:
+        meta.json   向量维度
+        vectors.f32 连续存放的 float32 向量，按行号定位
+        keys.log    追加写入的键，第 N 行对应 vectors.f32 的第 N 行
+        lock        写入时持有的文件锁
+
+    多个 worker 进程共享同一目录：分配行号、写入向量和追加键都在文件锁内完成，
+    查询未命中时读取其它进程新追加的键
+    """
+
+    _GROW_ROWS = 4096
+    _KEY_LENGTH = 64
+    _LINE_LENGTH = _KEY_LENGTH + 1
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._keys_path = os.path.join(directory, "keys.log")
+        self._lock_fd = os.open(
+            os.path.join(directory, "lock"), os.O_RDWR | os.O_CREAT, 0o644
+        )
+
+        self.dim: Optional[int] = None
+        self._index: Dict[str, int] = {}
+        self._rows = 0
+        # 已读取的 keys.log 字节数，之后的内容由其它进程追加
+        self._keys_offset = 0
+        self._capacity = 0
+        self._vectors: Optional[np.memmap] = None
+        self._keys_fd: Optional[int] = None
+        with self._file_lock():
+            self._load()
+
+    @contextmanager
+    def _file_lock(self):
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _load(self):
+        if not os.path.exists(self._meta_path):
+            return
+        self._open_files()
+        self._sync()
+        # 进程崩溃时最后一行可能写了一半；向量文件比键少时（写入中途崩溃），以较小者为准。
+        # 持有文件锁时没有其它进程在写入，可以安全截断
+        if self._capacity < self._rows:
+            self._index = {k: v for k, v in self._index.items() if v < self._capacity}
+            self._rows = self._capacity
+            self._keys_offset = self._rows * self._LINE_LENGTH
+        os.truncate(self._keys_path, self._keys_offset)
+
+    def _open_files(self):
+        with open(self._meta_path, "r") as f:
+            self.dim = json.load(f)["dim"]
+        if not os.path.exists(self._vectors_path):
+            open(self._vectors_path, "wb").close()
+        self._keys_fd = os.open(
+            self._keys_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644
+        )
+
+    def _sync(self):
+        """
+        读取其它进程追加的键，向量文件被其它进程扩容时重新映射
+        """
+        if self.dim is None:
+            if not os.path.exists(self._meta_path):
+                return
+            self._open_files()
+        size = os.path.getsize(self._keys_path)
+        if size > self._keys_offset:
+            with open(self._keys_path, "rb") as f:
+                f.seek(self._keys_offset)
+                data = f.read(size - self._keys_offset)
+            # 只读取完整的行，键和换行在同一次 write 中写入
+            for start in range(0, len(data) - self._LINE_LENGTH + 1, self._LINE_LENGTH):
+                line = data[start : start + self._LINE_LENGTH]
+                if line[-1:] != b"\n":
+                    break
+                self._index[line[:-1].decode("ascii")] = self._rows
+                self._rows += 1
+                self._keys_offset += self._LINE_LENGTH
+        if self._rows > self._capacity or self._vectors is None:
+            self._map()
+
+    def _map(self):
+        self._capacity = os.path.getsize(self._vectors_path) // (self.dim * 4)
+        if self._capacity == 0:
+            self._vectors = None
+            return
+        self._vectors = np.memmap(
+            self._vectors_path,
+            dtype=np.float32,
+            mode="r+",
+            shape=(self._capacity, self.dim),
+        )
+
+    def _init_dim(self, dim: int):
+        tmp_path = f"{self._meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dim": dim}, f)
+        open(self._vectors_path, "wb").close()
+        open(self._keys_path, "wb").close()
+        os.replace(tmp_path, self._meta_path)
+        self._open_files()
+
+    def _grow(self, rows: int):
+        # 其它进程可能已经扩容，以文件的实际大小为准
+        self._map()
+        if self._rows + rows <= self._capacity:
+            return
+        capacity = max(self._capacity * 2, self._capacity + rows, self._GROW_ROWS)
+        with open(self._vectors_path, "r+b") as f:
+            f.truncate(capacity * self.dim * 4)
+        self._map()
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def get(self, key: str) -> Optional[List[float]]:
+        row = self._index.get(key)
+        if row is None:
+            # 其它进程可能已写入
+            self._sync()
+            row = self._index.get(key)
+            if row is None:
+                return None
+        return self._vectors[row].tolist()
+
+    def put(self, key: str, embedding: List[float]):
+        if key in self._index:
+            return
+        with self._file_lock():
+            self._sync()
+            if key in self._index:
+                return
+            if self.dim is None:
+                self._init_dim(len(embedding))
+            if len(embedding) != self.dim:
+                log.warning(
+                    f"embedding dim {len(embedding)} != cache dim {self.dim}, skip disk cache"
+                )
+                return
+            if self._rows >= self._capacity:
+                self._grow(1)
+
+            # 先写向量再写键，其它进程读到键时向量已写入；共享映射的写入对其它进程立即可见，
+            # 键通过 O_APPEND 直接写入文件，都不需要逐条 flush
+            self._vectors[self._rows] = np.asarray(embedding, dtype=np.float32)
+            os.write(self._keys_fd, (key + "\n").encode("ascii"))
+            self._index[key] = self._rows
+            self._rows += 1
+            self._keys_offset += self._LINE_LENGTH
+
+    def close(self):
+        if self._vectors is not None:
+            self._vectors.flush()
+        if self._keys_fd is not None:
+            os.close(self._keys_fd)
+            self._keys_fd = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+
+class EmbeddingCache:
+    """
+    两级嵌入向量缓存：有界的内存 LRU + 磁盘内存映射存储
+
+    同一模型的缓存在进程内共享，通过 get_instance 获取
+    """
+
+    _instances: Dict[str, "EmbeddingCache"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self,
+        model_name: str,
+        cache_dir: Optional[str] = None,
+        max_memory_items: int = 10000,
+    ):
+        self.model_name = model_name
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._disk: Optional[DiskVectorStore] = None
+        if cache_dir:
+            # 模型名中可能包含 / 和 :，转换为合法的目录名
+            safe_name = re.sub(r"[^0-9A-Za-z._-]", "_", model_name)
+            self._disk = DiskVectorStore(os.path.join(cache_dir, safe_name))
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def get_instance(
+        cls,
+        model_name: str,
+        cache_dir: Optional[str] = None,
+        max_memory_items: int = 10000,
+    ) -> "EmbeddingCache":
+        with cls._instances_lock:
+            if model_name not in cls._instances:
+                cls._instances[model_name] = cls(
+                    model_name, cache_dir=cache_dir, max_memory_items=max_memory_items
+                )
+            return cls._instances[model_name]
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                CACHE_REQUESTS.labels("embedding", "memory_hit").inc()
+                return embedding
+
+            if self._disk is not None:
+                embedding = self._disk.get(key)
+                if embedding is not None:
+                    self._remember(key, embedding)
+                    self.disk_hits += 1
+                    CACHE_REQUESTS.labels("embedding", "disk_hit").inc()
+                    return embedding
+
+            self.misses += 1
+            CACHE_REQUESTS.labels("embedding", "miss").inc()
+            return None
+
+    def peek(self, key: str) -> Optional[List[float]]:
+        """
+        只查内存缓存，不更新 LRU 顺序和命中统计
+        """
+        with self._lock:
+            return self._memory.get(key)
+
+    def put(self, key: str, embedding: List[float]):
+        with self._lock:
+            self._remember(key, embedding)
+            if self._disk is not None:
+                try:
+                    self._disk.put(key, embedding)
+                except Exception as e:
+                    log.warning(f"failed to write embedding cache to disk: {e}")
+
+    def _remember(self, key: str, embedding: List[float]):
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def clear_memory(self):
+        """
+        清空内存 LRU，磁盘缓存保留，用于释放空闲模型占用的内存
+        """
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "memory_items": len(self._memory),
+                "disk_items": len(self._disk) if self._disk is not None else 0,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._disk is not None:
+                self._disk.close()
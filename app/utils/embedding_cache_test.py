@@ -0,0 +1,157 @@
+# app/utils/embedding_cache_test.py
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+from app.custom.custom_cached_embedding_wrapper import CustomCachedEmbeddingWrapper
+from app.utils.embedding_cache import DiskVectorStore, EmbeddingCache, text_hash
+
+# 记录假 embedding 模型的每次调用
+calls: List[List[str]] = []
+
+
+class CountingEmbedding(BaseEmbedding):
+    """记录调用次数的假 embedding 模型"""
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        calls.append(list(texts))
+        return [[float(len(text)), 1.0, 2.0] for text in texts]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed([query])[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        await asyncio.sleep(0.05)
+        return self._embed([query])[0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(0.05)
+        return self._embed(texts)
+
+
+def test_embedding_cache_survives_restart():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = EmbeddingCache("test/model:latest", cache_dir=cache_dir)
+        for i in range(5000):
+            cache.put(text_hash(f"text {i}"), [float(i), 0.5])
+        cache.close()
+
+        reopened = EmbeddingCache(
+            "test/model:latest", cache_dir=cache_dir, max_memory_items=10
+        )
+        assert reopened.get(text_hash("text 4321")) == [4321.0, 0.5]
+        assert reopened.get(text_hash("text 4321", "query")) is None
+        stats = reopened.stats()
+        assert stats["disk_items"] == 5000
+        assert stats["disk_hits"] == 1
+        assert stats["misses"] == 1
+        reopened.close()
+
+
+def write_disk_store(cache_dir: str, worker: int, count: int):
+    store = DiskVectorStore(cache_dir)
+    for i in range(count):
+        # 各进程写入相同的共享键和各自的键
+        store.put(text_hash(f"shared {i}"), [float(i), 0.5])
+        store.put(text_hash(f"worker {worker} text {i}"), [float(worker), float(i)])
+    store.close()
+
+
+def test_disk_store_shared_by_processes():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # 在其它进程写入前打开，未命中时读取其它进程追加的键
+        reader = DiskVectorStore(cache_dir)
+        context = multiprocessing.get_context("fork")
+        processes = [
+            context.Process(target=write_disk_store, args=(cache_dir, worker, 200))
+            for worker in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        assert all(process.exitcode == 0 for process in processes)
+        assert reader.get(text_hash("worker 3 text 199")) == [3.0, 199.0]
+
+        reopened = DiskVectorStore(cache_dir)
+        assert len(reopened) == 200 + 4 * 200
+        for i in range(200):
+            assert reopened.get(text_hash(f"shared {i}")) == [float(i), 0.5]
+            for worker in range(4):
+                assert reopened.get(text_hash(f"worker {worker} text {i}")) == [
+                    float(worker),
+                    float(i),
+                ]
+        reader.close()
+        reopened.close()
+
+
+def test_memory_lru_is_bounded():
+    cache = EmbeddingCache("model", max_memory_items=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    cache.get("a")
+    cache.put("c", [3.0])
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0]
+    assert cache.stats()["memory_items"] == 2
+
+
+def test_wrapper_caches_batch_embeddings():
+    calls.clear()
+    embed = CustomCachedEmbeddingWrapper(
+        CountingEmbedding(model_name="counting"), cache=EmbeddingCache("counting")
+    )
+    first = embed.get_text_embedding_batch(["a", "bb", "a"])
+    second = embed.get_text_embedding_batch(["bb", "ccc"])
+    assert first == [[1.0, 1.0, 2.0], [2.0, 1.0, 2.0], [1.0, 1.0, 2.0]]
+    assert second[1] == [3.0, 1.0, 2.0]
+    assert calls == [["a", "bb"], ["ccc"]]
+
+
+def test_wrapper_deduplicates_concurrent_lookups():
+    calls.clear()
+    embed = CustomCachedEmbeddingWrapper(
+        CountingEmbedding(model_name="dedup"), cache=EmbeddingCache("dedup")
+    )
+
+    async def run():
+        return await asyncio.gather(
+            *[embed.aget_query_embedding("same query") for _ in range(20)]
+        )
+
+    results = asyncio.run(run())
+    assert all(result == results[0] for result in results)
+    assert calls == [["same query"]]
+
+
+def test_wrapper_deduplicates_across_threads():
+    calls.clear()
+    embed = CustomCachedEmbeddingWrapper(
+        CountingEmbedding(model_name="threads"), cache=EmbeddingCache("threads")
+    )
+    threads = [
+        threading.Thread(target=embed.get_text_embedding, args=("shared",))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [["shared"]]
+    assert embed.get_cache_stats()["memory_items"] == 1
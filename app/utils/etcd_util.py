@@ -3,7 +3,8 @@ import yaml
 import etcd3
 import json
 import logging
-from typing import Any, Dict, Optional
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -15,6 +16,7 @@ class ConfigManager:
         etcd_host: str = "localhost",
         etcd_port: int = 2379,
         config_prefix: str = "/config",
+        timeout: Optional[float] = None,
     ):
         """
         初始化配置管理器
@@ -23,9 +25,16 @@ class ConfigManager:
             etcd_host: ETCD服务器地址
             etcd_port: ETCD服务器端口
             config_prefix: 配置键前缀
+            timeout: 每次请求ETCD的超时（秒），为空时不限制
         """
-        self.etcd_client = etcd3.client(host=etcd_host, port=etcd_port)
+        self.etcd_client = etcd3.client(host=etcd_host, port=etcd_port, timeout=timeout)
         self.config_prefix = config_prefix.rstrip("/")
+        # 最近一次读取或 watch 到的配置及其 etcd 版本，get_value 直接读取，不再访问 ETCD
+        self._config: Optional[Dict[str, Any]] = None
+        self.revision = 0
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+        self._watch_cancel: Optional[Callable[[], None]] = None
 
     def upload_yaml_config(self, yaml_file_path: str) -> bool:
         """
@@ -48,16 +57,24 @@ class ConfigManager:
             logger.error(f"Failed to upload config: {e}")
             return False
 
+    def fetch_config(self) -> Tuple[Optional[Dict[str, Any]], int]:
+        """
+        从ETCD读取完整的配置及其版本，配置不存在时返回 (None, 0)，读取失败时抛出异常
+        """
+        value, metadata = self.etcd_client.get(self.config_prefix)
+        if value is None:
+            return None, 0
+        return json.loads(value.decode("utf-8")), metadata.mod_revision
+
     def get_config(self) -> Optional[Dict[str, Any]]:
         """
-        获取完整的配置
+        获取完整的配置，同时刷新本地快照
         """
         try:
-            value, _ = self.etcd_client.get(self.config_prefix)
-            if value is None:
-                return None
-
-            return json.loads(value.decode("utf-8"))
+            config, revision = self.fetch_config()
+            if config is not None:
+                self._config, self.revision = config, revision
+            return config
 
         except Exception as e:
             logger.error(f"Failed to get config: {e}")
@@ -67,9 +84,11 @@ class ConfigManager:
         """
         通过点号路径获取配置值
         例如: 'milvus.milvusHost' 或 'postgresql.username'
+
+        从本地快照读取，只在还没有快照时访问一次ETCD；快照由 get_config 和 watch 更新
         """
         try:
-            config = self.get_config()
+            config = self._config if self._config is not None else self.get_config()
             if config is None:
                 return default
 
@@ -87,6 +106,106 @@ class ConfigManager:
             logger.error(f"Failed to get value for {key_path}: {e}")
             return default
 
+    def set_value(self, key_path: str, value: Any) -> bool:
+        """
+        通过点号路径修改配置值并写回ETCD
+
+        以读取时的版本做比较写入，期间配置被其它客户端修改时放弃写入并返回 False
+        """
+        try:
+            config, revision = self.fetch_config()
+            config = config or {}
+            keys = key_path.split(".")
+            current = config
+            for key in keys[:-1]:
+                if not isinstance(current.get(key), dict):
+                    current[key] = {}
+                current = current[key]
+            current[keys[-1]] = value
+
+            transactions = self.etcd_client.transactions
+            succeeded, _ = self.etcd_client.transaction(
+                compare=[transactions.mod(self.config_prefix) == revision],
+                success=[transactions.put(self.config_prefix, json.dumps(config))],
+                failure=[],
+            )
+            if not succeeded:
+                logger.warning(f"Config changed concurrently, {key_path} not updated")
+            return succeeded
+
+        except Exception as e:
+            logger.error(f"Failed to set value for {key_path}: {e}")
+            return False
+
+    def watch(
+        self,
+        callback: Callable[[Dict[str, Any], int], None],
+        revision: int = 0,
+        retry_interval: float = 5,
+    ):
+        """
+        在后台线程中 watch 配置，配置更新后以 callback(配置, 版本) 调用
+
+        revision 为调用方已持有的配置版本，只通知更新的版本；连接断开后按 retry_interval
+        重连，重连时先读取一次完整配置，补上断开期间的变更。删除配置和无法解析的 JSON 被忽略。
+        """
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return
+        self.revision = max(self.revision, revision)
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch,
+            args=(callback, retry_interval),
+            name="etcd_config_watcher",
+            daemon=True,
+        )
+        self._watch_thread.start()
+
+    def _watch(self, callback: Callable[[Dict[str, Any], int], None], retry_interval):
+        while not self._watch_stop.is_set():
+            try:
+                config, revision = self.fetch_config()
+                if config is not None:
+                    self._notify(callback, config, revision)
+                # 从已持有版本的下一个版本开始，不遗漏读取和 watch 之间的变更
+                kwargs = {"start_revision": self.revision + 1} if self.revision else {}
+                events, self._watch_cancel = self.etcd_client.watch(
+                    self.config_prefix, **kwargs
+                )
+                logger.info(f"Watching config {self.config_prefix}")
+                for event in events:
+                    if not isinstance(event, etcd3.events.PutEvent):
+                        continue
+                    try:
+                        config = json.loads(event.value.decode("utf-8"))
+                    except ValueError as e:
+                        logger.error(f"Ignore invalid config update: {e}")
+                        continue
+                    self._notify(callback, config, event.mod_revision)
+
+            except Exception as e:
+                if not self._watch_stop.is_set():
+                    logger.warning(f"Config watch interrupted: {e}")
+            finally:
+                if self._watch_cancel is not None:
+                    self._watch_cancel()
+                    self._watch_cancel = None
+            self._watch_stop.wait(retry_interval)
+
+    def _notify(self, callback, config: Dict[str, Any], revision: int):
+        if revision <= self.revision:
+            return
+        self._config, self.revision = config, revision
+        try:
+            callback(config, revision)
+        except Exception as e:
+            logger.error(f"Failed to apply config revision {revision}: {e}")
+
+    def stop_watch(self):
+        self._watch_stop.set()
+        if self._watch_cancel is not None:
+            self._watch_cancel()
+
     def get_all_config(self) -> Dict[str, Any]:
         """
         获取所有配置
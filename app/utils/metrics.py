@@ -0,0 +1,146 @@
+# app/utils/metrics.py
+"""
+Prometheus 指标，基于 prometheus_client
+
+单进程时指标在内存中累加；多 worker 部署时主进程设置 PROMETHEUS_MULTIPROC_DIR，
+各 worker 把指标写入该目录下的内存映射文件，/metrics 被任一 worker 抓取时汇总全部进程的值。
+"""
+
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# prometheus_client 读取的多进程目录环境变量
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+# 耗时直方图的默认分桶，单位秒
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def init_multiprocess_dir(directory: str):
+    """
+    在启动 worker 前调用：清空上次运行留下的指标文件并设置环境变量，
+    worker 进程导入 prometheus_client 时即进入多进程模式
+    """
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+    os.environ[MULTIPROC_DIR_ENV] = directory
+
+
+def mark_process_dead(pid: int):
+    """
+    worker 退出时调用，清理该进程的实时指标文件
+    """
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        multiprocess.mark_process_dead(pid)
+
+
+def render_metrics() -> bytes:
+    """
+    输出 Prometheus 文本格式，多进程模式下汇总所有 worker 的指标
+    """
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
+
+
+@contextmanager
+def track(histogram_child, component: str) -> Iterator[None]:
+    """
+    记录代码块耗时，抛出异常时同时计入该组件的错误数
+    """
+    start_time = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        ERRORS.labels(component).inc()
+        raise
+    finally:
+        histogram_child.observe(time.perf_counter() - start_time)
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route, until the last body chunk is sent",
+    ["method", "route", "status"],
+    buckets=DEFAULT_BUCKETS,
+)
+EMBEDDING_DURATION = Histogram(
+    "embedding_request_duration_seconds",
+    "Latency of embedding calls to the model",
+    ["model", "operation"],
+    buckets=DEFAULT_BUCKETS,
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "embedding_batch_size",
+    "Number of texts per embedding call to the model",
+    ["model"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+MILVUS_OPERATION_DURATION = Histogram(
+    "milvus_operation_duration_seconds",
+    "Latency of Milvus insert and search operations",
+    ["operation"],
+    buckets=DEFAULT_BUCKETS,
+)
+MILVUS_EXECUTOR_QUEUE_DURATION = Histogram(
+    "milvus_executor_queue_duration_seconds",
+    "Time Milvus operations wait for a free executor thread",
+    ["operation"],
+    buckets=DEFAULT_BUCKETS,
+)
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from sending the prompt to the first generated token",
+    ["model"],
+    buckets=DEFAULT_BUCKETS,
+)
+LLM_GENERATION_DURATION = Histogram(
+    "llm_generation_duration_seconds",
+    "Total LLM generation time",
+    ["model"],
+    buckets=DEFAULT_BUCKETS,
+)
+LLM_GENERATED_TOKENS = Counter(
+    "llm_generated_tokens_total",
+    "Number of tokens generated by the LLM",
+    ["model"],
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result",
+    ["cache", "result"],
+)
+ERRORS = Counter(
+    "errors_total",
+    "Errors by component",
+    ["component"],
+)
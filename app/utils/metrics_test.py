@@ -0,0 +1,96 @@
+# app/utils/metrics_test.py
+import os
+import subprocess
+import sys
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from fastapi import APIRouter, FastAPI
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest
+from starlette.testclient import TestClient
+
+from app.middleware.metrics import MetricsMiddleware
+from app.utils.metrics import MULTIPROC_DIR_ENV, render_metrics
+
+
+def test_render_counter_and_histogram():
+    registry = CollectorRegistry()
+    counter = Counter("hits_total", "Hits", ["cache"], registry=registry)
+    histogram = Histogram(
+        "latency_seconds", "Latency", ["op"], buckets=(0.1, 1), registry=registry
+    )
+    counter.labels("search").inc()
+    counter.labels("search").inc(2)
+    histogram.labels("insert").observe(0.05)
+    histogram.labels("insert").observe(0.1)
+    histogram.labels("insert").observe(5)
+
+    lines = generate_latest(registry).decode().splitlines()
+    assert "# TYPE hits_total counter" in lines
+    assert 'hits_total{cache="search"} 3.0' in lines
+    assert "# TYPE latency_seconds histogram" in lines
+    # 分桶是累计的，等于上界的值计入该桶
+    assert 'latency_seconds_bucket{le="0.1",op="insert"} 2.0' in lines
+    assert 'latency_seconds_bucket{le="1.0",op="insert"} 2.0' in lines
+    assert 'latency_seconds_bucket{le="+Inf",op="insert"} 3.0' in lines
+    assert 'latency_seconds_sum{op="insert"} 5.15' in lines
+    assert 'latency_seconds_count{op="insert"} 3.0' in lines
+
+
+def test_workers_are_aggregated(tmp_path, monkeypatch):
+    # 两个 worker 进程各自计数，任一进程抓取时得到汇总值
+    env = {**os.environ, MULTIPROC_DIR_ENV: str(tmp_path), "PYTHONPATH": project_root}
+    script = (
+        "from app.utils.metrics import ERRORS, EMBEDDING_DURATION\n"
+        "ERRORS.labels('milvus').inc(2)\n"
+        "EMBEDDING_DURATION.labels('nomic', 'batch').observe(0.2)\n"
+    )
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", script], env=env, check=True)
+
+    monkeypatch.setenv(MULTIPROC_DIR_ENV, str(tmp_path))
+    lines = render_metrics().decode().splitlines()
+    assert 'errors_total{component="milvus"} 4.0' in lines
+    assert (
+        'embedding_request_duration_seconds_count{model="nomic",operation="batch"} 2.0'
+        in lines
+    )
+
+
+def test_middleware_labels_route_template():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    router = APIRouter()
+
+    @router.post("/search")
+    async def search():
+        return {}
+
+    app.include_router(router, prefix="/api")
+    app.add_middleware(MetricsMiddleware)
+    client = TestClient(app)
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/missing")
+    client.post("/api/search")
+
+    text = render_metrics().decode()
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="200"} 2'
+        in text
+    )
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1'
+        in text
+    )
+    assert (
+        'http_request_duration_seconds_count{method="POST",route="/api/search",status="200"} 1'
+        in text
+    )
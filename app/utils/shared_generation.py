@@ -0,0 +1,113 @@
+# app/utils/shared_generation.py
+"""
+多 worker 共享的集合写入代数
+
+每个集合一个 8 字节的计数文件，任一 worker 写入集合后加一；其它 worker 在检索时读取，
+发现代数变化就清空自己的检索结果缓存并重新加载关键词索引。
+主进程启动多个 worker 前设置 LAMA_RAG_GENERATION_DIR，未设置时（单进程）不共享。
+"""
+
+import fcntl
+import mmap
+import os
+import shutil
+import struct
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+# worker 进程读取的共享目录环境变量
+GENERATION_DIR_ENV = "LAMA_RAG_GENERATION_DIR"
+
+# 记录本进程最近产生的代数，用于区分本进程和其它进程的写入
+_OWN_HISTORY = 1024
+
+_COUNTER = struct.Struct("<Q")
+
+
+def init_generation_dir(directory: str):
+    """
+    在启动 worker 前调用：清空上次运行留下的计数文件并设置环境变量
+    """
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+    os.environ[GENERATION_DIR_ENV] = directory
+
+
+class SharedGeneration:
+    """
+    基于内存映射文件的跨进程计数器，读取不加锁，加一时持有文件锁
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size < _COUNTER.size:
+                os.ftruncate(self._fd, _COUNTER.size)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, _COUNTER.size)
+        self._own = deque(maxlen=_OWN_HISTORY)
+        self._own_set = set()
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        return _COUNTER.unpack_from(self._map)[0]
+
+    def bump(self) -> int:
+        """
+        本进程写入集合后调用，返回新的代数
+        """
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                value = _COUNTER.unpack_from(self._map)[0] + 1
+                _COUNTER.pack_into(self._map, 0, value)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            if len(self._own) == self._own.maxlen:
+                self._own_set.discard(self._own[0])
+            self._own.append(value)
+            self._own_set.add(value)
+        return value
+
+    def changed_elsewhere(self, seen: int, current: int) -> bool:
+        """
+        代数从 seen 变为 current 的过程中，是否有其它进程的写入
+        """
+        if current - seen > _OWN_HISTORY:
+            return True
+        with self._lock:
+            return any(
+                value not in self._own_set for value in range(seen + 1, current + 1)
+            )
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+_generations: Dict[str, SharedGeneration] = {}
+_generations_lock = threading.Lock()
+
+
+def get_shared_generation(collection: str) -> Optional[SharedGeneration]:
+    """
+    获取集合的共享写入代数，未启用多 worker 共享时返回 None
+    """
+    directory = os.environ.get(GENERATION_DIR_ENV)
+    if not directory:
+        return None
+    generation = _generations.get(collection)
+    if generation is None:
+        with _generations_lock:
+            generation = _generations.get(collection)
+            if generation is None:
+                generation = SharedGeneration(
+                    os.path.join(directory, f"{collection}.gen")
+                )
+                _generations[collection] = generation
+    return generation
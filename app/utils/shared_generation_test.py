@@ -0,0 +1,48 @@
+# app/utils/shared_generation_test.py
+import multiprocessing
+import os
+import sys
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from app.utils.shared_generation import SharedGeneration
+
+
+def bump_generation(path: str, count: int):
+    generation = SharedGeneration(path)
+    for _ in range(count):
+        generation.bump()
+    generation.close()
+
+
+def test_bumps_from_processes_are_counted(tmp_path):
+    path = str(tmp_path / "documents.gen")
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=bump_generation, args=(path, 50)) for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+    assert SharedGeneration(path).value == 200
+
+
+def test_changed_elsewhere_ignores_own_bumps(tmp_path):
+    path = str(tmp_path / "documents.gen")
+    # 两个实例模拟两个 worker
+    worker_a, worker_b = SharedGeneration(path), SharedGeneration(path)
+    seen = worker_a.value
+    worker_a.bump()
+    worker_a.bump()
+    assert not worker_a.changed_elsewhere(seen, worker_a.value)
+    assert worker_b.changed_elsewhere(seen, worker_b.value)
+
+    seen = worker_a.value
+    worker_b.bump()
+    worker_a.bump()
+    assert worker_a.changed_elsewhere(seen, worker_a.value)
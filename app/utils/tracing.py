@@ -0,0 +1,413 @@
+# app/utils/tracing.py
+"""
+轻量的请求链路追踪
+
+- 每个请求一棵 span 树（HTTP -> embedding -> 向量检索 -> LLM），当前 span 保存在 contextvars 中，
+  asyncio 任务和 asyncio.to_thread 会自动继承
+- 兼容 W3C Trace Context：从请求头 traceparent 继承 trace id 和采样标记
+- 按 trace id 比例采样，未采样的 span 只传递上下文，不记录属性、不导出
+- 结束的 span 放入队列，由后台线程批量导出到 OTLP/HTTP（JSON 编码）采集器或 JSON 行文件
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+from app.utils.log import log
+
+_TRACEPARENT_PATTERN = re.compile(
+    r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$"
+)
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+# OTLP 中 span kind 的枚举值
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+
+class SpanContext:
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[SpanContext]:
+    """
+    解析 W3C traceparent 请求头，格式不合法时返回 None
+    """
+    if not header:
+        return None
+    match = _TRACEPARENT_PATTERN.match(header.strip().lower())
+    if not match:
+        return None
+    version, trace_id, span_id, flags = match.groups()
+    if version == "ff" or trace_id == _INVALID_TRACE_ID or span_id == _INVALID_SPAN_ID:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 0x01))
+
+
+def format_traceparent(context: SpanContext) -> str:
+    return (
+        f"00-{context.trace_id}-{context.span_id}-{'01' if context.sampled else '00'}"
+    )
+
+
+class Span:
+    """
+    一次操作的耗时记录，未采样时不保存属性
+    """
+
+    __slots__ = (
+        "name",
+        "context",
+        "parent_span_id",
+        "kind",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "status_code",
+        "status_message",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        context: SpanContext,
+        parent_span_id: Optional[str],
+        kind: int,
+    ):
+        self.name = name
+        self.context = context
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+        self.status_code = 0
+        self.status_message = ""
+
+    @property
+    def recording(self) -> bool:
+        return self.context.sampled
+
+    def set_attribute(self, key: str, value: Any):
+        if self.context.sampled:
+            self.attributes[key] = value
+
+    def set_error(self, message: str):
+        if self.context.sampled:
+            self.status_code = 2
+            self.status_message = message
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": {"code": self.status_code, "message": self.status_message},
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def get_current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class FileSpanExporter:
+    """
+    每个 span 一行 JSON，追加写入文件
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str))
+                f.write("\n")
+
+    def shutdown(self):
+        pass
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpHttpSpanExporter:
+    """
+    以 OTLP/HTTP JSON 编码发送到采集器，如 http://127.0.0.1:4318/v1/traces
+    """
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._client = httpx.Client(timeout=timeout)
+
+    def _encode(self, spans: List[Span]) -> Dict[str, Any]:
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                "traceId": span.context.trace_id,
+                "spanId": span.context.span_id,
+                "name": span.name,
+                "kind": span.kind,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)}
+                    for key, value in span.attributes.items()
+                ],
+                "status": {"code": span.status_code, "message": span.status_message},
+            }
+            if span.parent_span_id:
+                otlp_span["parentSpanId"] = span.parent_span_id
+            otlp_spans.append(otlp_span)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": self.service_name},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": "app.utils.tracing"}, "spans": otlp_spans}
+                    ],
+                }
+            ]
+        }
+
+    def export(self, spans: List[Span]):
+        response = self._client.post(self.endpoint, json=self._encode(spans))
+        response.raise_for_status()
+
+    def shutdown(self):
+        self._client.close()
+
+
+class BatchSpanProcessor:
+    """
+    结束的 span 先放入有界队列，由后台线程按批次或时间间隔导出，不阻塞请求；队列满时丢弃
+    """
+
+    def __init__(
+        self,
+        exporter,
+        max_queue_size: int = 10000,
+        batch_size: int = 512,
+        interval: float = 5.0,
+    ):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue: deque = deque(maxlen=max_queue_size)
+        self._condition = threading.Condition()
+        self._stopped = False
+        self.dropped = 0
+        self.exported = 0
+        self._thread = threading.Thread(
+            target=self._run, name="span-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def on_end(self, span: Span):
+        with self._condition:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(span)
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopped and len(self._queue) < self.batch_size:
+                    self._condition.wait(self.interval)
+                stopped = self._stopped
+            self._export_all()
+            if stopped:
+                return
+
+    def _export_all(self):
+        while True:
+            with self._condition:
+                batch = [
+                    self._queue.popleft()
+                    for _ in range(min(self.batch_size, len(self._queue)))
+                ]
+            if not batch:
+                return
+            try:
+                self.exporter.export(batch)
+                self.exported += len(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                log.warning(f"Failed to export {len(batch)} spans: {e}")
+                return
+
+    def shutdown(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join(timeout=self.interval + 5)
+        self.exporter.shutdown()
+
+
+class Tracer:
+    """
+    创建 span 并维护当前 span；sample_rate 为 0 或没有 processor 时只传递上下文
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 0.0,
+        processor: Optional[BatchSpanProcessor] = None,
+    ):
+        self.sample_rate = sample_rate
+        self.processor = processor
+
+    def _should_sample(self, trace_id: str) -> bool:
+        # 按 trace id 的低 64 位决定，同一条链路在各服务上的采样结果一致
+        if self.processor is None or self.sample_rate <= 0:
+            return False
+        return int(trace_id[16:], 16) < self.sample_rate * (1 << 64)
+
+    @contextmanager
+    def start_span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        parent: Optional[SpanContext] = None,
+    ) -> Iterator[Span]:
+        """
+        创建 span 并设为当前 span；parent 为空时以当前 span 为父节点，没有当前 span 时开始新链路
+        """
+        if parent is None:
+            current = _current_span.get()
+            parent = current.context if current is not None else None
+        span_id = f"{random.getrandbits(64):016x}"
+        if parent is None:
+            trace_id = f"{random.getrandbits(128):032x}"
+            context = SpanContext(trace_id, span_id, self._should_sample(trace_id))
+            parent_span_id = None
+        else:
+            context = SpanContext(parent.trace_id, span_id, parent.sampled)
+            parent_span_id = parent.span_id
+        span = Span(name, context, parent_span_id, kind)
+        if attributes and context.sampled:
+            span.attributes.update(attributes)
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            if context.sampled and self.processor is not None:
+                self.processor.on_end(span)
+
+    def record_span(
+        self,
+        name: str,
+        start_ns: int,
+        end_ns: int,
+        attributes: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ):
+        """
+        记录一个已结束的子 span，用于跨多次 yield 的操作（如流式生成），不改变当前 span
+        """
+        current = _current_span.get()
+        if current is None or not current.context.sampled or self.processor is None:
+            return
+        context = SpanContext(
+            current.context.trace_id, f"{random.getrandbits(64):016x}", True
+        )
+        span = Span(name, context, current.context.span_id, SPAN_KIND_INTERNAL)
+        span.start_ns = start_ns
+        span.end_ns = end_ns
+        if attributes:
+            span.attributes.update(attributes)
+        if error:
+            span.set_error(error)
+        self.processor.on_end(span)
+
+    def shutdown(self):
+        if self.processor is not None:
+            self.processor.shutdown()
+            self.processor = None
+
+
+tracer = Tracer()
+
+
+def init_tracing(
+    sample_rate: float,
+    exporter: str,
+    otlp_endpoint: str,
+    file_path: str,
+    service_name: str,
+    max_queue_size: int = 10000,
+    batch_size: int = 512,
+    interval: float = 5.0,
+):
+    """
+    配置全局 tracer，exporter 为 otlp、file 或 none
+    """
+    tracer.shutdown()
+    if exporter == "otlp":
+        span_exporter = OtlpHttpSpanExporter(otlp_endpoint, service_name)
+    elif exporter == "file":
+        span_exporter = FileSpanExporter(file_path)
+    else:
+        tracer.sample_rate = 0.0
+        return
+    tracer.sample_rate = sample_rate
+    tracer.processor = BatchSpanProcessor(
+        span_exporter,
+        max_queue_size=max_queue_size,
+        batch_size=batch_size,
+        interval=interval,
+    )
+    log.info(
+        f"init tracing, exporter: {exporter}, sample rate: {sample_rate}, pid: {os.getpid()}"
+    )
@@ -0,0 +1,115 @@
+# app/utils/tracing_test.py
+import asyncio
+import json
+import os
+import sys
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, project_root)
+
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from app.middleware.tracing import TracingMiddleware
+from app.utils import tracing
+from app.utils.tracing import (
+    BatchSpanProcessor,
+    FileSpanExporter,
+    Tracer,
+    format_traceparent,
+    parse_traceparent,
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+    def shutdown(self):
+        pass
+
+
+def test_traceparent_round_trip():
+    context = parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01")
+    assert (context.trace_id, context.span_id, context.sampled) == (
+        TRACE_ID,
+        PARENT_ID,
+        True,
+    )
+    assert format_traceparent(context) == f"00-{TRACE_ID}-{PARENT_ID}-01"
+    assert not parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00").sampled
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(f"00-{'0' * 32}-{PARENT_ID}-01") is None
+
+
+def test_span_tree_across_threads_and_sampling():
+    exporter = ListExporter()
+    tracer = Tracer(sample_rate=1.0, processor=BatchSpanProcessor(exporter))
+
+    def search():
+        with tracer.start_span("milvus"):
+            pass
+
+    async def handle():
+        with tracer.start_span("request") as root:
+            with tracer.start_span("embedding", {"embedding.count": 3}):
+                pass
+            await asyncio.to_thread(search)
+            return root
+
+    root = asyncio.run(handle())
+    tracer.shutdown()
+    spans = {span.name: span for span in exporter.spans}
+    assert set(spans) == {"request", "embedding", "milvus"}
+    assert spans["embedding"].parent_span_id == root.context.span_id
+    # asyncio.to_thread 中的 span 同样挂在当前请求下
+    assert spans["milvus"].parent_span_id == root.context.span_id
+    assert spans["embedding"].context.trace_id == root.context.trace_id
+    assert spans["embedding"].attributes == {"embedding.count": 3}
+
+    # 未采样的链路不导出，子 span 沿用父节点的采样结果
+    exporter = ListExporter()
+    tracer = Tracer(sample_rate=0.0, processor=BatchSpanProcessor(exporter))
+    with tracer.start_span("request") as span:
+        with tracer.start_span("child") as child:
+            child.set_attribute("ignored", 1)
+    tracer.shutdown()
+    assert exporter.spans == []
+    assert not span.recording and child.attributes == {}
+
+
+def test_middleware_continues_incoming_trace(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.tracer.processor = BatchSpanProcessor(FileSpanExporter(str(path)))
+    tracing.tracer.sample_rate = 0.0
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        with tracing.tracer.start_span("lookup"):
+            return {"id": item_id}
+
+    app.add_middleware(TracingMiddleware)
+    try:
+        response = TestClient(app).get(
+            "/items/1", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"}
+        )
+    finally:
+        tracing.tracer.shutdown()
+
+    assert response.headers["traceresponse"].startswith(f"00-{TRACE_ID}-")
+    spans = {
+        span["name"]: span for span in map(json.loads, path.read_text().splitlines())
+    }
+    server = spans["GET /items/{item_id}"]
+    assert server["parent_span_id"] == PARENT_ID
+    assert server["attributes"]["http.status_code"] == 200
+    assert spans["lookup"]["parent_span_id"] == server["span_id"]
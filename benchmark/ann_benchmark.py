@@ -0,0 +1,345 @@
+# benchmark/ann_benchmark.py
+"""
+ANN 索引参数基准测试：对比不同索引类型和 ef / nprobe 下的 recall@k 与延迟
+
+recall@k 以暴力检索的结果为准。查询集不参与建库：
+- --synthetic：生成聚类分布的随机向量建库，查询向量从同一分布另外生成
+- --queries：从 .npy 文件读取查询向量
+- 否则从集合中抽样向量作为查询，检索结果和暴力检索结果中都排除查询自身（留一法）
+
+示例：
+    python -m benchmark.ann_benchmark --uri ./bench.db --synthetic 100000 --dim 768 \\
+        --index-types HNSW,IVF_FLAT,IVF_SQ8 --ef 16,32,64,128 --nprobe 4,16,64
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+from pymilvus import DataType, MilvusClient
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from config.setting import (
+    MILVUS_INDEX_PARAMS,
+    MILVUS_SEARCH_PARAMS,
+    MILVUS_SIMILARITY_METRIC,
+)
+
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def percentile(values: List[float], percent: float) -> float:
+    return float(np.percentile(values, percent)) if values else 0.0
+
+
+def synthetic_vectors(
+    rng: np.random.Generator, centers: np.ndarray, count: int
+) -> np.ndarray:
+    """
+    生成围绕若干中心分布的向量，比均匀随机向量更接近真实 embedding
+    """
+    labels = rng.integers(0, len(centers), size=count)
+    noise = rng.standard_normal((count, centers.shape[1])).astype(np.float32)
+    return centers[labels] + 0.3 * noise
+
+
+def create_synthetic_collection(
+    client: MilvusClient,
+    collection: str,
+    embedding_field: str,
+    vectors: np.ndarray,
+    metric: str,
+    index_type: str,
+    batch_size: int = 1000,
+):
+    if client.has_collection(collection):
+        client.drop_collection(collection)
+    schema = client.create_schema(auto_id=False)
+    schema.add_field("id", DataType.VARCHAR, max_length=64, is_primary=True)
+    schema.add_field(embedding_field, DataType.FLOAT_VECTOR, dim=vectors.shape[1])
+    client.create_collection(collection, schema=schema)
+    for start in range(0, len(vectors), batch_size):
+        client.insert(
+            collection,
+            [
+                {"id": str(start + i), embedding_field: vector.tolist()}
+                for i, vector in enumerate(vectors[start : start + batch_size])
+            ],
+        )
+    build_index(client, collection, embedding_field, metric, index_type)
+
+
+def build_index(
+    client: MilvusClient,
+    collection: str,
+    embedding_field: str,
+    metric: str,
+    index_type: str,
+):
+    """
+    删除集合上已有的向量索引，按配置重新建立并加载
+    """
+    client.release_collection(collection)
+    for index_name in client.list_indexes(collection, field_name=embedding_field):
+        client.drop_index(collection, index_name)
+    index_params = client.prepare_index_params()
+    index_params.add_index(
+        field_name=embedding_field,
+        index_type=index_type,
+        metric_type=metric,
+        params=MILVUS_INDEX_PARAMS.get(index_type, {}),
+    )
+    start_time = time.time()
+    client.create_index(collection, index_params)
+    client.load_collection(collection)
+    print(f"built {index_type} index in {time.time() - start_time:.1f} s")
+
+
+def load_vectors(
+    client: MilvusClient, collection: str, embedding_field: str, batch_size: int
+):
+    ids, vectors = [], []
+    iterator = client.query_iterator(
+        collection_name=collection,
+        batch_size=batch_size,
+        filter="",
+        output_fields=[embedding_field],
+    )
+    try:
+        while True:
+            rows = iterator.next()
+            if not rows:
+                break
+            for row in rows:
+                ids.append(str(row["id"]))
+                vectors.append(row[embedding_field])
+    finally:
+        iterator.close()
+    return ids, np.asarray(vectors, dtype=np.float32)
+
+
+def brute_force_topk(
+    data: np.ndarray,
+    queries: np.ndarray,
+    top_k: int,
+    metric: str,
+    exclude: Optional[List[int]] = None,
+    chunk_size: int = 50000,
+) -> np.ndarray:
+    """
+    暴力检索每个查询的 top_k 行号，按数据分块计算以限制内存
+    """
+    if metric == "COSINE":
+        data = data / np.maximum(np.linalg.norm(data, axis=1, keepdims=True), 1e-12)
+        queries = queries / np.maximum(
+            np.linalg.norm(queries, axis=1, keepdims=True), 1e-12
+        )
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+    for start in range(0, len(data), chunk_size):
+        chunk = data[start : start + chunk_size]
+        if metric == "L2":
+            # 距离越小越相似，取负数后统一按分数从大到小
+            scores = -(
+                (queries**2).sum(axis=1, keepdims=True)
+                - 2 * queries @ chunk.T
+                + (chunk**2).sum(axis=1)
+            )
+        else:
+            scores = queries @ chunk.T
+        if exclude is not None:
+            for query_index, row in enumerate(exclude):
+                if start <= row < start + len(chunk):
+                    scores[query_index, row - start] = -np.inf
+        # 先取分块内的 top_k，再与之前的结果合并
+        keep = min(top_k, len(chunk))
+        top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+        best_scores = np.concatenate(
+            [best_scores, np.take_along_axis(scores, top, axis=1)], axis=1
+        )
+        best_rows = np.concatenate([best_rows, top + start], axis=1)
+        keep = min(top_k, best_scores.shape[1])
+        top = np.argpartition(-best_scores, keep - 1, axis=1)[:, :keep]
+        best_scores = np.take_along_axis(best_scores, top, axis=1)
+        best_rows = np.take_along_axis(best_rows, top, axis=1)
+    return best_rows
+
+
+def run_sweep(
+    client: MilvusClient,
+    collection: str,
+    embedding_field: str,
+    metric: str,
+    queries: np.ndarray,
+    ground_truth: List[Set[str]],
+    top_k: int,
+    search_params: Dict[str, Any],
+    exclude_ids: Optional[List[str]],
+    warmup: int,
+) -> Dict[str, Any]:
+    limit = top_k + 1 if exclude_ids else top_k
+    latencies, recalls = [], []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        result = client.search(
+            collection,
+            data=[query.tolist()],
+            limit=limit,
+            anns_field=embedding_field,
+            search_params={"metric_type": metric, "params": search_params},
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        if i >= warmup:
+            latencies.append(elapsed)
+        found = [str(hit["id"]) for hit in result[0]]
+        if exclude_ids:
+            found = [hit for hit in found if hit != exclude_ids[i]]
+        recalls.append(len(set(found[:top_k]) & ground_truth[i]) / top_k)
+    return {
+        "recall": round(float(np.mean(recalls)), 4),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "qps": round(1000 / np.mean(latencies), 1) if latencies else 0.0,
+    }
+
+
+def sweep_params(index_type: str, args) -> List[Dict[str, Any]]:
+    """
+    当前索引类型需要对比的检索参数组合
+    """
+    defaults = dict(MILVUS_SEARCH_PARAMS.get(index_type, {}))
+    if index_type.startswith("HNSW"):
+        return [{**defaults, "ef": max(ef, args.top_k)} for ef in args.ef]
+    if index_type.startswith("IVF"):
+        return [{**defaults, "nprobe": nprobe} for nprobe in args.nprobe]
+    return [defaults]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN recall/latency benchmark")
+    parser.add_argument("--uri", type=str, default="./milvus_benchmark.db")
+    parser.add_argument("--token", type=str, default="")
+    parser.add_argument("--collection", type=str, default="ann_benchmark")
+    parser.add_argument("--embedding-field", type=str, default="embedding")
+    parser.add_argument("--metric", type=str, default=MILVUS_SIMILARITY_METRIC)
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=0,
+        help="Create the collection with N synthetic vectors (drops it first)",
+    )
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=str, default=None, help="Query .npy file")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument(
+        "--index-types",
+        type=str,
+        default=None,
+        help="Rebuild the index with each type in turn, e.g. HNSW,IVF_FLAT",
+    )
+    parser.add_argument("--ef", type=parse_int_list, default=[16, 32, 64, 128, 256])
+    parser.add_argument("--nprobe", type=parse_int_list, default=[1, 4, 16, 64])
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, default=None, help="Write JSON report")
+    args = parser.parse_args()
+
+    metric = args.metric.upper()
+    index_types = (
+        [index_type.upper() for index_type in args.index_types.split(",")]
+        if args.index_types
+        else []
+    )
+    rng = np.random.default_rng(args.seed)
+    client = MilvusClient(uri=args.uri, token=args.token)
+
+    queries: Optional[np.ndarray] = None
+    if args.synthetic:
+        centers = rng.standard_normal((64, args.dim)).astype(np.float32)
+        vectors = synthetic_vectors(rng, centers, args.synthetic)
+        queries = synthetic_vectors(rng, centers, args.num_queries)
+        create_synthetic_collection(
+            client,
+            args.collection,
+            args.embedding_field,
+            vectors,
+            metric,
+            index_types[0] if index_types else "HNSW",
+            args.batch_size,
+        )
+        del vectors
+
+    ids, data = load_vectors(
+        client, args.collection, args.embedding_field, args.batch_size
+    )
+    print(f"loaded {len(ids)} vectors from {args.collection}")
+
+    exclude_rows = None
+    exclude_ids = None
+    if queries is None and args.queries:
+        queries = np.load(args.queries).astype(np.float32)
+    if queries is None:
+        # 留一法：抽样集合中的向量作为查询，并排除查询自身
+        exclude_rows = rng.choice(
+            len(ids), size=min(args.num_queries, len(ids)), replace=False
+        ).tolist()
+        exclude_ids = [ids[row] for row in exclude_rows]
+        queries = data[exclude_rows]
+
+    truth_rows = brute_force_topk(data, queries, args.top_k, metric, exclude_rows)
+    ground_truth = [{ids[row] for row in rows} for rows in truth_rows]
+    del data
+
+    if not index_types:
+        index = client.describe_index(args.collection, args.embedding_field)
+        index_types = [index["index_type"]]
+
+    report = []
+    print(
+        f"{'index':<10}{'params':<34}{'recall@' + str(args.top_k):>10}"
+        f"{'p50 ms':>10}{'p99 ms':>10}{'qps':>10}"
+    )
+    for i, index_type in enumerate(index_types):
+        # 合成数据建库时已建好第一个索引
+        if args.index_types and not (args.synthetic and i == 0):
+            build_index(
+                client, args.collection, args.embedding_field, metric, index_type
+            )
+        for search_params in sweep_params(index_type, args):
+            stats = run_sweep(
+                client,
+                args.collection,
+                args.embedding_field,
+                metric,
+                queries,
+                ground_truth,
+                args.top_k,
+                search_params,
+                exclude_ids,
+                args.warmup,
+            )
+            report.append({"index_type": index_type, "params": search_params, **stats})
+            print(
+                f"{index_type:<10}{json.dumps(search_params):<34}{stats['recall']:>10}"
+                f"{stats['p50_ms']:>10}{stats['p99_ms']:>10}{stats['qps']:>10}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# benchmark/fake_ollama.py
+"""
+本地模拟的 Ollama 服务，用于压测和本地调试，不需要 GPU
+
+- /api/embed、/api/embeddings：按文本的词哈希生成确定性的向量，相同文本得到相同向量，
+  有相同词的文本向量相近，检索结果有意义
+- /api/chat、/api/generate：按固定速度流式返回 token，最后一个分片带 eval_count
+- 各接口的延迟可配置，用来模拟真实模型的耗时
+
+示例：
+    python -m benchmark.fake_ollama --port 11435 --dim 768 --embed-latency-ms 20
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+ANSWER = (
+    "This is a simulated answer from the fake Ollama server, "
+    "generated at a fixed speed for load testing."
+).split()
+
+
+def fake_embedding(text: str, dim: int) -> List[float]:
+    """
+    词哈希向量：每个词按哈希值映射到若干维度并累加，再归一化
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    words = _WORD_PATTERN.findall(text.lower()) or [text]
+    for word in words:
+        digest = hashlib.sha256(word.encode("utf-8")).digest()
+        rng = np.random.default_rng(int.from_bytes(digest[:8], "little"))
+        vector[rng.integers(0, dim, size=8)] += rng.standard_normal(8)
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector.tolist()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def create_app(
+    dim: int = 768,
+    embed_latency_ms: float = 0.0,
+    embed_item_latency_ms: float = 0.0,
+    ttft_ms: float = 0.0,
+    token_latency_ms: float = 0.0,
+    max_tokens: int = len(ANSWER),
+) -> FastAPI:
+    """
+    创建模拟 Ollama 的应用
+
+    嵌入延迟 = embed_latency_ms + 条数 * embed_item_latency_ms；
+    生成延迟 = ttft_ms + token 数 * token_latency_ms
+    """
+    app = FastAPI()
+    app.state.stats = {"embed_requests": 0, "embed_inputs": 0, "chat_requests": 0}
+
+    async def embed_delay(count: int):
+        delay = embed_latency_ms + count * embed_item_latency_ms
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+    @app.get("/")
+    async def root():
+        return "Ollama is running"
+
+    @app.get("/api/version")
+    async def version():
+        return {"version": "0.0.0-fake"}
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": []}
+
+    @app.get("/api/stats")
+    async def stats():
+        return app.state.stats
+
+    @app.post("/api/show")
+    async def show(request: Request):
+        body = await request.json()
+        return {
+            "modelfile": "",
+            "parameters": "",
+            "template": "{{ .Prompt }}",
+            "details": {"family": "fake", "format": "gguf"},
+            "model_info": {
+                "general.architecture": "fake",
+                "fake.context_length": 4096,
+                "fake.embedding_length": dim,
+            },
+            "model": body.get("model") or body.get("name"),
+        }
+
+    @app.post("/api/embed")
+    async def embed(request: Request):
+        body = await request.json()
+        inputs = body.get("input") or []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        app.state.stats["embed_requests"] += 1
+        app.state.stats["embed_inputs"] += len(inputs)
+        start_time = time.perf_counter()
+        await embed_delay(len(inputs))
+        return {
+            "model": body.get("model"),
+            "embeddings": [fake_embedding(text, dim) for text in inputs],
+            "total_duration": int((time.perf_counter() - start_time) * 1e9),
+            "prompt_eval_count": len(inputs),
+        }
+
+    @app.post("/api/embeddings")
+    async def embeddings(request: Request):
+        # 旧版单条接口
+        body = await request.json()
+        app.state.stats["embed_requests"] += 1
+        app.state.stats["embed_inputs"] += 1
+        await embed_delay(1)
+        return {"embedding": fake_embedding(body.get("prompt", ""), dim)}
+
+    async def generate_chunks(model: str, chat: bool):
+        start_time = time.perf_counter()
+        if ttft_ms > 0:
+            await asyncio.sleep(ttft_ms / 1000)
+        words = ANSWER[:max_tokens]
+        for i, word in enumerate(words):
+            if i and token_latency_ms > 0:
+                await asyncio.sleep(token_latency_ms / 1000)
+            content = word if i == 0 else " " + word
+            chunk: Dict[str, Any] = {
+                "model": model,
+                "created_at": _now(),
+                "done": False,
+            }
+            if chat:
+                chunk["message"] = {"role": "assistant", "content": content}
+            else:
+                chunk["response"] = content
+            yield chunk
+        duration = int((time.perf_counter() - start_time) * 1e9)
+        final: Dict[str, Any] = {
+            "model": model,
+            "created_at": _now(),
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": duration,
+            "eval_count": len(words),
+            "eval_duration": duration,
+            "prompt_eval_count": 1,
+        }
+        if chat:
+            final["message"] = {"role": "assistant", "content": ""}
+        else:
+            final["response"] = ""
+        yield final
+
+    async def generate_response(body: Dict[str, Any], chat: bool):
+        app.state.stats["chat_requests"] += 1
+        model = body.get("model", "fake")
+        if body.get("stream", True):
+
+            async def ndjson():
+                async for chunk in generate_chunks(model, chat):
+                    yield json.dumps(chunk) + "\n"
+
+            return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+        content = ""
+        final: Dict[str, Any] = {}
+        async for chunk in generate_chunks(model, chat):
+            content += chunk["message"]["content"] if chat else chunk["response"]
+            final = chunk
+        if chat:
+            final["message"] = {"role": "assistant", "content": content}
+        else:
+            final["response"] = content
+        return JSONResponse(final)
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        return await generate_response(await request.json(), chat=True)
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        return await generate_response(await request.json(), chat=False)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0)
+    parser.add_argument("--embed-item-latency-ms", type=float, default=0.0)
+    parser.add_argument("--ttft-ms", type=float, default=0.0)
+    parser.add_argument("--token-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    app = create_app(
+        dim=args.dim,
+        embed_latency_ms=args.embed_latency_ms,
+        embed_item_latency_ms=args.embed_item_latency_ms,
+        ttft_ms=args.ttft_ms,
+        token_latency_ms=args.token_latency_ms,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
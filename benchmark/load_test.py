@@ -0,0 +1,435 @@
+# benchmark/load_test.py
+"""
+压测工具：按 JSONL 文件中记录的请求重放流量，统计各接口的吞吐、延迟分位数和错误率
+
+默认在本地启动替身服务，不需要 GPU 和真实集群：
+- benchmark.fake_ollama 模拟 Ollama（确定性的嵌入向量、可配置延迟）
+- Milvus Lite 使用本地 .db 文件；本地文件只能被一个进程打开，多 worker 压测需要用
+  --milvus-uri 指定 Milvus 服务
+- 应用通过 LAMA_RAG_ETCD_CONFIG 环境变量读取配置，不访问 etcd
+指定 --target 时直接压测已经运行的服务。
+
+请求文件每行一个 JSON：
+    {"method": "POST", "path": "/api/milvus/search", "json": {"query_text": "..."}}
+可选字段：name（统计分组名，默认 "METHOD path"）、phase（"setup" 表示只在压测前顺序执行一次）。
+只有 title / body 字段的记录（如需求列表）会转换为一次写入（setup）和一次以 title 为查询的检索。
+
+示例：
+    python -m benchmark.load_test --concurrency 16 --duration 30
+    python -m benchmark.load_test --rate 50 --duration 60 --embed-latency-ms 20
+    python -m benchmark.load_test --concurrency 32 --workers 4 \\
+        --milvus-uri http://127.0.0.1:19530
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+import yaml
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from app.serives.milvus_manager import is_milvus_lite
+from app.utils.metrics import init_multiprocess_dir
+from app.utils.shared_generation import init_generation_dir
+from config.setting import ETCD_CONFIG_ENV
+
+DEFAULT_REQUESTS_FILE = os.path.join(current_dir, "load_requests.jsonl")
+
+
+def load_records(path: str) -> List[Dict[str, Any]]:
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "path" in record:
+                records.append(record)
+                continue
+            # 需求列表格式：正文入库，标题作为检索问题
+            text = f"{record.get('title', '')}\n\n{record.get('body', '')}".strip()
+            records.append(
+                {
+                    "phase": "setup",
+                    "method": "POST",
+                    "path": "/api/milvus/add",
+                    "json": {"text": text, "metadata": {"source": path}},
+                }
+            )
+            records.append(
+                {
+                    "method": "POST",
+                    "path": "/api/milvus/search",
+                    "json": {"query_text": record.get("title") or text, "top_k": 5},
+                }
+            )
+    for record in records:
+        record.setdefault("method", "GET")
+        record.setdefault("name", f"{record['method'].upper()} {record['path']}")
+    return records
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.status_counts: Dict[str, int] = {}
+
+    def record(self, latency_ms: float, status: str, failed: bool):
+        self.latencies.append(latency_ms)
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        if failed:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        count = len(self.latencies)
+        latencies = np.asarray(self.latencies) if count else np.zeros(1)
+        return {
+            "requests": count,
+            "throughput": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+            "status": self.status_counts,
+        }
+
+
+async def send(
+    client: httpx.AsyncClient,
+    record: Dict[str, Any],
+    stats: Optional[Dict[str, EndpointStats]],
+):
+    """
+    发送一条请求并读完响应体（流式接口按读完最后一个分片计时）
+    """
+    start = time.perf_counter()
+    try:
+        async with client.stream(
+            record["method"].upper(), record["path"], json=record.get("json")
+        ) as response:
+            async for _ in response.aiter_bytes():
+                pass
+        status = str(response.status_code)
+        failed = response.status_code >= 400
+    except Exception as e:
+        status = type(e).__name__
+        failed = True
+    if stats is not None:
+        latency_ms = (time.perf_counter() - start) * 1000
+        stats.setdefault(record["name"], EndpointStats()).record(
+            latency_ms, status, failed
+        )
+
+
+async def run_load(
+    base_url: str,
+    records: List[Dict[str, Any]],
+    concurrency: int,
+    rate: Optional[float],
+    duration: float,
+    max_requests: Optional[int],
+    timeout: float,
+) -> Dict[str, Any]:
+    setup = [record for record in records if record.get("phase") == "setup"]
+    workload = [record for record in records if record.get("phase") != "setup"]
+    if not workload:
+        raise ValueError("No requests to replay")
+
+    limits = httpx.Limits(max_connections=max(concurrency, 1) * 2)
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=timeout, limits=limits
+    ) as client:
+        setup_stats: Dict[str, EndpointStats] = {}
+        for record in setup:
+            await send(client, record, setup_stats)
+        for name, endpoint_stats in setup_stats.items():
+            if endpoint_stats.errors:
+                print(f"setup: {endpoint_stats.errors} of {name} failed")
+
+        stats: Dict[str, EndpointStats] = {}
+        # 按文件顺序循环重放
+        requests_iter = itertools.cycle(workload)
+        if max_requests:
+            requests_iter = itertools.islice(requests_iter, max_requests)
+        deadline = time.perf_counter() + duration
+        start = time.perf_counter()
+
+        if rate:
+            # 开环：按固定速率发出请求，不等待前面的请求完成，同时在途的请求数不超过 concurrency
+            semaphore = asyncio.Semaphore(concurrency)
+            tasks = set()
+
+            async def send_limited(record):
+                try:
+                    await send(client, record, stats)
+                finally:
+                    semaphore.release()
+
+            interval = 1.0 / rate
+            next_time = start
+            for record in requests_iter:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                if next_time > now:
+                    await asyncio.sleep(next_time - now)
+                next_time += interval
+                await semaphore.acquire()
+                task = asyncio.create_task(send_limited(record))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        else:
+            # 闭环：concurrency 个客户端各自收到响应后立即发下一个请求
+            async def worker():
+                while time.perf_counter() < deadline:
+                    record = next(requests_iter, None)
+                    if record is None:
+                        return
+                    await send(client, record, stats)
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+        elapsed = time.perf_counter() - start
+
+    total = EndpointStats()
+    for endpoint_stats in stats.values():
+        total.latencies.extend(endpoint_stats.latencies)
+        total.errors += endpoint_stats.errors
+        for status, count in endpoint_stats.status_counts.items():
+            total.status_counts[status] = total.status_counts.get(status, 0) + count
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "endpoints": {
+            name: endpoint_stats.summary(elapsed)
+            for name, endpoint_stats in sorted(stats.items())
+        },
+        "total": total.summary(elapsed),
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print(
+        f"{'endpoint':<36}{'requests':>10}{'req/s':>10}{'errors':>8}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    )
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["total"])]
+    for name, summary in rows:
+        print(
+            f"{name:<36}{summary['requests']:>10}{summary['throughput']:>10}"
+            f"{summary['error_rate']:>8.2%}{summary['p50_ms']:>10}"
+            f"{summary['p95_ms']:>10}{summary['p99_ms']:>10}"
+        )
+    print(f"elapsed: {report['elapsed_s']} s")
+
+
+def build_config(args, ollama_url: str) -> Dict[str, Any]:
+    """
+    以 config/project-dev.yml 为模板，Ollama 指向替身服务，Milvus 默认使用 Milvus Lite
+    """
+    with open(os.path.join(project_root, "config", "project-dev.yml")) as f:
+        config = yaml.safe_load(f)
+    config["application"]["webHost"] = args.host
+    config["application"]["webPort"] = args.port
+    config["ollama"]["url"] = ollama_url
+    config["milvus"]["uri"] = (
+        os.path.abspath(args.milvus_uri)
+        if is_milvus_lite(args.milvus_uri)
+        else args.milvus_uri
+    )
+    config["milvus"]["collectionName"] = args.collection
+    config["milvus"]["dim"] = args.dim
+    return config
+
+
+def wait_for(url: str, timeout: float, process: subprocess.Popen):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{url} not ready after {timeout} s")
+
+
+def start_stand_ins(args) -> List[subprocess.Popen]:
+    if is_milvus_lite(args.milvus_uri):
+        if args.workers > 1:
+            raise ValueError(
+                f"Milvus Lite file {args.milvus_uri} can only be opened by one worker, "
+                f"use --milvus-uri of a Milvus server to run {args.workers} workers"
+            )
+        os.makedirs(os.path.dirname(os.path.abspath(args.milvus_uri)), exist_ok=True)
+    processes = []
+    try:
+        ollama_url = args.ollama_url
+        if not ollama_url:
+            ollama_url = f"http://127.0.0.1:{args.ollama_port}"
+            fake_ollama = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmark.fake_ollama",
+                    "--port",
+                    str(args.ollama_port),
+                    "--dim",
+                    str(args.dim),
+                    "--embed-latency-ms",
+                    str(args.embed_latency_ms),
+                    "--embed-item-latency-ms",
+                    str(args.embed_item_latency_ms),
+                    "--ttft-ms",
+                    str(args.ttft_ms),
+                    "--token-latency-ms",
+                    str(args.token_latency_ms),
+                ],
+                cwd=project_root,
+            )
+            processes.append(fake_ollama)
+            wait_for(ollama_url, 30, fake_ollama)
+
+        if args.workers > 1:
+            # 与 main.py 相同：/metrics 汇总所有 worker 的指标，写入通过共享代数通知其它 worker
+            init_multiprocess_dir(
+                os.path.join(project_root, "cache", "loadtest_prometheus")
+            )
+            init_generation_dir(
+                os.path.join(project_root, "cache", "loadtest_generations")
+            )
+        env = dict(os.environ)
+        env[ETCD_CONFIG_ENV] = json.dumps(
+            {
+                "host": "",
+                "port": 0,
+                "prefix": "",
+                "config": build_config(args, ollama_url),
+            }
+        )
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "main:app",
+                "--host",
+                args.host,
+                "--port",
+                str(args.port),
+                "--workers",
+                str(args.workers),
+                "--log-level",
+                "warning",
+            ],
+            cwd=project_root,
+            env=env,
+            stdout=None if args.server_logs else subprocess.DEVNULL,
+            stderr=None if args.server_logs else subprocess.DEVNULL,
+        )
+        processes.append(server)
+        wait_for(
+            f"http://{args.host}:{args.port}/health/ready", args.ready_timeout, server
+        )
+    except BaseException:
+        # 启动失败时停止已启动的替身服务
+        stop_processes(processes)
+        raise
+    return processes
+
+
+def stop_processes(processes: List[subprocess.Popen]):
+    for process in reversed(processes):
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded requests")
+    parser.add_argument("--requests", type=str, default=DEFAULT_REQUESTS_FILE)
+    parser.add_argument(
+        "--target", type=str, default=None, help="Existing server, skip stand-ins"
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--rate", type=float, default=None, help="Requests per second (open loop)"
+    )
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--max-requests", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", type=str, default=None, help="Write JSON report")
+    # 本地替身服务
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--ollama-url", type=str, default=None, help="Use this Ollama instead"
+    )
+    parser.add_argument("--ollama-port", type=int, default=11435)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0)
+    parser.add_argument("--embed-item-latency-ms", type=float, default=0.0)
+    parser.add_argument("--ttft-ms", type=float, default=0.0)
+    parser.add_argument("--token-latency-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--milvus-uri",
+        type=str,
+        default="./cache/milvus_loadtest.db",
+        help="Milvus Lite file, or a Milvus server uri (required for --workers > 1)",
+    )
+    parser.add_argument("--collection", type=str, default="load_test")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    parser.add_argument("--server-logs", action="store_true")
+    args = parser.parse_args()
+
+    records = load_records(args.requests)
+    processes = []
+    try:
+        if args.target:
+            base_url = args.target
+        else:
+            processes = start_stand_ins(args)
+            base_url = f"http://{args.host}:{args.port}"
+        report = asyncio.run(
+            run_load(
+                base_url,
+                records,
+                args.concurrency,
+                args.rate,
+                args.duration,
+                args.max_requests,
+                args.timeout,
+            )
+        )
+    finally:
+        stop_processes(processes)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+# benchmark/quantization_benchmark.py
+"""
+向量压缩存储基准测试：对比半精度向量字段、SQ8 / PQ 等量化索引节省的内存和损失的召回，以及精排能找回多少
+
+每种存储方式（向量字段类型:索引类型）建一个临时集合写入同一批向量，recall@k 以 float32 暴力检索为准：
+- 内存：按向量字段类型和索引参数估算查询节点上每条向量的常驻字节数
+- recall：直接检索 top_k，以及先取 top_k * rerank_factor 个候选、按原始向量精确得分重排后的 top_k
+
+数据来源与 ann_benchmark 相同：--synthetic 生成聚类分布的随机向量，否则读取 --collection 中的向量并抽样留一查询。
+FLOAT16_VECTOR / BFLOAT16_VECTOR 和 IVF_PQ 需要 Milvus 服务端，在 Milvus Lite 上会跳过。
+
+示例：
+    python -m benchmark.quantization_benchmark --uri http://localhost:19530 \\
+        --collection lama_rag_documents --top-k 10 --rerank-factor 4
+    python -m benchmark.quantization_benchmark --uri ./bench.db --synthetic 20000 --dim 768 \\
+        --configs FLOAT_VECTOR:HNSW,FLOAT_VECTOR:HNSW_SQ,FLOAT_VECTOR:IVF_SQ8
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from pymilvus import DataType, MilvusClient
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from app.core.vector_quantization import (
+    FLOAT_VECTOR,
+    bytes_per_vector,
+    decode_vector,
+    encode_vector,
+    exact_scores,
+    rerank_order,
+)
+from benchmark.ann_benchmark import (
+    brute_force_topk,
+    load_vectors,
+    percentile,
+    synthetic_vectors,
+)
+from config.setting import (
+    MILVUS_INDEX_PARAMS,
+    MILVUS_RERANK_FACTOR,
+    MILVUS_SEARCH_PARAMS,
+    MILVUS_SIMILARITY_METRIC,
+)
+
+DEFAULT_CONFIGS = (
+    "FLOAT_VECTOR:HNSW,FLOAT16_VECTOR:HNSW,BFLOAT16_VECTOR:HNSW,"
+    "FLOAT_VECTOR:HNSW_SQ,FLOAT_VECTOR:IVF_SQ8,FLOAT_VECTOR:IVF_PQ"
+)
+
+
+def parse_configs(value: str) -> List[Tuple[str, str]]:
+    configs = []
+    for item in value.split(","):
+        vector_type, _, index_type = item.upper().partition(":")
+        configs.append((vector_type, index_type or "HNSW"))
+    return configs
+
+
+def index_params_for(index_type: str, dim: int) -> Dict[str, Any]:
+    params = dict(MILVUS_INDEX_PARAMS.get(index_type, {}))
+    # PQ 要求维度能被子空间数整除
+    if index_type == "IVF_PQ" and dim % params.get("m", 1):
+        params["m"] = next(m for m in (32, 16, 8, 4, 2, 1) if dim % m == 0)
+    return params
+
+
+def create_collection(
+    client: MilvusClient,
+    collection: str,
+    vectors: np.ndarray,
+    vector_type: str,
+    index_type: str,
+    index_params: Dict[str, Any],
+    metric: str,
+    batch_size: int,
+):
+    if client.has_collection(collection):
+        client.drop_collection(collection)
+    schema = client.create_schema(auto_id=False)
+    schema.add_field("id", DataType.VARCHAR, max_length=64, is_primary=True)
+    schema.add_field("embedding", getattr(DataType, vector_type), dim=vectors.shape[1])
+    client.create_collection(collection, schema=schema)
+    for start in range(0, len(vectors), batch_size):
+        client.insert(
+            collection,
+            [
+                {"id": str(start + i), "embedding": vector.tolist()}
+                for i, vector in enumerate(vectors[start : start + batch_size])
+            ],
+        )
+    client.flush(collection)
+    prepared = client.prepare_index_params()
+    prepared.add_index(
+        field_name="embedding",
+        index_type=index_type,
+        metric_type=metric,
+        params=index_params,
+    )
+    client.create_index(collection, prepared)
+    client.load_collection(collection)
+
+
+def search_ids(
+    client: MilvusClient,
+    collection: str,
+    query: np.ndarray,
+    limit: int,
+    vector_type: str,
+    metric: str,
+    search_params: Dict[str, Any],
+) -> List[str]:
+    params = dict(search_params)
+    if "ef" in params:
+        params["ef"] = max(params["ef"], limit)
+    result = client.search(
+        collection,
+        data=[encode_vector(query.tolist(), vector_type)],
+        limit=limit,
+        anns_field="embedding",
+        search_params={"metric_type": metric, "params": params},
+    )
+    return [str(hit["id"]) for hit in result[0]]
+
+
+def rerank_ids(
+    client: MilvusClient,
+    collection: str,
+    query: np.ndarray,
+    candidate_ids: List[str],
+    top_k: int,
+    vector_type: str,
+    metric: str,
+) -> List[str]:
+    """
+    与 CustomTimedMilvusVectorStore.rerank 相同：取回候选的原始向量，按精确得分重排
+    """
+    rows = client.get(collection, ids=candidate_ids, output_fields=["embedding"])
+    vectors_by_id = {
+        str(row["id"]): decode_vector(row["embedding"], vector_type) for row in rows
+    }
+    kept = [node_id for node_id in candidate_ids if node_id in vectors_by_id]
+    if not kept:
+        return []
+    scores = exact_scores(
+        query, np.stack([vectors_by_id[node_id] for node_id in kept]), metric
+    )
+    return [kept[i] for i in rerank_order(scores, metric, top_k)]
+
+
+def evaluate(
+    client: MilvusClient,
+    collection: str,
+    queries: np.ndarray,
+    ground_truth: List[Set[str]],
+    exclude_ids: Optional[List[str]],
+    top_k: int,
+    rerank_factor: int,
+    vector_type: str,
+    metric: str,
+    search_params: Dict[str, Any],
+    warmup: int,
+) -> Dict[str, Any]:
+    # 留一法查询多取一个结果，去掉查询自身
+    extra = 1 if exclude_ids else 0
+    recalls, rerank_recalls = [], []
+    latencies, rerank_latencies = [], []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        found = search_ids(
+            client, collection, query, top_k + extra, vector_type, metric, search_params
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        candidates = search_ids(
+            client,
+            collection,
+            query,
+            top_k * rerank_factor + extra,
+            vector_type,
+            metric,
+            search_params,
+        )
+        if exclude_ids:
+            candidates = [hit for hit in candidates if hit != exclude_ids[i]]
+        reranked = rerank_ids(
+            client, collection, query, candidates, top_k, vector_type, metric
+        )
+        rerank_elapsed = (time.perf_counter() - start) * 1000
+
+        if i >= warmup:
+            latencies.append(elapsed)
+            rerank_latencies.append(rerank_elapsed)
+        if exclude_ids:
+            found = [hit for hit in found if hit != exclude_ids[i]]
+        recalls.append(len(set(found[:top_k]) & ground_truth[i]) / top_k)
+        rerank_recalls.append(len(set(reranked) & ground_truth[i]) / top_k)
+    return {
+        "recall": round(float(np.mean(recalls)), 4),
+        "rerank_recall": round(float(np.mean(rerank_recalls)), 4),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "rerank_p50_ms": round(percentile(rerank_latencies, 50), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Quantized vector storage memory/recall benchmark"
+    )
+    parser.add_argument("--uri", type=str, default="./milvus_benchmark.db")
+    parser.add_argument("--token", type=str, default="")
+    parser.add_argument(
+        "--collection",
+        type=str,
+        default="ann_benchmark",
+        help="Source collection to read vectors from (ignored with --synthetic)",
+    )
+    parser.add_argument("--embedding-field", type=str, default="embedding")
+    parser.add_argument("--metric", type=str, default=MILVUS_SIMILARITY_METRIC)
+    parser.add_argument("--synthetic", type=int, default=0)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rerank-factor", type=int, default=MILVUS_RERANK_FACTOR)
+    parser.add_argument(
+        "--configs",
+        type=str,
+        default=DEFAULT_CONFIGS,
+        help="Comma separated VECTOR_TYPE:INDEX_TYPE pairs",
+    )
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the benchmark collections"
+    )
+    parser.add_argument("--output", type=str, default=None, help="Write JSON report")
+    args = parser.parse_args()
+
+    metric = args.metric.upper()
+    rng = np.random.default_rng(args.seed)
+    client = MilvusClient(uri=args.uri, token=args.token)
+
+    exclude_ids = None
+    if args.synthetic:
+        centers = rng.standard_normal((64, args.dim)).astype(np.float32)
+        data = synthetic_vectors(rng, centers, args.synthetic)
+        ids = [str(i) for i in range(len(data))]
+        queries = synthetic_vectors(rng, centers, args.num_queries)
+        truth_rows = brute_force_topk(data, queries, args.top_k, metric)
+    else:
+        ids, data = load_vectors(
+            client, args.collection, args.embedding_field, args.batch_size
+        )
+        # 留一法：抽样集合中的向量作为查询，并排除查询自身
+        exclude_rows = rng.choice(
+            len(ids), size=min(args.num_queries, len(ids)), replace=False
+        ).tolist()
+        queries = data[exclude_rows]
+        truth_rows = brute_force_topk(data, queries, args.top_k, metric, exclude_rows)
+        # 写入临时集合时行号即 id
+        exclude_ids = [str(row) for row in exclude_rows]
+    ground_truth = [{str(row) for row in rows} for rows in truth_rows]
+    dim = data.shape[1]
+    print(f"{len(ids)} vectors, dim {dim}, {len(queries)} queries, metric {metric}")
+
+    baseline_bytes = bytes_per_vector(
+        dim, FLOAT_VECTOR, "HNSW", MILVUS_INDEX_PARAMS["HNSW"]
+    )
+    report = []
+    print(
+        f"{'vector type':<18}{'index':<10}{'MB':>10}{'saved':>8}"
+        f"{'recall@' + str(args.top_k):>11}{'reranked':>10}{'p50 ms':>9}{'rerank ms':>11}"
+    )
+    for vector_type, index_type in parse_configs(args.configs):
+        collection = f"quant_bench_{vector_type}_{index_type}".lower()
+        index_params = index_params_for(index_type, dim)
+        try:
+            create_collection(
+                client,
+                collection,
+                data,
+                vector_type,
+                index_type,
+                index_params,
+                metric,
+                args.batch_size,
+            )
+        except Exception as e:
+            print(f"{vector_type:<18}{index_type:<10} skipped: {e}")
+            continue
+
+        try:
+            stats = evaluate(
+                client,
+                collection,
+                queries,
+                ground_truth,
+                exclude_ids,
+                args.top_k,
+                args.rerank_factor,
+                vector_type,
+                metric,
+                MILVUS_SEARCH_PARAMS.get(index_type, {}),
+                args.warmup,
+            )
+        finally:
+            if not args.keep:
+                client.drop_collection(collection)
+
+        size = bytes_per_vector(dim, vector_type, index_type, index_params)
+        entry = {
+            "vector_type": vector_type,
+            "index_type": index_type,
+            "index_params": index_params,
+            "bytes_per_vector": size,
+            "memory_mb": round(size * len(ids) / 2**20, 2),
+            "memory_saved": round(1 - size / baseline_bytes, 4),
+            **stats,
+        }
+        report.append(entry)
+        print(
+            f"{vector_type:<18}{index_type:<10}{entry['memory_mb']:>10}"
+            f"{entry['memory_saved']:>8.0%}{stats['recall']:>11}{stats['rerank_recall']:>10}"
+            f"{stats['p50_ms']:>9}{stats['rerank_p50_ms']:>11}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
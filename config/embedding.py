@@ -1,74 +1,73 @@
+from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.embeddings.ollama import OllamaEmbedding
 
-from app.custom.custom_timed_embedding_wrapper import CustomTimedEmbeddingWrapper
-
-
-class EmbeddingManager:
-    _embedding_ollama_omic_embed_text = None
-    _embedding_ollama_bge_large = None
-    _embedding_ollama_bge_m3 = None
-
-    @staticmethod
-    def get_embedding_ollama_omic_embed_text():
-        if EmbeddingManager._embedding_ollama_omic_embed_text is None:
-            EmbeddingManager._embedding_ollama_omic_embed_text = (
-                get_embedding_ollama_nomic_embed_text()
-            )
-        return EmbeddingManager._embedding_ollama_omic_embed_text
-
-    @staticmethod
-    def get_embedding_ollama_bge_large():
-        if EmbeddingManager._embedding_ollama_bge_large is None:
-            EmbeddingManager._embedding_ollama_bge_large = (
-                get_embedding_ollama_bge_large()
-            )
-        return EmbeddingManager._embedding_ollama_bge_large
-
-    @staticmethod
-    def get_embedding_ollama_bge_m3():
-        if EmbeddingManager._embedding_ollama_bge_m3 is None:
-            EmbeddingManager._embedding_ollama_bge_m3 = get_embedding_ollama_bge_m3()
-        return EmbeddingManager._embedding_ollama_bge_m3
-
-
-def get_embedding_ollama_bge_large():
-    # ollama 的 bge-large-en-v1.5 模型
-    from config.etcd_config import ETCD_CONFIG
-
-    ollama_embedding = OllamaEmbedding(
-        model_name="imcurie/bge-large-en-v1.5",
-        base_url=ETCD_CONFIG.ollamaConfig.url,
-        embed_batch_size=100,
+from app.custom.custom_batching_embedding_wrapper import (
+    CustomBatchingEmbeddingWrapper,
+)
+from app.custom.custom_cached_embedding_wrapper import CustomCachedEmbeddingWrapper
+from app.custom.custom_truncated_embedding_wrapper import (
+    CustomTruncatedEmbeddingWrapper,
+)
+from app.serives.ollama_pool import OllamaPoolManager
+from app.utils.embedding_cache import EmbeddingCache
+from config.setting import (
+    EMBEDDING_BATCH_ENABLED,
+    EMBEDDING_BATCH_MAX_SIZE,
+    EMBEDDING_BATCH_MAX_WAIT_MS,
+    EMBEDDING_CACHE_DIR,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_CACHE_MAX_MEMORY_ITEMS,
+    EMBEDDING_MODELS,
+    EMBEDDING_REQUEST_TIMEOUT,
+)
+
+
+def with_embedding_cache(embed: BaseEmbedding) -> BaseEmbedding:
+    # 按 (模型名, 文本哈希) 缓存嵌入向量，命中时不再请求 Ollama
+    if not EMBEDDING_CACHE_ENABLED:
+        return embed
+    cache = EmbeddingCache.get_instance(
+        embed.model_name,
+        cache_dir=EMBEDDING_CACHE_DIR,
+        max_memory_items=EMBEDDING_CACHE_MAX_MEMORY_ITEMS,
     )
+    return CustomCachedEmbeddingWrapper(embed, cache=cache)
 
-    return CustomTimedEmbeddingWrapper(
-        ollama_embedding, message="ollama_bge_large", dim=1024
-    )
 
+def with_embedding_batching(embed: BaseEmbedding) -> BaseEmbedding:
+    # 合并并发的单条异步请求，一次批量调用 Ollama
+    if not EMBEDDING_BATCH_ENABLED:
+        return embed
+    return CustomBatchingEmbeddingWrapper(
+        embed,
+        max_batch_size=EMBEDDING_BATCH_MAX_SIZE,
+        max_wait_ms=EMBEDDING_BATCH_MAX_WAIT_MS,
+    )
 
-def get_embedding_ollama_bge_m3():
-    # ollama embedding model: bge-m3
-    from config.etcd_config import ETCD_CONFIG
 
-    ollama_embedding = OllamaEmbedding(
-        base_url=ETCD_CONFIG.ollamaConfig.url,
-        model_name="bge-m3",
-        embed_batch_size=100,
-    )
-    return CustomTimedEmbeddingWrapper(
-        ollama_embedding, message="ollama bge m3", dim=1024
-    )
+def with_matryoshka_truncation(embed: BaseEmbedding, dim: int) -> BaseEmbedding:
+    # 截断到前 dim 维并重新归一化，只适用于 Matryoshka 训练的模型
+    return CustomTruncatedEmbeddingWrapper(embed, dim=dim)
 
 
-def get_embedding_ollama_nomic_embed_text():
-    # ollama embedding model: nomic-embed-text
+def build_ollama_embedding(model: str) -> OllamaEmbedding:
+    """
+    按 EMBEDDING_MODELS 中的名称创建 Ollama embedding 客户端，同步和异步调用都走 Ollama 共享连接池
+    """
     from config.etcd_config import ETCD_CONFIG
 
+    if model not in EMBEDDING_MODELS:
+        raise ValueError(
+            f"Unknown embedding model: {model}, supported: {list(EMBEDDING_MODELS)}"
+        )
     ollama_embedding = OllamaEmbedding(
+        model_name=EMBEDDING_MODELS[model]["model_name"],
         base_url=ETCD_CONFIG.ollamaConfig.url,
-        model_name="nomic-embed-text",
         embed_batch_size=100,
     )
-    return CustomTimedEmbeddingWrapper(
-        ollama_embedding, message="ollama nomic embed text", dim=1024
+    OllamaPoolManager.attach(
+        ollama_embedding,
+        host=ETCD_CONFIG.ollamaConfig.url,
+        timeout=EMBEDDING_REQUEST_TIMEOUT,
     )
+    return ollama_embedding
@@ -1,13 +1,29 @@
 # 全局变量，用于存储ETCD配置
+import json
+import os
+import threading
+
 from app.utils.etcd_util import ConfigManager
+from app.utils.log import log
 from app.models.config.app_config import AppConfig
+from app.models.config.chunk_config import ChunkConfig
 from app.models.config.es_config import ElasticSearchConfig
-from app.models.config.milvus_config import MilvusConfig
+from app.models.config.milvus_config import CollectionConfig, MilvusConfig
 from app.models.config.minio_config import MinioConfig
 from app.models.config.ollama_config import OllamaConfig
 from app.models.config.postgresql_config import PostgresqlConfig
 
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.setting import (
+    CHUNK_OVERLAP,
+    CHUNK_SIZE,
+    ETCD_CONFIG_CACHE_FILE,
+    ETCD_CONFIG_ENV,
+    ETCD_TIMEOUT,
+    ETCD_WATCH_ENABLED,
+    ETCD_WATCH_RETRY_INTERVAL,
+)
 
 ETCD_CONFIG = None
 
@@ -20,6 +36,7 @@ def parse_app_config(config: dict) -> AppConfig:
         fileSizeLimit=app_config_dict.get("fileSizeLimit"),
         supportedFileTypeList=app_config_dict.get("supportedFileTypeList"),
         supportedFileSuffixList=app_config_dict.get("supportedFileSuffixList"),
+        workers=app_config_dict.get("workers"),
     )
     return app_config
 
@@ -40,8 +57,22 @@ def parse_milvus_config(config: dict) -> MilvusConfig:
     milvus_config = MilvusConfig(
         host=milvus_config_dict.get("host"),
         port=milvus_config_dict.get("port"),
+        uri=milvus_config_dict.get("uri"),
         collectionName=milvus_config_dict.get("collectionName"),
         dim=milvus_config_dict.get("dim"),
+        indexType=milvus_config_dict.get("indexType"),
+        metricType=milvus_config_dict.get("metricType"),
+        indexParams=milvus_config_dict.get("indexParams"),
+        searchParams=milvus_config_dict.get("searchParams"),
+        vectorType=milvus_config_dict.get("vectorType"),
+        rerank=milvus_config_dict.get("rerank"),
+        rerankFactor=milvus_config_dict.get("rerankFactor"),
+        matryoshka=milvus_config_dict.get("matryoshka"),
+        embeddingModel=milvus_config_dict.get("embeddingModel"),
+        collections=[
+            CollectionConfig(**collection_dict)
+            for collection_dict in milvus_config_dict.get("collections") or []
+        ],
     )
     return milvus_config
 
@@ -80,6 +111,75 @@ def parse_postgresql_config(config: dict) -> PostgresqlConfig:
     return postgresql_config
 
 
+def parse_chunk_config(config: dict) -> ChunkConfig:
+    # chunk 段可选，未配置的项使用 config/setting.py 中的默认值
+    chunk_config_dict = config.get("chunk") or {}
+    chunk_config = ChunkConfig(
+        chunkSize=chunk_config_dict.get("chunkSize", CHUNK_SIZE),
+        chunkOverlap=chunk_config_dict.get("chunkOverlap", CHUNK_OVERLAP),
+    )
+    return chunk_config
+
+
+# 配置段 -> (EtcdConfig 上的属性名, 解析函数)
+CONFIG_SECTIONS = {
+    "application": ("appConfig", parse_app_config),
+    "elasticsearch": ("elasticSearchConfig", parse_es_config),
+    "milvus": ("milvusConfig", parse_milvus_config),
+    "minio": ("minioConfig", parse_minio_config),
+    "ollama": ("ollamaConfig", parse_ollama_config),
+    "postgresql": ("postgresqlConfig", parse_postgresql_config),
+    "chunk": ("chunkConfig", parse_chunk_config),
+}
+
+
+def parse_config(config: dict) -> Dict[str, Any]:
+    """
+    解析全部配置段，任一配置段缺失或不合法时抛出异常
+    """
+    return {section: parse(config) for section, (_, parse) in CONFIG_SECTIONS.items()}
+
+
+def load_cached_config(prefix: str) -> Optional[Tuple[dict, int]]:
+    """
+    读取本地缓存的配置及其 etcd 版本，文件不存在、损坏或不是同一前缀的配置时返回 None
+    """
+    try:
+        with open(ETCD_CONFIG_CACHE_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log.warning(f"Failed to read cached config {ETCD_CONFIG_CACHE_FILE}: {e}")
+        return None
+    if data.get("prefix") != prefix:
+        log.warning(f"Cached config is for {data.get('prefix')}, expected {prefix}")
+        return None
+    return data["config"], data.get("revision", 0)
+
+
+def save_cached_config(prefix: str, config: dict, revision: int):
+    """
+    写入本地缓存，先写临时文件再替换，进程中途退出不会留下不完整的文件；
+    配置中包含密码，文件只允许当前用户读写
+    """
+    tmp_path = f"{ETCD_CONFIG_CACHE_FILE}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(ETCD_CONFIG_CACHE_FILE), exist_ok=True)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(
+                {"prefix": prefix, "revision": revision, "config": config},
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, ETCD_CONFIG_CACHE_FILE)
+    except Exception as e:
+        log.warning(f"Failed to write cached config {ETCD_CONFIG_CACHE_FILE}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
 def init_config(args):
     global ETCD_CONFIG
     ETCD_CONFIG = EtcdConfig(
@@ -90,38 +190,190 @@ def init_config(args):
     ETCD_CONFIG.init_config()
 
 
+def export_config_env():
+    """
+    将已加载的配置写入环境变量，worker 进程启动时直接读取，不再访问 etcd
+    """
+    os.environ[ETCD_CONFIG_ENV] = json.dumps(
+        {
+            "host": ETCD_CONFIG.host,
+            "port": ETCD_CONFIG.port,
+            "prefix": ETCD_CONFIG.prefix,
+            "revision": ETCD_CONFIG.revision,
+            "config": ETCD_CONFIG.config,
+        }
+    )
+
+
+def init_config_from_env() -> bool:
+    """
+    从环境变量加载主进程传入的配置，未设置时返回 False
+    """
+    global ETCD_CONFIG
+    if ETCD_CONFIG is not None:
+        return True
+    config_json = os.environ.get(ETCD_CONFIG_ENV)
+    if not config_json:
+        return False
+    data = json.loads(config_json)
+    ETCD_CONFIG = EtcdConfig(
+        host=data["host"],
+        port=data["port"],
+        prefix=data["prefix"],
+        config=data["config"],
+        revision=data.get("revision", 0),
+    )
+    ETCD_CONFIG.init_config()
+    return True
+
+
+def start_config_watch():
+    """
+    在当前进程 watch etcd 配置，订阅者在配置变化后收到通知
+    """
+    if ETCD_WATCH_ENABLED and ETCD_CONFIG is not None:
+        ETCD_CONFIG.start_watch()
+
+
+def stop_config_watch():
+    if ETCD_CONFIG is not None:
+        ETCD_CONFIG.stop_watch()
+
+
 class EtcdConfig:
+    """
+    进程内的配置快照
+
+    启动时从 etcd 读取一次完整配置，etcd 超时或不可用时使用本地缓存的最后一次成功加载的配置；
+    之后通过 watch 更新快照，组件通过 subscribe 订阅配置段，变更后在 watch 线程中实时生效
+    """
+
     appConfig: Optional[AppConfig]
     elasticSearchConfig: Optional[ElasticSearchConfig]
     milvusConfig: Optional[MilvusConfig]
     minioConfig: Optional[MinioConfig]
     ollamaConfig: Optional[OllamaConfig]
     postgresqlConfig: Optional[PostgresqlConfig]
+    chunkConfig: Optional[ChunkConfig]
 
-    def __init__(self, host: str, port: int, prefix: str):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        prefix: str,
+        config: Optional[dict] = None,
+        revision: int = 0,
+    ):
         self.host = host
         self.port = port
         self.prefix = prefix
+        self._client: Optional[ConfigManager] = None
+        # 配置段 -> 订阅者，回调参数为 (新配置, 旧配置)
+        self._subscribers: Dict[str, List[Callable[[Any, Any], None]]] = {}
+        self._lock = threading.Lock()
 
-        self.client = ConfigManager(
-            etcd_host=self.host, etcd_port=self.port, config_prefix=self.prefix
-        )
-        self.config = self.client.get_config()
+        if config is None:
+            self.config, self.revision, self.source = self._load()
+        else:
+            # 使用主进程已加载的配置
+            self.config, self.revision, self.source = config, revision, "env"
+
+    @property
+    def client(self) -> ConfigManager:
+        if self._client is None:
+            self._client = ConfigManager(
+                etcd_host=self.host,
+                etcd_port=self.port,
+                config_prefix=self.prefix,
+                timeout=ETCD_TIMEOUT,
+            )
+        return self._client
+
+    def _load(self) -> Tuple[dict, int, str]:
+        try:
+            config, revision = self.client.fetch_config()
+            if config is None:
+                raise ValueError(f"Config {self.prefix} not found in etcd")
+            return config, revision, "etcd"
+        except Exception as e:
+            cached = load_cached_config(self.prefix)
+            if cached is None:
+                raise
+            log.warning(
+                f"Failed to load config from etcd: {e}, "
+                f"use cached config revision {cached[1]} from {ETCD_CONFIG_CACHE_FILE}"
+            )
+            return cached[0], cached[1], "cache"
 
     def init_config(self):
-        self.appConfig = parse_app_config(self.config)
-        self.elasticSearchConfig = parse_es_config(self.config)
-        self.milvusConfig = parse_milvus_config(self.config)
-        self.minioConfig = parse_minio_config(self.config)
-        self.ollamaConfig = parse_ollama_config(self.config)
-        self.postgresqlConfig = parse_postgresql_config(self.config)
-
-    def get_config(self, key: str) -> str:
-        return self.config.get(key)
+        for section, value in parse_config(self.config).items():
+            setattr(self, CONFIG_SECTIONS[section][0], value)
+        # 解析成功的配置才写入本地缓存，作为下次 etcd 不可用时的启动配置
+        if self.source == "etcd":
+            save_cached_config(self.prefix, self.config, self.revision)
+
+    def subscribe(self, section: str, callback: Callable[[Any, Any], None]):
+        """
+        订阅配置段（如 ollama、milvus、chunk）的变更，配置段解析后的值变化时
+        以 callback(新配置, 旧配置) 调用；回调在 watch 线程中执行，异常只记录日志
+        """
+        if section not in CONFIG_SECTIONS:
+            raise ValueError(f"Unknown config section: {section}")
+        self._subscribers.setdefault(section, []).append(callback)
+
+    def apply_config(self, config: dict, revision: int) -> bool:
+        """
+        应用新版本的配置：全部配置段解析成功后替换快照并写入本地缓存，再通知有变化的配置段的订阅者；
+        解析失败时保留当前配置，返回 False
+        """
+        with self._lock:
+            if revision <= self.revision:
+                return False
+            try:
+                parsed = parse_config(config)
+            except Exception as e:
+                log.error(
+                    f"Invalid config revision {revision}, "
+                    f"keep revision {self.revision}: {e}"
+                )
+                return False
+
+            changes = {}
+            for section, value in parsed.items():
+                attr = CONFIG_SECTIONS[section][0]
+                old_value = getattr(self, attr, None)
+                if value != old_value:
+                    changes[section] = (value, old_value)
+                setattr(self, attr, value)
+            self.config, self.revision = config, revision
 
-    def set_config(self, key: str, value: str):
-        self.client.put(self.prefix + key, value)
-        self.config = self.client.get_config()
+        save_cached_config(self.prefix, config, revision)
+        log.info(f"apply config revision {revision}, changed: {list(changes)}")
+        for section, (value, old_value) in changes.items():
+            for callback in list(self._subscribers.get(section, [])):
+                try:
+                    callback(value, old_value)
+                except Exception as e:
+                    log.error(f"Failed to apply {section} config: {e}")
+        return True
+
+    def start_watch(self):
+        self.client.watch(
+            self.apply_config,
+            revision=self.revision,
+            retry_interval=ETCD_WATCH_RETRY_INTERVAL,
+        )
+
+    def stop_watch(self):
+        if self._client is not None:
+            self._client.stop_watch()
+
+    def get_config(self, key: str) -> Any:
+        return self.config.get(key)
 
-    def set_config(self, key: str, value: str):
-        ETCD_CONFIG[key] = value
+    def set_config(self, key_path: str, value: Any) -> bool:
+        """
+        通过点号路径修改 etcd 中的配置（如 milvus.searchParams.ef），
+        各进程 watch 到变更后更新快照并通知订阅者
+        """
+        return self.client.set_value(key_path, value)
@@ -0,0 +1,74 @@
+# config/etcd_config_test.py
+import copy
+import os
+import sys
+
+import pytest
+import yaml
+
+# 添加项目根目录到 Python 路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+import config.etcd_config as etcd_config
+from app.utils.etcd_util import ConfigManager
+from config.etcd_config import EtcdConfig
+
+
+@pytest.fixture
+def config_dict():
+    with open(os.path.join(current_dir, "project-dev.yml"), "r") as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture(autouse=True)
+def cache_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "etcd_config.json")
+    monkeypatch.setattr(etcd_config, "ETCD_CONFIG_CACHE_FILE", path)
+    return path
+
+
+def test_apply_notifies_changed_sections_and_keeps_last_good(config_dict):
+    config = EtcdConfig("localhost", 2379, "test", config=config_dict, revision=1)
+    config.init_config()
+    changes = []
+    config.subscribe("ollama", lambda new, old: changes.append(("ollama", new, old)))
+    config.subscribe("chunk", lambda new, old: changes.append(("chunk", new, old)))
+
+    updated = copy.deepcopy(config_dict)
+    updated["ollama"]["model"] = "qwen2"
+    assert config.apply_config(updated, 2)
+    assert [(section, new.model, old.model) for section, new, old in changes] == [
+        ("ollama", "qwen2", "llama2")
+    ]
+    assert config.ollamaConfig.model == "qwen2"
+
+    # 非法配置和过期版本都不应用
+    invalid = copy.deepcopy(updated)
+    invalid["chunk"] = {"chunkSize": 64, "chunkOverlap": 64}
+    assert not config.apply_config(invalid, 3)
+    assert not config.apply_config(config_dict, 2)
+    assert config.revision == 2
+    assert config.chunkConfig.chunkSize == 512
+    assert len(changes) == 1
+
+
+def test_start_from_cache_when_etcd_unavailable(config_dict, monkeypatch):
+    monkeypatch.setattr(ConfigManager, "fetch_config", lambda self: (config_dict, 7))
+    config = EtcdConfig("localhost", 2379, "test")
+    config.init_config()
+    assert config.source == "etcd"
+
+    def unavailable(self):
+        raise ConnectionError("etcd unavailable")
+
+    monkeypatch.setattr(ConfigManager, "fetch_config", unavailable)
+    cached = EtcdConfig("localhost", 2379, "test")
+    cached.init_config()
+    assert (cached.source, cached.revision) == ("cache", 7)
+    assert cached.milvusConfig.collectionName == "document_vectors"
+
+    # 其它前缀的缓存不能使用
+    with pytest.raises(ConnectionError):
+        EtcdConfig("localhost", 2379, "other")
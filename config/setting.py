@@ -11,7 +11,166 @@ MILVUS_COLLECTION_PREFIX = APP_NAME + "_"
 
 MILVUS_SIMILARITY_METRIC = "COSINE"
 MILVUS_INDEX_TYPE = "HNSW"
+# 向量字段类型：FLOAT16_VECTOR / BFLOAT16_VECTOR 以半精度存储，内存为 FLOAT_VECTOR 的一半（需要 Milvus 服务端，Milvus Lite 不支持）
+MILVUS_VECTOR_TYPE = "FLOAT_VECTOR"
+# 精排：先取 top_k * MILVUS_RERANK_FACTOR 个候选，再取回原始向量按精确得分重排，弥补 SQ8 / PQ 等量化索引损失的召回
+MILVUS_RERANK_ENABLED = False
+MILVUS_RERANK_FACTOR = 4
+# 各索引类型的建索引参数
+MILVUS_INDEX_PARAMS = {
+    "FLAT": {},
+    "HNSW": {"M": 16, "efConstruction": 200},
+    # 图中保存 SQ8 量化后的向量，内存约为 HNSW 的 1/4
+    "HNSW_SQ": {"M": 16, "efConstruction": 200, "sq_type": "SQ8"},
+    "IVF_FLAT": {"nlist": 1024},
+    "IVF_SQ8": {"nlist": 1024},
+    "IVF_PQ": {"nlist": 1024, "m": 16, "nbits": 8},
+    "DISKANN": {},
+}
+# 各索引类型的默认检索参数，可在请求中通过 ef / nprobe 覆盖
+MILVUS_SEARCH_PARAMS = {
+    "FLAT": {},
+    "HNSW": {"ef": 64},
+    "HNSW_SQ": {"ef": 64},
+    "IVF_FLAT": {"nprobe": 16},
+    "IVF_SQ8": {"nprobe": 16},
+    "IVF_PQ": {"nprobe": 16},
+    "DISKANN": {"search_list": 100},
+}
+# Milvus 访问线程池：按操作类型分别限制并发，检索再多也不会占满写入的线程
+MILVUS_CONNECTION_POOL_SIZE = 4  # 独立连接数，线程池中的线程按轮询绑定到各连接
+MILVUS_SEARCH_CONCURRENCY = 16  # 同时执行的检索数
+MILVUS_INSERT_CONCURRENCY = 4  # 同时执行的写入数
+MILVUS_ADMIN_CONCURRENCY = 2  # 同时执行的查询数据、集合管理等操作数
+MILVUS_EXPORT_BATCH_SIZE = 1000  # 导出集合时每次从 Milvus 读取的行数
+# 集合快照（parquet + npy），用于迁移集合或更换索引时跳过重新生成嵌入向量
+MILVUS_SNAPSHOT_DIR = str(BASE_DIR / "cache" / "snapshots")
+MILVUS_SNAPSHOT_EXPORT_BATCH_SIZE = 5000  # 导出时每次读取的行数
+MILVUS_SNAPSHOT_IMPORT_BATCH_SIZE = 5000  # 导入时每次写入的行数
 
 ETCD_HOST = "localhost"
 ETCD_PORT = 2379
 ETCD_PREFIX = "lama-rag/dev/config"
+# 主进程加载的 etcd 配置通过该环境变量传给 worker 进程
+ETCD_CONFIG_ENV = "LAMA_RAG_ETCD_CONFIG"
+ETCD_TIMEOUT = 3  # 访问 etcd 的超时（秒），启动时超时或不可用则使用本地缓存的配置
+# 最后一次成功加载的配置，etcd 不可用时从该文件启动
+ETCD_CONFIG_CACHE_FILE = str(BASE_DIR / "cache" / "etcd_config.json")
+ETCD_WATCH_ENABLED = True  # worker 进程 watch etcd 配置，变更后实时生效
+ETCD_WATCH_RETRY_INTERVAL = 5  # watch 断开后重连的间隔（秒）
+
+# 批量入库
+INGEST_MAX_DOCUMENTS = 10000  # 单次请求最多接收的文档数
+INGEST_EMBED_BATCH_SIZE = 100  # 每次调用 embedding 的文本数
+INGEST_INSERT_BATCH_SIZE = 1000  # 每次写入 Milvus 的文档数
+# 文本分块，etcd 配置的 chunk 段未设置时使用
+CHUNK_SIZE = 512
+CHUNK_OVERLAP = 32
+
+# Ollama 连接池，LLM、embedding 和健康检查共享，同步和异步各一个
+OLLAMA_POOL_MAX_CONNECTIONS = 200  # 单个 worker 同时在途的最大连接数
+OLLAMA_POOL_MAX_KEEPALIVE_CONNECTIONS = 50  # 保持的空闲长连接数
+OLLAMA_POOL_KEEPALIVE_EXPIRY = 30.0  # 空闲长连接的保持时间（秒）
+OLLAMA_POOL_CONNECT_TIMEOUT = 5.0  # 建立连接的超时（秒）
+OLLAMA_POOL_TIMEOUT = 10.0  # 连接池满时等待空闲连接的超时（秒）
+# Ollama 本身只支持 HTTP/1.1，前面有支持 HTTP/2 的 TLS 反向代理时才开启，需要安装 h2
+OLLAMA_POOL_HTTP2 = False
+EMBEDDING_REQUEST_TIMEOUT = 60.0  # 单次 embedding 请求超时（秒）
+# 启动时探测模型实际输出的维度，与集合维度不一致时拒绝启动
+EMBEDDING_DIM_PROBE_TEXT = "dimension probe"
+# 集合维度小于模型维度时按 Matryoshka 截断（如 nomic-embed-text 768 -> 256），可按集合配置 matryoshka 覆盖
+EMBEDDING_MATRYOSHKA_ENABLED = False
+OLLAMA_LLM_REQUEST_TIMEOUT = 120.0  # 单次 LLM 生成请求超时（秒）
+
+# embedding 模型注册表：名称 -> Ollama 模型名、输出维度、是否为 Matryoshka 训练（可截断维度）
+# 集合通过 milvus 配置的 embeddingModel 选择模型，模型在第一次使用时加载
+EMBEDDING_MODELS = {
+    "nomic-embed-text": {
+        "model_name": "nomic-embed-text",
+        "dim": 768,
+        "matryoshka": True,
+    },
+    "bge-large": {
+        "model_name": "imcurie/bge-large-en-v1.5",
+        "dim": 1024,
+        "matryoshka": False,
+    },
+    "bge-m3": {"model_name": "bge-m3", "dim": 1024, "matryoshka": False},
+}
+EMBEDDING_DEFAULT_MODEL = "nomic-embed-text"  # 集合未配置 embeddingModel 时使用
+EMBEDDING_MODEL_IDLE_TTL = 600  # 模型空闲超过该时间（秒）后释放，默认集合的模型常驻
+EMBEDDING_MODEL_SWEEP_INTERVAL = 60  # 检查空闲模型的间隔（秒）
+
+# embedding 请求合批
+EMBEDDING_BATCH_ENABLED = True
+EMBEDDING_BATCH_MAX_SIZE = 64  # 单批最多合并的请求数
+EMBEDDING_BATCH_MAX_WAIT_MS = 5  # 第一条请求最多等待的时间（毫秒）
+
+# embedding 缓存
+EMBEDDING_CACHE_ENABLED = True
+# 磁盘缓存目录，为空时只使用内存缓存
+EMBEDDING_CACHE_DIR = str(BASE_DIR / "cache" / "embeddings")
+EMBEDDING_CACHE_MAX_MEMORY_ITEMS = 50000  # 内存 LRU 最多缓存的向量数
+
+# 检索结果缓存
+SEARCH_CACHE_ENABLED = True
+SEARCH_CACHE_TTL_SECONDS = 300  # 缓存有效期（秒）
+SEARCH_CACHE_MAX_ENTRIES = 10000  # 最多缓存的查询数
+SEARCH_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 缓存估算内存上限
+SEARCH_CACHE_SIMILARITY_THRESHOLD = 0.95  # 查询向量余弦相似度超过该值时视为同一问题
+
+# 流式入库流水线
+INGEST_QUEUE_SIZE = 1000  # 阶段之间队列的容量，队列满时上游等待
+INGEST_PARSE_WORKERS = 1
+INGEST_SPLIT_WORKERS = 2
+INGEST_EMBED_WORKERS = 4  # 同时在途的 embedding 批次数
+INGEST_INSERT_WORKERS = 2  # 同时在途的 Milvus 写入批次数
+INGEST_FLUSH_INTERVAL = 0.05  # 攒批最长等待时间（秒）
+
+# 增量同步：按调用方的文档 id 和 chunk 内容哈希，只处理变化的 chunk
+SYNC_DOCUMENT_BATCH_SIZE = 100  # 每批查询已有 chunk、写入和删除的文档数
+
+# 请求日志
+LOG_SAMPLE_RATE = 1.0  # 记录请求日志的比例，未抽中的请求仅在出错时记录
+LOG_EXCLUDE_PATHS = (  # 不记录日志的路径前缀，如高频轮询的统计接口
+    "/api/embedding/cache/stats",
+    "/api/embedding/batch/stats",
+    "/api/milvus/search/cache/stats",
+    "/api/milvus/ingest/stats",
+    "/api/milvus/keyword/stats",
+    "/api/rag/metrics",
+    "/api/ollama/pool/stats",
+    "/api/milvus/executor/stats",
+    "/health",
+    "/metrics",
+)
+LOG_REQUEST_BODY_MAX_BYTES = 200  # 请求体最多记录的字节数
+LOG_RESPONSE_BODY_MAX_BYTES = 500  # 响应体最多记录的字节数
+
+# 启动
+OLLAMA_CHECK_TIMEOUT = 5.0  # 启动时检查 Ollama 是否可用的超时（秒）
+
+# 关键词检索与混合检索
+BM25_K1 = 1.2
+BM25_B = 0.75
+BM25_REBUILD_BATCH_SIZE = 1000  # 启动时从 Milvus 分批加载文档重建索引
+HYBRID_RRF_K = 60  # 倒数排名融合的平滑常数
+HYBRID_CANDIDATES = 50  # 每一路最少召回的候选数
+
+# Prometheus 指标：多 worker 时各进程写入该目录，/metrics 汇总所有 worker，启动时清空
+METRICS_MULTIPROC_DIR = str(BASE_DIR / "cache" / "prometheus")
+# 多 worker 时各集合的写入代数文件，其它 worker 据此清空检索缓存、重建关键词索引，启动时清空
+SHARED_GENERATION_DIR = str(BASE_DIR / "cache" / "generations")
+
+# 链路追踪
+TRACE_SAMPLE_RATE = 0.1  # 没有上游 traceparent 时新链路的采样比例
+# otlp：发送到 OTLP/HTTP 采集器；file：写入 JSON 行文件（不轮转，仅用于本地调试）；none：关闭
+TRACE_EXPORTER = "none"
+TRACE_OTLP_ENDPOINT = "http://127.0.0.1:4318/v1/traces"
+TRACE_FILE_PATH = str(BASE_DIR / LOG_DIR_NAME / "traces.jsonl")
+TRACE_SERVICE_NAME = SERVER_NAME
+TRACE_MAX_QUEUE_SIZE = 10000  # 待导出 span 队列上限，超出时丢弃最早的 span
+TRACE_EXPORT_BATCH_SIZE = 512
+TRACE_EXPORT_INTERVAL = 5.0  # 导出间隔（秒）
+# 开启后每次操作结束打印 llama_index 完整事件链路，仅用于调试
+LLAMA_DEBUG_HANDLER_ENABLED = False
@@ -1,27 +1,93 @@
 # main.py
 import argparse
+import os
 import signal
 import sys
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 import uvicorn
 from app.models.business_exception import BusinessException
 from app.models.common_resp import resp, resp_500
+from app.serives.embedding_manager import EmbeddingManager
 from app.serives.init import init_llama_rag
-from app.serives.milvus_manager import MilvusManager
+from app.serives.milvus_executor import MilvusExecutor
+from app.serives.milvus_manager import MilvusManager, is_milvus_lite
 from app.utils.log import Loggers
-from config.setting import ETCD_HOST, ETCD_PORT, ETCD_PREFIX
-from config.etcd_config import init_config
+from app.utils.metrics import init_multiprocess_dir, mark_process_dead
+from app.utils.shared_generation import init_generation_dir
+from app.utils.tracing import init_tracing, tracer
+from config.setting import (
+    ETCD_HOST,
+    ETCD_PORT,
+    ETCD_PREFIX,
+    METRICS_MULTIPROC_DIR,
+    SHARED_GENERATION_DIR,
+    TRACE_EXPORT_BATCH_SIZE,
+    TRACE_EXPORT_INTERVAL,
+    TRACE_EXPORTER,
+    TRACE_FILE_PATH,
+    TRACE_MAX_QUEUE_SIZE,
+    TRACE_OTLP_ENDPOINT,
+    TRACE_SAMPLE_RATE,
+    TRACE_SERVICE_NAME,
+)
+from config.etcd_config import (
+    export_config_env,
+    init_config,
+    init_config_from_env,
+    start_config_watch,
+    stop_config_watch,
+)
 
 from fastapi.middleware.cors import CORSMiddleware
 from app.middleware.logging import LoggingMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.tracing import TracingMiddleware
 
 from app.utils.log import log
 
-from app.api import milvus_test
+from app.api import health, metrics, milvus_test, rag
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    每个 worker 进程启动时各自初始化 Ollama、Milvus 等客户端
+    """
+    if not init_config_from_env():
+        # 未通过 main() 启动（如直接使用 uvicorn/gunicorn 加载 main:app），从 etcd 读取默认配置
+        init_config(
+            argparse.Namespace(host=ETCD_HOST, port=ETCD_PORT, prefix=ETCD_PREFIX)
+        )
+    Loggers.init_config()
+    # 导出线程属于当前 worker 进程，需在 worker 中创建
+    init_tracing(
+        sample_rate=TRACE_SAMPLE_RATE,
+        exporter=TRACE_EXPORTER,
+        otlp_endpoint=TRACE_OTLP_ENDPOINT,
+        file_path=TRACE_FILE_PATH,
+        service_name=TRACE_SERVICE_NAME,
+        max_queue_size=TRACE_MAX_QUEUE_SIZE,
+        batch_size=TRACE_EXPORT_BATCH_SIZE,
+        interval=TRACE_EXPORT_INTERVAL,
+    )
+    # 初始化在后台线程中进行，进度通过 /health/ready 查看
+    init_llama_rag(wait=False)
+    # 每个 worker 各自 watch 配置，变更后更新本进程的快照和组件
+    start_config_watch()
+    log.info(f"worker[{os.getpid()}] started")
+    yield
+    stop_config_watch()
+    MilvusExecutor.shutdown()
+    EmbeddingManager.shutdown()
+    # 导出队列中剩余的 span
+    tracer.shutdown()
+    mark_process_dead(os.getpid())
+    log.info(f"worker[{os.getpid()}] shutdown")
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,6 +98,9 @@ app.add_middleware(
 )
 
 app.add_middleware(LoggingMiddleware)
+# 最后添加的中间件在最外层，耗时包含日志中间件
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 
 
 # 业务异常 处理器
@@ -56,7 +125,10 @@ def signal_handler(sig, frame):
     sys.exit(0)
 
 
+app.include_router(health.router)
+app.include_router(metrics.router)
 app.include_router(milvus_test.router, prefix="/api")
+app.include_router(rag.router, prefix="/api")
 
 
 def main():
@@ -66,12 +138,24 @@ def main():
     parser.add_argument("-host", type=str, default=ETCD_HOST, help="ETCD host")
     parser.add_argument("-port", type=int, default=ETCD_PORT, help="ETCD port")
     parser.add_argument("-prefix", type=str, default=ETCD_PREFIX, help="Config prefix")
+    parser.add_argument(
+        "-workers",
+        type=int,
+        default=None,
+        help="Worker processes, defaults to application.workers or 1",
+    )
+    parser.add_argument(
+        "-reload",
+        action="store_true",
+        help="Development mode: single process with auto reload",
+    )
 
     # 解析命令行参数
     args = parser.parse_args()
 
-    # 初始化配置管理器
+    # 初始化配置管理器，只在主进程读取一次 etcd（不可用时使用本地缓存），通过环境变量传给 worker
     init_config(args)
+    export_config_env()
 
     from config.etcd_config import ETCD_CONFIG
 
@@ -79,22 +163,35 @@ def main():
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
-    config = uvicorn.Config(
-        app="main:app",
-        host=ETCD_CONFIG.appConfig.webHost,
-        port=ETCD_CONFIG.appConfig.webPort,
-        reload=True,
-    )
-
-    server = uvicorn.Server(config)
-
     # 初始化日志 让 loguru 使用 uvicorn 的日志
     Loggers.init_config()
 
-    init_llama_rag()
+    # 服务在每个 worker 的 lifespan 中初始化
+    if args.reload:
+        workers = None
+    else:
+        workers = args.workers or ETCD_CONFIG.appConfig.workers or 1
+    if workers and workers > 1:
+        if is_milvus_lite(ETCD_CONFIG.milvusConfig.uri):
+            log.error(
+                f"Milvus Lite file {ETCD_CONFIG.milvusConfig.uri} can only be opened "
+                f"by one process, use a Milvus server uri to run {workers} workers"
+            )
+            sys.exit(1)
+        # worker 进程启动时读取这些环境变量：指标写入共享目录，/metrics 汇总所有 worker；
+        # 写入集合后增加共享的写入代数，其它 worker 清空检索缓存并重建关键词索引
+        init_multiprocess_dir(METRICS_MULTIPROC_DIR)
+        init_generation_dir(SHARED_GENERATION_DIR)
+    log.info(f"Server starting, reload: {args.reload}, workers: {workers}")
 
     try:
-        server.run()
+        uvicorn.run(
+            app="main:app",
+            host=ETCD_CONFIG.appConfig.webHost,
+            port=ETCD_CONFIG.appConfig.webPort,
+            reload=args.reload,
+            workers=workers,
+        )
     except Exception as e:
         log.error(f"Server run failed: {e}")
     finally: